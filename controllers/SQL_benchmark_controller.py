@@ -2,24 +2,24 @@ import time
 from datetime import datetime
 from typing import Dict, Any, List, Tuple
 import requests
-from langchain.llms import Ollama
+from controllers.llm_gateway import invoke_llm
 import tiktoken
 import json
 import os
 import re
-import matplotlib
-matplotlib.use('Agg')  # Use the Agg backend which doesn't require a GUI
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from controllers.sql_controller import SQLController
+from controllers.postprocessing import normalize_sql, normalize_sql_advanced
+from controllers.benchmark_charts import render_charts, chart_payload
+from controllers.benchmark_store import BenchmarkResultStore, improvement_over, nested_dict
+from controllers.stream_histogram import StreamingHistogram, distribution_columns
 from sklearn.metrics.pairwise import cosine_similarity
 from tqdm import tqdm
 import nltk
 from nltk.translate.bleu_score import sentence_bleu
 from datasets import load_dataset
-import concurrent.futures
 from evaluate import load
 
 class SQLBenchmarkController:
@@ -28,12 +28,27 @@ class SQLBenchmarkController:
         self.config = self._load_config()
         self.approaches = ["raw", "controlled", "few_shot", "fine_tuned"]
         self.complexity_levels = ["simple", "medium", "complex", "extra"]
+        # Set render_charts to False to skip PNG generation; chart data is always kept in chart_data
+        self.render_charts = True
+        self.chart_data = {}
+        self.store = BenchmarkResultStore("sql")
+        self.metrics_table = None
+        # (model, complexity, approach) -> {"time": histogram, "tokens": histogram}
+        self.histograms = {}
         # Create directories
         os.makedirs("logs/sql_benchmark", exist_ok=True)
         os.makedirs("logs/sql_benchmark/visualizations", exist_ok=True)
         
-        # Load Hugging Face dataset
-        self.text2sql_data = self._load_huggingface_dataset()
+        # The Hugging Face dataset is loaded on first use, so controllers that
+        # only analyze stored results never pay for it
+        self._text2sql_data = None
+    
+    @property
+    def text2sql_data(self):
+        """Text-to-SQL samples grouped by complexity level"""
+        if self._text2sql_data is None:
+            self._text2sql_data = self._load_huggingface_dataset()
+        return self._text2sql_data
         
     def _load_config(self) -> Dict[str, str]:
         """Load model configuration from config.json"""
@@ -54,25 +69,7 @@ class SQLBenchmarkController:
     
     def _normalize_sql(self, query):
         """Normalize SQL query for comparison"""
-        # Convert to lowercase
-        query = query.lower()
-        
-        # Remove extra whitespace
-        query = re.sub(r'\s+', ' ', query).strip()
-        
-        # Remove trailing semicolon
-        query = re.sub(r';$', '', query)
-        
-        # Normalize whitespace around operators
-        query = re.sub(r'\s*=\s*', ' = ', query)
-        query = re.sub(r'\s*>\s*', ' > ', query)
-        query = re.sub(r'\s*<\s*', ' < ', query)
-        query = re.sub(r'\s*>=\s*', ' >= ', query)
-        query = re.sub(r'\s*<=\s*', ' <= ', query)
-        query = re.sub(r'\s*<>\s*', ' <> ', query)
-        query = re.sub(r'\s*!=\s*', ' != ', query)
-        
-        return query
+        return normalize_sql(query)
     
     def _exact_match(self, generated_query, reference_query):
         """Check if generated query exactly matches reference query"""
@@ -151,41 +148,7 @@ class SQLBenchmarkController:
     
     def _normalize_sql_advanced(self, query):
         """Enhanced SQL normalization to handle the synthetic dataset's variations"""
-        if not query:
-            return ""
-        
-        # Basic cleanup
-        query = query.lower().strip()
-        
-        # Remove trailing semicolons and extra whitespace
-        query = re.sub(r'\s+', ' ', query)
-        query = re.sub(r';$', '', query)
-        
-        # Normalize quoted identifiers
-        query = re.sub(r'`([^`]*)`', r'\1', query)
-        query = re.sub(r'"([^"]*)"', r'\1', query)
-        query = re.sub(r"'([^']*)'", r"'\1'", query)  # Preserve string literals
-        
-        # Normalize keywords and operators
-        query = re.sub(r'\bjoin\b', 'join', query)
-        query = re.sub(r'\binner\s+join\b', 'join', query)
-        query = re.sub(r'\bleft\s+join\b', 'left join', query)
-        query = re.sub(r'\bright\s+join\b', 'right join', query)
-        query = re.sub(r'\bfull\s+join\b', 'full join', query)
-        query = re.sub(r'\bgroup\s+by\b', 'group by', query)
-        query = re.sub(r'\border\s+by\b', 'order by', query)
-        
-        # Remove AS keyword for column aliases
-        query = re.sub(r'\b(\w+)\s+as\s+(\w+)', r'\1 \2', query)
-        
-        # Standardize function names
-        query = re.sub(r'\bcount\s*\(', 'count(', query)
-        query = re.sub(r'\bsum\s*\(', 'sum(', query)
-        query = re.sub(r'\bavg\s*\(', 'avg(', query)
-        query = re.sub(r'\bmax\s*\(', 'max(', query)
-        query = re.sub(r'\bmin\s*\(', 'min(', query)
-        
-        return query
+        return normalize_sql_advanced(query)
 
     def _evaluate_sql_query(self, generated_query, reference_query):
         """Improved SQL evaluation method for synthetic dataset"""
@@ -351,7 +314,6 @@ class SQLBenchmarkController:
         try:
             # Get the actual model name from config
             model_name = self._get_model_name(model)
-            llm = Ollama(model=model_name, temperature=0)
             
             # Enhanced prompt for SQL generation matching dataset format
             prompt = f"""
@@ -370,7 +332,7 @@ class SQLBenchmarkController:
             - For column aliases, use 'AS' keyword (e.g., COUNT(*) AS count)
             """
             
-            response = llm.invoke(prompt).strip()
+            response = invoke_llm(model_name, prompt).strip()
             
             # Calculate tokens
             encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
@@ -444,7 +406,6 @@ class SQLBenchmarkController:
         try:
             # Get the actual model name from config
             model_name = self._get_model_name(model)
-            llm = Ollama(model=model_name, temperature=0)
             
             # Get more diverse examples for better few-shot learning
             examples_data = []
@@ -483,7 +444,7 @@ class SQLBenchmarkController:
             Return ONLY the SQL query without any explanations.
             """
             
-            response = llm.invoke(prompt).strip()
+            response = invoke_llm(model_name, prompt).strip()
             
             # Calculate tokens
             encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
@@ -521,7 +482,6 @@ class SQLBenchmarkController:
         try:
             # Get the actual model name from config
             model_name = self._get_model_name(model)
-            llm = Ollama(model=model_name, temperature=0)
             
             # Simple prompt for fine-tuned models (they need less instruction)
             prompt = f"""
@@ -589,7 +549,9 @@ class SQLBenchmarkController:
         """Run comprehensive SQL benchmark with all approaches"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        self.results = {model: {complexity: {} for complexity in self.complexity_levels} for model in models}
+        # Every generation becomes one row of the run's columnar store
+        self.store = BenchmarkResultStore("sql", run_id=timestamp)
+        self.histograms = {}
         
         for model in models:
             print(f"\nRunning benchmark for model: {model}")
@@ -602,17 +564,6 @@ class SQLBenchmarkController:
                 num_samples_actual = min(num_samples, len(complexity_data))
                 samples = complexity_data[:num_samples_actual]
                 
-                # Initialize results structure
-                approach_results = {approach: {
-                    "times": [],
-                    "tokens": [],
-                    "exact_match": [],
-                    "component_match": [],
-                    "execution_match": [],
-                    "token_efficiency": [],
-                    "semantic_similarity": []
-                } for approach in self.approaches}
-                
                 # Process each sample
                 for i, sample in enumerate(tqdm(samples, desc=f"Processing {complexity} samples")):
                     question = sample["question"]
@@ -635,46 +586,56 @@ class SQLBenchmarkController:
                     }
                     
                     for approach, result in approach_data.items():
-                        if "error" not in result:
-                            query = result["query"]
-                            evaluation = self._evaluate_sql_query(query, reference_query)
-                            
-                            approach_results[approach]["times"].append(result["time_taken"])
-                            approach_results[approach]["tokens"].append(result["tokens"]["total"])
-                            approach_results[approach]["exact_match"].append(evaluation["exact_match"])
-                            approach_results[approach]["component_match"].append(evaluation["component_match"])
-                            approach_results[approach]["execution_match"].append(evaluation["execution_match"])
-                            approach_results[approach]["token_efficiency"].append(evaluation["token_efficiency"])
-                            approach_results[approach]["semantic_similarity"].append(evaluation["semantic_similarity"])
-                
-                # Calculate aggregate metrics
-                for approach in self.approaches:
-                    metrics = approach_results[approach]
-                    self.results[model][complexity][approach] = {
-                        "time": np.mean(metrics["times"]) if metrics["times"] else 0,
-                        "tokens": np.mean(metrics["tokens"]) if metrics["tokens"] else 0,
-                        "exact_match": np.mean(metrics["exact_match"]) if metrics["exact_match"] else 0,
-                        "component_match": np.mean(metrics["component_match"]) if metrics["component_match"] else 0,
-                        "execution_match": np.mean(metrics["execution_match"]) if metrics["execution_match"] else 0,
-                        "token_efficiency": np.mean(metrics["token_efficiency"]) if metrics["token_efficiency"] else 0,
-                        "semantic_similarity": np.mean(metrics["semantic_similarity"]) if metrics["semantic_similarity"] else 0,
-                        "sample_count": len(metrics["times"])
-                    }
+                        row = {
+                            "model": model,
+                            "complexity": complexity,
+                            "approach": approach,
+                            "task_type": sample.get("task_type", "unknown"),
+                            "domain": sample.get("domain", "unknown"),
+                            "original_complexity": sample.get("original_complexity", "unknown"),
+                            "latency": result["time_taken"],
+                            "input_tokens": result["tokens"]["input"],
+                            "output_tokens": result["tokens"]["output"],
+                            "tokens": result["tokens"]["total"]
+                        }
+                        
+                        if "error" in result:
+                            # Failed generations are kept but excluded from the aggregates
+                            self.store.record(error=True, **row)
+                        else:
+                            evaluation = self._evaluate_sql_query(result["query"], reference_query)
+                            self.store.record(**row, **evaluation)
+                            self._record_distribution((model, complexity, approach), result)
                 
                 # Print summary for this complexity level
+                summary = self._aggregate_metrics(self.store.to_frame(), [model], [complexity])
                 print(f"\n  Summary for {complexity} queries:")
                 for approach in self.approaches:
-                    result = self.results[model][complexity][approach]
+                    result = summary.loc[(model, complexity, approach)]
                     print(f"    {approach}: exact match: {result['exact_match']*100:.1f}%, " +
                           f"execution match: {result['execution_match']*100:.1f}%, " +
-                          f"time: {result['time']*1000:.1f}ms, tokens: {result['tokens']:.1f}")
+                          f"time: {result['time']*1000:.1f}ms (p95 {result['time_p95']*1000:.1f}ms), " +
+                          f"tokens: {result['tokens']:.1f}")
+        
+        # Aggregate all generations at once
+        self.metrics_table = self._aggregate_metrics(self.store.to_frame(), models, self.complexity_levels)
+        self.results = nested_dict(self.metrics_table)
+        
+        # Keep the mergeable histogram state with the results so runs can be combined later
+        for (model, complexity, approach), histograms in self.histograms.items():
+            self.results[model][complexity][approach]["histograms"] = {
+                metric: histogram.to_dict() for metric, histogram in histograms.items()
+            }
+        
+        # Save per-generation rows and the (small) aggregates
+        samples_file = self.store.save()
+        print(f"\nPer-generation results saved to {samples_file}")
         
-        # Save results
         results_file = f"logs/sql_benchmark/results_{timestamp}.json"
         with open(results_file, "w") as f:
             json.dump(self.results, f, indent=2)
         
-        print(f"\nResults saved to {results_file}")
+        print(f"Results saved to {results_file}")
         
         # Generate comparative metrics
         self.generate_comparative_metrics()
@@ -691,6 +652,47 @@ class SQLBenchmarkController:
         
         return self.results
     
+    def _aggregate_metrics(self, frame, models, complexity_levels):
+        """
+        Mean metrics per model, complexity level and approach over successful generations
+        
+        Returns:
+            DataFrame indexed by (model, complexity, approach), with zeros for
+            combinations that produced no successful generation
+        """
+        valid = frame[~frame["error"]]
+        table = valid.groupby(["model", "complexity", "approach"]).agg(
+            time=("latency", "mean"),
+            tokens=("tokens", "mean"),
+            exact_match=("exact_match", "mean"),
+            component_match=("component_match", "mean"),
+            execution_match=("execution_match", "mean"),
+            token_efficiency=("token_efficiency", "mean"),
+            semantic_similarity=("semantic_similarity", "mean"),
+            sample_count=("latency", "size")
+        )
+        full_index = pd.MultiIndex.from_product(
+            [models, complexity_levels, self.approaches], names=["model", "complexity", "approach"]
+        )
+        table = table.reindex(full_index, fill_value=0)
+        table["sample_count"] = table["sample_count"].astype(int)
+        
+        # Tail latency and token spread from the streaming histograms
+        distributions = pd.DataFrame([
+            {
+                **distribution_columns(self.histograms.get(key, {}).get("time"), "time"),
+                **distribution_columns(self.histograms.get(key, {}).get("tokens"), "tokens")
+            }
+            for key in full_index
+        ], index=full_index)
+        return table.join(distributions)
+    
+    def _record_distribution(self, key, result):
+        """Add one successful generation's time and tokens to the histograms for key"""
+        histograms = self.histograms.setdefault(key, {"time": StreamingHistogram(), "tokens": StreamingHistogram()})
+        histograms["time"].record(result["time_taken"])
+        histograms["tokens"].record(result["tokens"]["total"])
+    
     def generate_comparative_metrics(self):
         """Generate metrics comparing approaches across complexity levels"""
         comparative = {
@@ -698,48 +700,26 @@ class SQLBenchmarkController:
             "approach_efficiency": {},
             "model_comparison": {}
         }
+        table = self.metrics_table
+        
+        # Complexity impact on each metric: {complexity: {approach: value}} per model
+        for model, model_rows in table.groupby(level="model", sort=False):
+            model_rows = model_rows.droplevel("model")
+            comparative["complexity_impact"][model] = {
+                metric: model_rows[metric].unstack("approach")
+                .reindex(index=self.complexity_levels, columns=self.approaches)
+                .to_dict(orient="index")
+                for metric in ["exact_match", "execution_match", "time", "tokens"]
+            }
         
-        # Calculate complexity impact on each metric
-        for model in self.results:
-            comparative["complexity_impact"][model] = {}
-            
-            for metric in ["exact_match", "execution_match", "time", "tokens"]:
-                comparative["complexity_impact"][model][metric] = {
-                    complexity: {
-                        approach: self.results[model][complexity][approach][metric]
-                        for approach in self.approaches
-                    }
-                    for complexity in self.complexity_levels
-                }
-        
-        # Calculate approach efficiency (improvement over raw)
-        for model in self.results:
-            comparative["approach_efficiency"][model] = {}
-            
-            for complexity in self.complexity_levels:
-                comparative["approach_efficiency"][model][complexity] = {}
-                
-                for approach in self.approaches:
-                    if approach != "raw":
-                        improvements = {}
-                        raw_metrics = self.results[model][complexity]["raw"]
-                        approach_metrics = self.results[model][complexity][approach]
-                        
-                        for metric in ["exact_match", "execution_match", "component_match"]:
-                            # For accuracy metrics, higher is better
-                            if raw_metrics[metric] > 0:
-                                improvements[metric] = (approach_metrics[metric] / raw_metrics[metric] - 1) * 100
-                            else:
-                                improvements[metric] = 0
-                        
-                        for metric in ["time", "tokens"]:
-                            # For efficiency metrics, lower is better
-                            if raw_metrics[metric] > 0:
-                                improvements[metric] = (1 - approach_metrics[metric] / raw_metrics[metric]) * 100
-                            else:
-                                improvements[metric] = 0
-                        
-                        comparative["approach_efficiency"][model][complexity][approach] = improvements
+        # Approach efficiency (improvement over raw): accuracy metrics are
+        # better when higher, time and tokens when lower
+        improvements = improvement_over(
+            table, "raw",
+            higher_is_better=["exact_match", "execution_match", "component_match"],
+            lower_is_better=["time", "tokens"]
+        )
+        comparative["approach_efficiency"] = nested_dict(improvements.drop(index="raw", level="approach"))
         
         # Save comparative metrics
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -752,73 +732,48 @@ class SQLBenchmarkController:
         
         return comparative
     
-    def _calculate_improvement(self, baseline, improved):
-        """Calculate percentage improvement"""
-        if "time" in baseline and "time" in improved and baseline["time"] > 0:
-            time_improvement = (1 - improved["time"] / baseline["time"]) * 100
-        else:
-            time_improvement = 0
-            
-        if "tokens" in baseline and "tokens" in improved and baseline["tokens"] > 0:
-            token_improvement = (1 - improved["tokens"] / baseline["tokens"]) * 100
-        else:
-            token_improvement = 0
-            
-        # Average of time and token improvements
-        return (time_improvement + token_improvement) / 2
-    
     def generate_sql_comparison_table(self):
         """Generate comprehensive SQL comparison table"""
-        table_data = []
+        table = self.metrics_table
         
-        for model in self.results:
-            for complexity in self.complexity_levels:
-                # Skip if no data for this complexity level
-                if not self.results[model][complexity]:
-                    continue
-                
-                row = {
-                    "Model": model,
-                    "Complexity": complexity.title(),
-                    "Query Count": self.results[model][complexity]["raw"]["sample_count"]
-                }
-                
-                # Add metrics for each approach
-                for approach in self.approaches:
-                    # Skip if no data for this approach
-                    if approach not in self.results[model][complexity]:
-                        continue
-                    
-                    approach_data = self.results[model][complexity][approach]
-                    
-                    # Accuracy metrics
-                    row[f"{approach}_exact_match"] = f"{approach_data['exact_match']*100:.1f}%"
-                    row[f"{approach}_execution_match"] = f"{approach_data['execution_match']*100:.1f}%"
-                    
-                    # Efficiency metrics
-                    row[f"{approach}_tokens"] = f"{approach_data['tokens']:.1f}"
-                    row[f"{approach}_time_ms"] = f"{approach_data['time']*1000:.1f}"
-                    
-                    # Improvement over raw
-                    if approach != "raw":
-                        improvement = self._calculate_improvement(
-                            self.results[model][complexity]["raw"],
-                            approach_data
-                        )
-                        row[f"{approach}_improvement"] = f"{improvement:.1f}%"
-                
-                table_data.append(row)
+        # Improvement over raw is the average of the time and token improvements
+        improvements = improvement_over(table, "raw", lower_is_better=["time", "tokens"])
+        improvement = (improvements["time"] + improvements["tokens"]) / 2
+        
+        raw = table.xs("raw", level="approach")
+        comparison = pd.DataFrame({
+            "Model": raw.index.get_level_values("model"),
+            "Complexity": raw.index.get_level_values("complexity").str.title(),
+            "Query Count": raw["sample_count"].values
+        })
+        
+        # Add metrics for each approach
+        for approach in self.approaches:
+            approach_data = table.xs(approach, level="approach")
+            
+            # Accuracy metrics
+            comparison[f"{approach}_exact_match"] = (approach_data["exact_match"] * 100).map("{:.1f}%".format).values
+            comparison[f"{approach}_execution_match"] = (approach_data["execution_match"] * 100).map("{:.1f}%".format).values
+            
+            # Efficiency metrics
+            comparison[f"{approach}_tokens"] = approach_data["tokens"].map("{:.1f}".format).values
+            comparison[f"{approach}_time_ms"] = (approach_data["time"] * 1000).map("{:.1f}".format).values
+            
+            # Tail latency
+            for quantile in ["p50", "p95", "p99"]:
+                comparison[f"{approach}_{quantile}_ms"] = (approach_data[f"time_{quantile}"] * 1000).map("{:.1f}".format).values
+            
+            # Improvement over raw
+            if approach != "raw":
+                comparison[f"{approach}_improvement"] = improvement.xs(approach, level="approach").map("{:.1f}%".format).values
         
-        return pd.DataFrame(table_data)
+        return comparison
     
-    def _plot_accuracy_by_complexity(self):
-        """Plot accuracy metrics by complexity level"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _plot_accuracy_by_complexity(self, timestamp):
+        """Build accuracy-by-complexity chart specs (exact and execution match)"""
+        specs = []
         
         for model in self.results:
-            # Create figure with two subplots (exact match and execution match)
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 7))
-            
             # Prepare data
             complexity_levels = []
             exact_match_data = {approach: [] for approach in self.approaches}
@@ -837,93 +792,43 @@ class SQLBenchmarkController:
                                 self.results[model][complexity][approach]["execution_match"] * 100
                             )
             
-            # Plot exact match
-            x = np.arange(len(complexity_levels))
-            width = 0.2
-            
-            for i, approach in enumerate(self.approaches):
-                ax1.bar(x + (i - 1.5) * width, exact_match_data[approach], width, 
-                        label=approach.replace('_', ' ').title())
-            
-            ax1.set_xlabel('Complexity Levels')
-            ax1.set_ylabel('Exact Match Accuracy (%)')
-            ax1.set_title(f'Exact Match Accuracy by Complexity Level - {model}')
-            ax1.set_xticks(x)
-            ax1.set_xticklabels(complexity_levels)
-            ax1.legend()
-            ax1.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            # Plot execution match
-            for i, approach in enumerate(self.approaches):
-                ax2.bar(x + (i - 1.5) * width, execution_match_data[approach], width, 
-                        label=approach.replace('_', ' ').title())
-            
-            ax2.set_xlabel('Complexity Levels')
-            ax2.set_ylabel('Execution Match Accuracy (%)')
-            ax2.set_title(f'Execution Match Accuracy by Complexity Level - {model}')
-            ax2.set_xticks(x)
-            ax2.set_xticklabels(complexity_levels)
-            ax2.legend()
-            ax2.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            plt.tight_layout()
-            plt.savefig(f"logs/sql_benchmark/visualizations/accuracy_by_complexity_{model}_{timestamp}.png", dpi=300)
-            plt.close()
-            
-            print(f"Accuracy visualization saved for {model}")
-    
-    def _plot_token_efficiency_by_complexity(self):
-        """Plot token utilization by complexity level"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            specs.append({
+                "id": f"accuracy_by_complexity_{model}",
+                "kind": "grouped_bar",
+                "path": f"logs/sql_benchmark/visualizations/accuracy_by_complexity_{model}_{timestamp}.png",
+                "figsize": (15, 7),
+                "data": {
+                    "panels": [
+                        {
+                            "title": f"Exact Match Accuracy by Complexity Level - {model}",
+                            "xlabel": "Complexity Levels",
+                            "ylabel": "Exact Match Accuracy (%)",
+                            "categories": complexity_levels,
+                            "series": {approach.replace('_', ' ').title(): exact_match_data[approach]
+                                       for approach in self.approaches}
+                        },
+                        {
+                            "title": f"Execution Match Accuracy by Complexity Level - {model}",
+                            "xlabel": "Complexity Levels",
+                            "ylabel": "Execution Match Accuracy (%)",
+                            "categories": complexity_levels,
+                            "series": {approach.replace('_', ' ').title(): execution_match_data[approach]
+                                       for approach in self.approaches}
+                        }
+                    ]
+                }
+            })
         
-        for model in self.results:
-            plt.figure(figsize=(12, 7))
-            
-            # Prepare data
-            complexity_levels = []
-            token_data = {approach: [] for approach in self.approaches}
-            
-            for complexity in self.complexity_levels:
-                if complexity in self.results[model]:
-                    complexity_levels.append(complexity.title())
-                    
-                    for approach in self.approaches:
-                        if approach in self.results[model][complexity]:
-                            token_data[approach].append(
-                                self.results[model][complexity][approach]["tokens"]
-                            )
-            
-            # Plot tokens
-            x = np.arange(len(complexity_levels))
-            width = 0.2
-            
-            for i, approach in enumerate(self.approaches):
-                plt.bar(x + (i - 1.5) * width, token_data[approach], width, 
-                        label=approach.replace('_', ' ').title())
-            
-            plt.xlabel('Complexity Levels')
-            plt.ylabel('Average Token Usage')
-            plt.title(f'Token Utilization by Complexity Level - {model}')
-            plt.xticks(x, complexity_levels)
-            plt.legend()
-            plt.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            plt.tight_layout()
-            plt.savefig(f"logs/sql_benchmark/visualizations/token_efficiency_{model}_{timestamp}.png", dpi=300)
-            plt.close()
-            
-            print(f"Token efficiency visualization saved for {model}")
+        return specs
     
-    def _plot_processing_time_by_complexity(self):
-        """Plot processing time by complexity level"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _plot_metric_by_complexity(self, timestamp, metric, scale, name, ylabel, title):
+        """Build one grouped bar spec per model for a single metric across complexity levels"""
+        specs = []
         
         for model in self.results:
-            plt.figure(figsize=(12, 7))
-            
             # Prepare data
             complexity_levels = []
-            time_data = {approach: [] for approach in self.approaches}
+            metric_data = {approach: [] for approach in self.approaches}
             
             for complexity in self.complexity_levels:
                 if complexity in self.results[model]:
@@ -931,42 +836,52 @@ class SQLBenchmarkController:
                     
                     for approach in self.approaches:
                         if approach in self.results[model][complexity]:
-                            # Convert to milliseconds for better readability
-                            time_data[approach].append(
-                                self.results[model][complexity][approach]["time"] * 1000
+                            metric_data[approach].append(
+                                self.results[model][complexity][approach][metric] * scale
                             )
             
-            # Plot processing time
-            x = np.arange(len(complexity_levels))
-            width = 0.2
-            
-            for i, approach in enumerate(self.approaches):
-                plt.bar(x + (i - 1.5) * width, time_data[approach], width, 
-                        label=approach.replace('_', ' ').title())
-            
-            plt.xlabel('Complexity Levels')
-            plt.ylabel('Processing Time (ms)')
-            plt.title(f'Processing Time by Complexity Level - {model}')
-            plt.xticks(x, complexity_levels)
-            plt.legend()
-            plt.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            plt.tight_layout()
-            plt.savefig(f"logs/sql_benchmark/visualizations/processing_time_{model}_{timestamp}.png", dpi=300)
-            plt.close()
-            
-            print(f"Processing time visualization saved for {model}")
+            specs.append({
+                "id": f"{name}_{model}",
+                "kind": "grouped_bar",
+                "path": f"logs/sql_benchmark/visualizations/{name}_{model}_{timestamp}.png",
+                "figsize": (12, 7),
+                "data": {
+                    "panels": [{
+                        "title": f"{title} - {model}",
+                        "xlabel": "Complexity Levels",
+                        "ylabel": ylabel,
+                        "categories": complexity_levels,
+                        "series": {approach.replace('_', ' ').title(): metric_data[approach]
+                                   for approach in self.approaches}
+                    }]
+                }
+            })
+        
+        return specs
     
-    def _plot_error_analysis(self):
-        """Plot error analysis by SQL component"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _plot_token_efficiency_by_complexity(self, timestamp):
+        """Build token utilization by complexity level chart specs"""
+        return self._plot_metric_by_complexity(
+            timestamp, "tokens", 1, "token_efficiency",
+            "Average Token Usage", "Token Utilization by Complexity Level"
+        )
+    
+    def _plot_processing_time_by_complexity(self, timestamp):
+        """Build processing time by complexity level chart specs"""
+        # Convert to milliseconds for better readability
+        return self._plot_metric_by_complexity(
+            timestamp, "time", 1000, "processing_time",
+            "Processing Time (ms)", "Processing Time by Complexity Level"
+        )
+    
+    def _plot_error_analysis(self, timestamp):
+        """Build error analysis by SQL component chart specs"""
+        specs = []
         
         # SQL components to analyze
         components = ["select_cols", "from_tables", "where_clause", "group_by", "order_by", "limit"]
         
         for model in self.results:
-            plt.figure(figsize=(14, 8))
-            
             # Prepare data - calculate component-specific error rates
             component_errors = {approach: {comp: 0 for comp in components} for approach in self.approaches}
             component_counts = {comp: 0 for comp in components}
@@ -999,31 +914,30 @@ class SQLBenchmarkController:
                     if component_counts[comp] > 0:
                         component_errors[approach][comp] /= component_counts[comp]
             
-            # Plot error rates
-            x = np.arange(len(components))
-            width = 0.2
-            
-            for i, approach in enumerate(self.approaches):
-                plt.bar(x + (i - 1.5) * width, 
-                        [component_errors[approach][comp] * 100 for comp in components], 
-                        width, label=approach.replace('_', ' ').title())
-            
-            plt.xlabel('SQL Components')
-            plt.ylabel('Error Rate (%)')
-            plt.title(f'SQL Component Error Analysis - {model}')
-            plt.xticks(x, [comp.replace('_', ' ').title() for comp in components])
-            plt.legend()
-            plt.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            plt.tight_layout()
-            plt.savefig(f"logs/sql_benchmark/visualizations/error_analysis_{model}_{timestamp}.png", dpi=300)
-            plt.close()
-            
-            print(f"Error analysis visualization saved for {model}")
+            specs.append({
+                "id": f"error_analysis_{model}",
+                "kind": "grouped_bar",
+                "path": f"logs/sql_benchmark/visualizations/error_analysis_{model}_{timestamp}.png",
+                "figsize": (14, 8),
+                "data": {
+                    "panels": [{
+                        "title": f"SQL Component Error Analysis - {model}",
+                        "xlabel": "SQL Components",
+                        "ylabel": "Error Rate (%)",
+                        "categories": [comp.replace('_', ' ').title() for comp in components],
+                        "series": {
+                            approach.replace('_', ' ').title(): [component_errors[approach][comp] * 100 for comp in components]
+                            for approach in self.approaches
+                        }
+                    }]
+                }
+            })
+        
+        return specs
 
-    def _plot_radar_chart_metrics(self):
-        """Generate radar chart comparing approaches across multiple metrics"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _plot_radar_chart_metrics(self, timestamp):
+        """Build radar chart specs comparing approaches across multiple metrics"""
+        specs = []
         
         # Metrics to include in radar chart
         metrics = ["exact_match", "execution_match", "component_match", 
@@ -1043,49 +957,27 @@ class SQLBenchmarkController:
                 if complexity not in self.results[model]:
                     continue
                 
-                # Create radar chart
-                fig = plt.figure(figsize=(10, 10))
-                ax = fig.add_subplot(111, polar=True)
-                
-                # Number of metrics
-                N = len(metrics)
-                # Angles for each metric (evenly spaced)
-                angles = [n / float(N) * 2 * np.pi for n in range(N)]
-                # Close the polygon
-                angles += angles[:1]
-                
-                # Set the labels
-                ax.set_xticks(angles[:-1])
-                ax.set_xticklabels([metric_names[m] for m in metrics])
-                
-                # Draw y-axis lines
-                ax.set_rlabel_position(0)
-                plt.yticks([0.2, 0.4, 0.6, 0.8, 1.0], ["0.2", "0.4", "0.6", "0.8", "1.0"], color="grey", size=8)
-                plt.ylim(0, 1)
-                
-                # Plot each approach
+                series = {}
                 for approach in self.approaches:
                     if approach not in self.results[model][complexity]:
                         continue
                     
                     approach_data = self.results[model][complexity][approach]
-                    values = [approach_data[metric] for metric in metrics]
-                    # Close the polygon
-                    values += values[:1]
-                    
-                    # Plot values
-                    ax.plot(angles, values, linewidth=2, linestyle='solid', label=approach.replace('_', ' ').title())
-                    ax.fill(angles, values, alpha=0.1)
-                
-                # Add legend
-                plt.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
-                plt.title(f"Performance Metrics Comparison - {model}, {complexity.title()} Queries")
+                    series[approach.replace('_', ' ').title()] = [approach_data[metric] for metric in metrics]
                 
-                plt.tight_layout()
-                plt.savefig(f"logs/sql_benchmark/visualizations/radar_chart_{model}_{complexity}_{timestamp}.png", dpi=300)
-                plt.close()
-                
-                print(f"Radar chart saved for {model}, {complexity} complexity")
+                specs.append({
+                    "id": f"radar_chart_{model}_{complexity}",
+                    "kind": "radar",
+                    "path": f"logs/sql_benchmark/visualizations/radar_chart_{model}_{complexity}_{timestamp}.png",
+                    "figsize": (10, 10),
+                    "data": {
+                        "title": f"Performance Metrics Comparison - {model}, {complexity.title()} Queries",
+                        "axes": [metric_names[m] for m in metrics],
+                        "series": series
+                    }
+                })
+        
+        return specs
 
     def _create_minimal_dataset(self):
         """Create a minimal dataset for testing if HF dataset can't be loaded"""
@@ -1256,59 +1148,52 @@ class SQLBenchmarkController:
             # Create a minimal test dataset if HF dataset can't be loaded
             return self._create_minimal_dataset()
 
+    def _breakdown(self, by):
+        """
+        Aggregate per-sample results by model, the given sample attribute and approach
+        
+        Returns:
+            DataFrame indexed by (model, by, approach) with mean metrics and sample counts
+        """
+        frame = self.store.to_frame()
+        frame = frame[~frame["error"]]
+        # Keep models and approaches in benchmark order rather than alphabetical
+        return frame.groupby(["model", by, "approach"], sort=False).agg(
+            exact_match=("exact_match", "mean"),
+            execution_match=("execution_match", "mean"),
+            time=("latency", "mean"),
+            tokens=("tokens", "mean"),
+            sample_count=("exact_match", "size")
+        )
+
+    def _report_row(self, cells, metrics):
+        """Format one markdown table row from leading cells and aggregated metrics"""
+        return (
+            "| " + " | ".join(cells) + " | "
+            f"{metrics['exact_match']*100:.1f}% | {metrics['execution_match']*100:.1f}% | "
+            f"{metrics['time']*1000:.1f} | {metrics['tokens']:.1f} | {int(metrics['sample_count'])} |\n"
+        )
+
     def analyze_by_task_type(self):
         """Analyze performance based on SQL task types"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Prepare data structure
-        task_type_results = {}
-        for model in self.results:
-            task_type_results[model] = {}
-            
-            # Get unique task types from the dataset
-            for task_type in self.dataset_metadata["task_types"]:
-                task_type_results[model][task_type] = {
-                    approach: {
-                        "exact_match": [],
-                        "execution_match": [],
-                        "time": [],
-                        "tokens": []
-                    } for approach in self.approaches
-                }
-        
-        # Since we didn't track results by task_type during benchmark execution,
-        # we'll generate a simulated analysis report based on complexity
-        # In a real implementation, we'd need to adjust the benchmark to track by task_type
+        breakdown = self._breakdown("task_type")
         
         # Create a markdown report
         report = "# Performance Analysis by SQL Task Type\n\n"
         
-        for model in task_type_results:
+        for model, model_rows in breakdown.groupby(level="model", sort=False):
             report += f"## Model: {model}\n\n"
             
-            for task_type in self.dataset_metadata["task_types"]:
+            for task_type, task_rows in model_rows.groupby(level="task_type"):
                 report += f"### Task Type: {task_type}\n\n"
                 
                 # Generate a table comparing approaches
-                report += "| Approach | Exact Match | Execution Match | Time (ms) | Tokens |\n"
-                report += "|----------|-------------|-----------------|-----------|--------|\n"
+                report += "| Approach | Exact Match | Execution Match | Time (ms) | Tokens | Samples |\n"
+                report += "|----------|-------------|-----------------|-----------|--------|---------|\n"
                 
-                for approach in self.approaches:
-                    # Simulate performance metrics (in a real implementation, these would be actual values)
-                    # Using the 'medium' complexity as a placeholder
-                    if 'medium' in self.results[model] and approach in self.results[model]['medium']:
-                        metrics = self.results[model]['medium'][approach]
-                        exact_match = metrics.get('exact_match', 0) * 100
-                        execution_match = metrics.get('execution_match', 0) * 100
-                        time_ms = metrics.get('time', 0) * 1000
-                        tokens = metrics.get('tokens', 0)
-                    else:
-                        exact_match = 0
-                        execution_match = 0
-                        time_ms = 0
-                        tokens = 0
-                    
-                    report += f"| {approach} | {exact_match:.1f}% | {execution_match:.1f}% | {time_ms:.1f} | {tokens:.1f} |\n"
+                for (_, _, approach), metrics in task_rows.iterrows():
+                    report += self._report_row([approach], metrics)
                 
                 report += "\n"
         
@@ -1320,43 +1205,32 @@ class SQLBenchmarkController:
         print(f"Task type analysis report saved to {report_file}")
         return report
 
-    def analyze_by_domain(self):
+    def analyze_by_domain(self, top_n=10):
         """Analyze performance based on domains/verticals"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Sample the top 10 domains for analysis
-        top_domains = self.dataset_metadata["domains"][:10]
+        breakdown = self._breakdown("domain")
         
         # Create a markdown report
         report = "# Performance Analysis by Domain\n\n"
-        report += "This report shows performance metrics across different domains/verticals.\n\n"
+        report += f"This report shows performance metrics across the {top_n} most sampled domains/verticals.\n\n"
         
-        for model in self.results:
+        for model, model_rows in breakdown.groupby(level="model", sort=False):
             report += f"## Model: {model}\n\n"
             
+            # Top domains by number of samples benchmarked for this model
+            domain_counts = model_rows["sample_count"].groupby(level="domain").sum()
+            top_domains = domain_counts.sort_values(ascending=False).index[:top_n]
+            
             # Create a table for each approach
-            for approach in self.approaches:
+            for approach, approach_rows in model_rows.groupby(level="approach", sort=False):
                 report += f"### Approach: {approach}\n\n"
                 
-                report += "| Domain | Exact Match | Execution Match | Time (ms) | Tokens |\n"
-                report += "|--------|-------------|-----------------|-----------|--------|\n"
+                report += "| Domain | Exact Match | Execution Match | Time (ms) | Tokens | Samples |\n"
+                report += "|--------|-------------|-----------------|-----------|--------|---------|\n"
                 
-                for domain in top_domains:
-                    # Simulate performance metrics
-                    # Using the 'medium' complexity as a placeholder
-                    if 'medium' in self.results[model] and approach in self.results[model]['medium']:
-                        metrics = self.results[model]['medium'][approach]
-                        exact_match = metrics.get('exact_match', 0) * 100
-                        execution_match = metrics.get('execution_match', 0) * 100
-                        time_ms = metrics.get('time', 0) * 1000
-                        tokens = metrics.get('tokens', 0)
-                    else:
-                        exact_match = 0
-                        execution_match = 0
-                        time_ms = 0
-                        tokens = 0
-                    
-                    report += f"| {domain} | {exact_match:.1f}% | {execution_match:.1f}% | {time_ms:.1f} | {tokens:.1f} |\n"
+                for (_, domain, _), metrics in approach_rows.iterrows():
+                    if domain in top_domains:
+                        report += self._report_row([domain], metrics)
                 
                 report += "\n"
         
@@ -1368,10 +1242,8 @@ class SQLBenchmarkController:
         print(f"Domain analysis report saved to {report_file}")
         return report
 
-    def _plot_domain_distribution(self):
-        """Plot distribution of the top domains in the dataset"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
+    def _plot_domain_distribution(self, timestamp):
+        """Build the chart spec for the distribution of the top domains in the dataset"""
         # Count queries by domain
         domain_counts = {}
         
@@ -1384,87 +1256,60 @@ class SQLBenchmarkController:
         
         # Get top 15 domains by count
         top_domains = sorted(domain_counts.items(), key=lambda x: x[1], reverse=True)[:15]
-        labels = [item[0] for item in top_domains]
-        counts = [item[1] for item in top_domains]
-        
-        # Create the plot
-        plt.figure(figsize=(12, 8))
-        bars = plt.barh(labels, counts)
-        
-        # Add count labels
-        for i, bar in enumerate(bars):
-            plt.text(bar.get_width() + 5, bar.get_y() + bar.get_height()/2, 
-                     str(counts[i]), va='center')
-        
-        plt.xlabel('Number of Queries')
-        plt.ylabel('Domain/Vertical')
-        plt.title('Top 15 Domains in the Text-to-SQL Dataset')
-        plt.tight_layout()
         
-        # Save the plot
-        plt.savefig(f"logs/sql_benchmark/visualizations/domain_distribution_{timestamp}.png", dpi=300)
-        plt.close()
-        
-        print("Domain distribution visualization saved")
+        return [{
+            "id": "domain_distribution",
+            "kind": "barh",
+            "path": f"logs/sql_benchmark/visualizations/domain_distribution_{timestamp}.png",
+            "figsize": (12, 8),
+            "data": {
+                "title": "Top 15 Domains in the Text-to-SQL Dataset",
+                "xlabel": "Number of Queries",
+                "ylabel": "Domain/Vertical",
+                "labels": [item[0] for item in top_domains],
+                "values": [item[1] for item in top_domains]
+            }
+        }]
 
-    def _plot_task_type_performance(self):
-        """Plot performance metrics by SQL task type"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # This is a placeholder implementation
-        # In a real implementation, you would need to track results by task_type during benchmark
+    def _plot_task_type_performance(self, timestamp):
+        """Build performance by SQL task type chart specs"""
+        specs = []
+        
+        exact_match = self._breakdown("task_type")["exact_match"] * 100
+        
+        for model, model_rows in exact_match.groupby(level="model", sort=False):
+            # Task type x approach grid of exact match percentages
+            grid = model_rows.droplevel("model").unstack("approach").reindex(columns=self.approaches).fillna(0)
+            task_types = list(grid.index)
+            
+            specs.append({
+                "id": f"task_type_performance_{model}",
+                "kind": "grouped_bar",
+                "path": f"logs/sql_benchmark/visualizations/task_type_performance_{model}_{timestamp}.png",
+                "figsize": (14, 10),
+                "data": {
+                    "panels": [{
+                        "title": f"Performance by SQL Task Type - {model}",
+                        "xlabel": "SQL Task Type",
+                        "ylabel": "Exact Match (%)",
+                        "categories": task_types,
+                        "series": {approach.replace('_', ' ').title(): grid[approach].tolist()
+                                   for approach in self.approaches},
+                        "rotate_labels": True
+                    }]
+                }
+            })
         
-        for model in self.results:
-            plt.figure(figsize=(14, 10))
-            
-            # Get unique task types from metadata
-            task_types = self.dataset_metadata["task_types"]
-            
-            # Use simulated data based on complexity results
-            exact_match_data = {approach: [] for approach in self.approaches}
-            
-            for task_type in task_types:
-                for approach in self.approaches:
-                    # Use medium complexity as proxy (in a real implementation, use actual results by task_type)
-                    if 'medium' in self.results[model] and approach in self.results[model]['medium']:
-                        exact_match = self.results[model]['medium'][approach].get('exact_match', 0) * 100
-                    else:
-                        exact_match = 0
-                    
-                    # Add some random variation just for visualization purposes
-                    exact_match += np.random.normal(0, 5)  # Add some noise
-                    exact_match = max(0, min(100, exact_match))  # Clamp to 0-100%
-                    
-                    exact_match_data[approach].append(exact_match)
-            
-            # Set up the plot
-            x = np.arange(len(task_types))
-            width = 0.2
-            
-            for i, approach in enumerate(self.approaches):
-                plt.bar(x + (i - 1.5) * width, exact_match_data[approach], width, 
-                        label=approach.replace('_', ' ').title())
-            
-            plt.xlabel('SQL Task Type')
-            plt.ylabel('Exact Match (%)')
-            plt.title(f'Performance by SQL Task Type - {model}')
-            plt.xticks(x, task_types, rotation=45, ha='right')
-            plt.legend()
-            plt.grid(axis='y', linestyle='--', alpha=0.7)
-            plt.tight_layout()
-            
-            # Save the plot
-            plt.savefig(f"logs/sql_benchmark/visualizations/task_type_performance_{model}_{timestamp}.png", dpi=300)
-            plt.close()
-            
-            print(f"Task type performance visualization saved for {model}")
+        return specs
 
     def generate_sql_visualizations(self):
-        """Generate all SQL benchmark visualizations"""
+        """Generate all SQL benchmark visualizations and return the chart data keyed by chart id"""
         print("Generating visualizations...")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Run each visualization method
-        visualization_methods = [
+        # Aggregate the data for every chart up front; only the resulting
+        # small specs are shipped to the rendering processes
+        chart_builders = [
             self._plot_accuracy_by_complexity,
             self._plot_token_efficiency_by_complexity,
             self._plot_processing_time_by_complexity,
@@ -1474,56 +1319,43 @@ class SQLBenchmarkController:
             self._plot_task_type_performance
         ]
         
-        # Use parallelism for generating visualizations
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(visualization_methods)) as executor:
-            # Submit all visualization methods
-            futures = [executor.submit(method) for method in visualization_methods]
-            
-            # Wait for all to complete
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    print(f"Error generating visualization: {str(e)}")
+        specs = []
+        for builder in chart_builders:
+            try:
+                specs.extend(builder(timestamp))
+            except Exception as e:
+                print(f"Error generating visualization: {str(e)}")
         
-        print("All visualizations generated successfully")
+        self.chart_data = {spec["id"]: chart_payload(spec) for spec in specs}
+        
+        if not self.render_charts:
+            print(f"Chart rendering disabled, kept data for {len(specs)} charts")
+            return self.chart_data
+        
+        paths = render_charts(specs)
+        
+        print(f"{len(paths)} of {len(specs)} visualizations generated successfully")
+        return self.chart_data
 
     def analyze_by_original_complexity(self):
         """Analyze performance based on original complexity categories"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Get unique original complexity values
-        original_complexities = set()
-        for complexity_level in self.complexity_levels:
-            for query in self.text2sql_data[complexity_level]:
-                original_complexities.add(query.get("original_complexity", "unknown"))
+        breakdown = self._breakdown("original_complexity")
         
         # Create a markdown report
         report = "# Performance Analysis by Original SQL Complexity\n\n"
         
-        for model in self.results:
+        for model, model_rows in breakdown.groupby(level="model", sort=False):
             report += f"## Model: {model}\n\n"
             
             # Generate a table header
-            report += "| Original Complexity | Approach | Exact Match | Execution Match | Time (ms) | Tokens |\n"
-            report += "|---------------------|----------|-------------|-----------------|-----------|--------|\n"
+            report += "| Original Complexity | Approach | Exact Match | Execution Match | Time (ms) | Tokens | Samples |\n"
+            report += "|---------------------|----------|-------------|-----------------|-----------|--------|---------|\n"
             
-            for original in sorted(original_complexities):
-                for approach in self.approaches:
-                    # Use medium complexity as proxy (in a real implementation, use actual results by original complexity)
-                    if 'medium' in self.results[model] and approach in self.results[model]['medium']:
-                        metrics = self.results[model]['medium'][approach]
-                        exact_match = metrics.get('exact_match', 0) * 100
-                        execution_match = metrics.get('execution_match', 0) * 100
-                        time_ms = metrics.get('time', 0) * 1000
-                        tokens = metrics.get('tokens', 0)
-                    else:
-                        exact_match = 0
-                        execution_match = 0
-                        time_ms = 0
-                        tokens = 0
-                    
-                    report += f"| {original} | {approach} | {exact_match:.1f}% | {execution_match:.1f}% | {time_ms:.1f} | {tokens:.1f} |\n"
+            for (_, original, approach), metrics in model_rows.iterrows():
+                report += self._report_row([original, approach], metrics)
+            
+            report += "\n"
         
         # Save the report
         report_file = f"logs/sql_benchmark/original_complexity_report_{timestamp}.md"
@@ -0,0 +1,166 @@
+import math
+import multiprocessing
+import os
+import concurrent.futures
+from typing import Dict, Any, List
+
+import numpy as np
+from matplotlib.figure import Figure
+
+# Charts are described by small, picklable specs:
+#
+#   {
+#       "id": "accuracy_by_complexity_phi3",
+#       "kind": "grouped_bar" | "radar" | "barh",
+#       "data": {...},          # the aggregated series the chart is drawn from
+#       "path": "logs/.../accuracy_by_complexity_phi3_<timestamp>.png",
+#       "figsize": (15, 7)
+#   }
+#
+# The controllers only aggregate data and build specs; rendering happens here
+# on explicit Figure objects (no pyplot state machine), so specs can be drawn
+# in parallel worker processes.
+
+
+def _draw_grouped_bars(ax, panel: Dict[str, Any]):
+    """Draw one grouped bar panel: one group per category, one bar per series"""
+    categories = panel["categories"]
+    series = panel["series"]
+
+    x = np.arange(len(categories))
+    width = 0.8 / max(len(series), 1)
+
+    for i, (label, values) in enumerate(series.items()):
+        offset = (i - len(series) / 2 + 0.5) * width
+        ax.bar(x + offset, values, width, label=label)
+
+    ax.set_xlabel(panel["xlabel"])
+    ax.set_ylabel(panel["ylabel"])
+    ax.set_title(panel["title"])
+    ax.set_xticks(x)
+    if panel.get("rotate_labels"):
+        ax.set_xticklabels(categories, rotation=45, ha='right')
+    else:
+        ax.set_xticklabels(categories)
+    ax.legend()
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+
+def _render_grouped_bar(fig, data: Dict[str, Any]):
+    panels = data["panels"]
+    axes = fig.subplots(1, len(panels), squeeze=False)[0]
+    for ax, panel in zip(axes, panels):
+        _draw_grouped_bars(ax, panel)
+
+
+def _render_radar(fig, data: Dict[str, Any]):
+    ax = fig.add_subplot(111, polar=True)
+
+    # Angles for each metric (evenly spaced), repeating the first to close the polygon
+    n = len(data["axes"])
+    angles = [i / float(n) * 2 * np.pi for i in range(n)]
+    angles += angles[:1]
+
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(data["axes"])
+    ax.set_rlabel_position(0)
+    ax.set_yticks([0.2, 0.4, 0.6, 0.8, 1.0])
+    ax.set_yticklabels(["0.2", "0.4", "0.6", "0.8", "1.0"], color="grey", size=8)
+    ax.set_ylim(0, 1)
+
+    for label, values in data["series"].items():
+        values = list(values) + list(values[:1])
+        ax.plot(angles, values, linewidth=2, linestyle='solid', label=label)
+        ax.fill(angles, values, alpha=0.1)
+
+    ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
+    ax.set_title(data["title"])
+
+
+def _render_barh(fig, data: Dict[str, Any]):
+    ax = fig.add_subplot(111)
+    bars = ax.barh(data["labels"], data["values"])
+
+    # Add count labels
+    for bar, value in zip(bars, data["values"]):
+        ax.text(bar.get_width() + 5, bar.get_y() + bar.get_height() / 2, str(value), va='center')
+
+    ax.set_xlabel(data["xlabel"])
+    ax.set_ylabel(data["ylabel"])
+    ax.set_title(data["title"])
+
+
+def _compact(value, digits=4):
+    """Round floats (recursively) so chart payloads stay small on the wire; NaN and infinities become None"""
+    if isinstance(value, dict):
+        return {key: _compact(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item, digits) for item in value]
+    if isinstance(value, (float, np.floating)):
+        # Not valid JSON, and an empty group's mean is NaN
+        return round(float(value), digits) if math.isfinite(value) else None
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def chart_payload(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """The client-facing part of a chart spec: its kind and data series, without file or figure details"""
+    return {"kind": spec["kind"], **_compact(spec["data"])}
+
+
+_RENDERERS = {
+    "grouped_bar": _render_grouped_bar,
+    "radar": _render_radar,
+    "barh": _render_barh,
+}
+
+
+def render_chart(spec: Dict[str, Any]) -> str:
+    """Render a single chart spec to PNG and return the file path"""
+    fig = Figure(figsize=spec.get("figsize", (12, 8)))
+    _RENDERERS[spec["kind"]](fig, spec["data"])
+    fig.tight_layout()
+    fig.savefig(spec["path"], dpi=spec.get("dpi", 300))
+    return spec["path"]
+
+
+def _process_context():
+    """
+    Start workers from a clean fork server where available: forking the
+    multi-threaded Flask process directly could copy held locks into the child.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context()
+
+
+def render_charts(specs: List[Dict[str, Any]], max_workers: int = None) -> List[str]:
+    """
+    Render chart specs in a process pool
+
+    Args:
+        specs: Chart specs built by the benchmark controllers
+        max_workers: Upper bound on worker processes (defaults to the CPU count)
+
+    Returns:
+        Paths of the charts that were rendered successfully
+    """
+    if not specs:
+        return []
+
+    workers = min(len(specs), max_workers or os.cpu_count() or 1)
+    paths = []
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=_process_context()) as executor:
+        futures = {executor.submit(render_chart, spec): spec for spec in specs}
+
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                paths.append(future.result())
+            except Exception as e:
+                print(f"Error generating visualization {futures[future]['id']}: {str(e)}")
+
+    return paths
@@ -1,23 +1,27 @@
 import time
 from datetime import datetime
 from typing import Dict, Any, List, Tuple
-from langchain.llms import Ollama
+from controllers.llm_gateway import invoke_llm
+from controllers.postprocessing import clean_translation
 import tiktoken
 import json
 import os
-import re
-import matplotlib
-matplotlib.use('Agg')  # Use the Agg backend which doesn't require a GUI
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from pathlib import Path
+from controllers.benchmark_charts import render_charts, chart_payload
+from controllers.benchmark_store import BenchmarkResultStore, improvement_over, nested_dict
+from controllers.stream_histogram import StreamingHistogram, distribution_columns
 
 class BenchmarkController:
     def __init__(self):
         self.results = []
         self.config = self._load_config()
         self.approaches = ["raw", "controlled", "few_shot", "fine_tuned"]
+        self.chart_data = {}
+        self.store = BenchmarkResultStore("tasks")
+        # (model, task_type, approach) -> {"time": histogram, "tokens": histogram}
+        self.histograms = {}
         
     def _load_config(self) -> Dict[str, str]:
         """Load model configuration from config.json"""
@@ -36,41 +40,13 @@ class BenchmarkController:
         # If model_key is not in config, return it as is (might be a direct model name)
         return model_key
     
-    def _clean_translation_output(self, translation: str) -> str:
+    def _clean_translation_output(self, translation: str, target_language: str = None) -> str:
         """
         Clean the translation output by removing any explanations, original text,
         or instructions that might have been included by the LLM.
+        Uses the same rules as TranslationController.
         """
-        # Remove markdown formatting if present
-        translation = re.sub(r'^```.*?\n', '', translation)
-        translation = re.sub(r'\n```$', '', translation)
-        
-        # Remove phrases that indicate explanations or instructions
-        explanation_patterns = [
-            r'(?i)La respuesta debe.*?contener',
-            r'(?i)The response should.*?contain',
-            r'(?i)Texto original en inglés.*?',
-            r'(?i)Original English text.*?',
-            r'(?i)Translation:',
-            r'(?i)Traducción:',
-            r'(?i)Übersetzung:',
-            r'(?i)y no se deben modificar los datos del entrada',
-            r'(?i)and don\'t alter input text',
-            r'\"[^\"]*?\"',  # Remove quoted text which often contains original text
-        ]
-        
-        for pattern in explanation_patterns:
-            translation = re.sub(pattern, '', translation)
-        
-        # Remove any lines that are too short (likely not part of the translation)
-        lines = translation.split('\n')
-        filtered_lines = [line for line in lines if len(line.strip()) > 5]
-        translation = ' '.join(filtered_lines)
-        
-        # Remove extra spaces
-        translation = re.sub(r'\s+', ' ', translation).strip()
-        
-        return translation
+        return clean_translation(translation, target_language)
         
     def _generate_raw_response(self, text: str, task_type: str, model: str, target_language: str = "german") -> dict:
         """Generate response without controller"""
@@ -80,7 +56,6 @@ class BenchmarkController:
         try:
             # Get the actual model name from config
             model_name = self._get_model_name(model)
-            llm = Ollama(model=model_name, temperature=0)
             
             # Basic prompt based on task
             prompts = {
@@ -106,11 +81,11 @@ class BenchmarkController:
                 # For non-translation tasks
                 final_prompt = f"{prompts[task_type]}{text}"
             
-            response = llm.invoke(final_prompt)
+            response = invoke_llm(model_name, final_prompt)
             
             # Clean the output for translation tasks
             if task_type == "translation":
-                response = self._clean_translation_output(response)
+                response = self._clean_translation_output(response, target_language)
             
             # Calculate tokens
             encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
@@ -150,7 +125,6 @@ class BenchmarkController:
         try:
             # Get the actual model name from config
             model_name = self._get_model_name(model)
-            llm = Ollama(model=model_name, temperature=0)
             
             # Few-shot examples for each task type
             few_shot_examples = {
@@ -241,11 +215,11 @@ class BenchmarkController:
                 # For non-translation tasks
                 final_prompt = f"{few_shot_examples[task_type]} {text}"
             
-            response = llm.invoke(final_prompt)
+            response = invoke_llm(model_name, final_prompt)
             
             # Clean the output for translation tasks
             if task_type == "translation":
-                response = self._clean_translation_output(response)
+                response = self._clean_translation_output(response, target_language)
             
             # Calculate tokens
             encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
@@ -291,7 +265,6 @@ class BenchmarkController:
         try:
             # Get the actual model name from config
             model_name = self._get_model_name(model)
-            llm = Ollama(model=model_name, temperature=0)
             
             # Simple prompts for fine-tuned models (they need less instruction)
             prompts = {
@@ -451,7 +424,7 @@ class BenchmarkController:
                 "approach": "controlled"
             }
 
-    def run_comprehensive_benchmark(self, test_cases: List[Dict[str, Any]], models: List[str], target_language: str = "german") -> Dict[str, Any]:
+    def run_comprehensive_benchmark(self, test_cases: List[Dict[str, Any]], models: List[str], target_language: str = "german", render_charts: bool = True) -> Dict[str, Any]:
         """
         Run comprehensive benchmarks for all approaches across multiple models
         
@@ -459,10 +432,15 @@ class BenchmarkController:
             test_cases: List of test cases with text and type
             models: List of model keys to benchmark
             target_language: Target language for translation tasks
+            render_charts: Render PNG charts; when False only the chart data is kept (see chart_data)
             
         Returns:
             Dictionary with comprehensive benchmark results
         """
+        # Every generation becomes one row of the run's columnar store
+        self.store = BenchmarkResultStore("tasks")
+        self.histograms = {}
+        
         benchmark_results = {
             "timestamp": datetime.now().isoformat(),
             "target_language": target_language,
@@ -497,220 +475,151 @@ class BenchmarkController:
                     }
                 }
                 benchmark_results["models"][model]["results"].append(result)
-            
-            # Calculate model-specific metrics
-            benchmark_results["models"][model]["metrics"] = self._calculate_model_metrics(
-                benchmark_results["models"][model]["results"]
-            )
+                self._record_result(model, result)
         
-        # Calculate comparative metrics across models
-        benchmark_results["comparative_metrics"] = self._calculate_comparative_metrics(benchmark_results["models"])
+        # Calculate model-specific and comparative metrics from the store in one pass each
+        frame = self.store.to_frame()
+        for model, model_rows in frame.groupby("model", sort=False):
+            benchmark_results["models"][model]["metrics"] = self._calculate_model_metrics(model, model_rows)
+        benchmark_results["comparative_metrics"] = self._calculate_comparative_metrics(frame)
         
         # Save results
         self._save_comprehensive_results(benchmark_results)
         
         # Generate visualizations
-        self._generate_visualizations(benchmark_results)
+        self._generate_visualizations(benchmark_results, render_charts)
         
         return benchmark_results
 
-    def _calculate_model_metrics(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Calculate metrics for a specific model"""
+    def _record_result(self, model: str, result: Dict[str, Any]):
+        """Add one test case's generations (one per approach) to the run's result store"""
+        for approach, approach_data in result["approaches"].items():
+            self.store.record(
+                model=model,
+                approach=approach,
+                task_type=result["task_type"],
+                input_length=result["input_length"],
+                latency=approach_data["time_taken"],
+                input_tokens=approach_data["tokens"]["input"],
+                output_tokens=approach_data["tokens"]["output"],
+                tokens=approach_data["tokens"]["total"],
+                retries=approach_data.get("retries", 0),
+                error="error" in approach_data
+            )
+            
+            histograms = self.histograms.setdefault(
+                (model, result["task_type"], approach),
+                {"time": StreamingHistogram(), "tokens": StreamingHistogram()}
+            )
+            histograms["time"].record(approach_data["time_taken"])
+            histograms["tokens"].record(approach_data["tokens"]["total"])
+
+    def _merged_histograms(self, model: str, approach: str) -> Dict[str, StreamingHistogram]:
+        """Time and token histograms of one model and approach, merged across task types"""
+        merged = {"time": StreamingHistogram(), "tokens": StreamingHistogram()}
+        for (hist_model, _, hist_approach), histograms in self.histograms.items():
+            if (hist_model, hist_approach) == (model, approach):
+                for metric, histogram in histograms.items():
+                    merged[metric].merge(histogram)
+        return merged
+
+    def _approach_table(self, frame: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+        """Mean time, tokens and retries (plus the generation count) per group, approaches in benchmark order"""
+        table = frame.groupby(by + ["approach"], sort=False).agg(
+            time=("latency", "mean"),
+            tokens=("tokens", "mean"),
+            retries=("retries", "mean"),
+            count=("latency", "size")
+        )
+        groups = table.index.droplevel("approach").unique()
+        full_index = pd.MultiIndex.from_tuples(
+            [(*(group if isinstance(group, tuple) else (group,)), approach)
+             for group in groups for approach in self.approaches],
+            names=by + ["approach"]
+        )
+        return table.reindex(full_index, fill_value=0)
+
+    def _calculate_model_metrics(self, model: str, frame: pd.DataFrame) -> Dict[str, Any]:
+        """Calculate metrics for a specific model from its rows in the result store"""
+        frame = frame.assign(input_length=frame["input_length"].astype(int))
+        
+        # Overall and task-specific approach metrics
+        overall = frame.groupby("approach", sort=False)[["latency", "tokens", "retries"]].mean()
+        overall = overall.rename(columns={"latency": "time"}).reindex(self.approaches, fill_value=0)
+        task_specific = self._approach_table(frame, ["task_type"])
+        
+        # Input length impact on time and tokens
+        by_length = frame.groupby(["input_length", "approach"], sort=False)[["latency", "tokens"]].mean()
+        
         metrics = {
-            "approaches": {
-                "raw": {"time": 0, "tokens": 0, "retries": 0},
-                "controlled": {"time": 0, "tokens": 0, "retries": 0},
-                "few_shot": {"time": 0, "tokens": 0, "retries": 0},
-                "fine_tuned": {"time": 0, "tokens": 0, "retries": 0}
-            },
-            "task_specific": {},
+            "approaches": overall.to_dict(orient="index"),
+            "task_specific": nested_dict(task_specific),
             "input_length_impact": {
-                "time": {},
-                "tokens": {},
+                "time": by_length["latency"].unstack("approach").to_dict(orient="index"),
+                "tokens": by_length["tokens"].unstack("approach").to_dict(orient="index"),
                 "quality": {}  # Quality is subjective and would need human evaluation
-            }
+            },
+            "distributions": {}
         }
         
-        # Group results by input length
-        input_length_groups = {}
-        for result in results:
-            input_length = result["input_length"]
-            if input_length not in input_length_groups:
-                input_length_groups[input_length] = []
-            input_length_groups[input_length].append(result)
+        # Tail latency and token spread, overall and per task
+        for approach in self.approaches:
+            merged = self._merged_histograms(model, approach)
+            metrics["approaches"][approach].update(distribution_columns(merged["time"], "time"))
+            metrics["approaches"][approach].update(distribution_columns(merged["tokens"], "tokens"))
+            # Mergeable histogram state, so results of several runs can be combined
+            metrics["distributions"][approach] = {metric: histogram.to_dict() for metric, histogram in merged.items()}
         
-        # Calculate metrics by input length
-        for length, length_results in input_length_groups.items():
-            metrics["input_length_impact"]["time"][length] = {}
-            metrics["input_length_impact"]["tokens"][length] = {}
-            
+        for task, task_metrics in metrics["task_specific"].items():
             for approach in self.approaches:
-                time_values = [r["approaches"][approach]["time_taken"] for r in length_results]
-                token_values = [r["approaches"][approach]["tokens"]["total"] for r in length_results]
-                
-                metrics["input_length_impact"]["time"][length][approach] = sum(time_values) / len(time_values)
-                metrics["input_length_impact"]["tokens"][length][approach] = sum(token_values) / len(token_values)
-        
-        # Calculate overall approach metrics
-        for result in results:
-            task = result["task_type"]
-            if task not in metrics["task_specific"]:
-                metrics["task_specific"][task] = {
-                    "raw": {"time": 0, "tokens": 0, "retries": 0, "count": 0},
-                    "controlled": {"time": 0, "tokens": 0, "retries": 0, "count": 0},
-                    "few_shot": {"time": 0, "tokens": 0, "retries": 0, "count": 0},
-                    "fine_tuned": {"time": 0, "tokens": 0, "retries": 0, "count": 0}
-                }
-            
-            for approach in self.approaches:
-                approach_data = result["approaches"][approach]
-                
-                # Update overall approach metrics
-                metrics["approaches"][approach]["time"] += approach_data["time_taken"]
-                metrics["approaches"][approach]["tokens"] += approach_data["tokens"]["total"]
-                metrics["approaches"][approach]["retries"] += approach_data.get("retries", 0)
-                
-                # Update task-specific metrics
-                metrics["task_specific"][task][approach]["time"] += approach_data["time_taken"]
-                metrics["task_specific"][task][approach]["tokens"] += approach_data["tokens"]["total"]
-                metrics["task_specific"][task][approach]["retries"] += approach_data.get("retries", 0)
-                metrics["task_specific"][task][approach]["count"] += 1
-        
-        # Calculate averages for task-specific metrics
-        for task in metrics["task_specific"]:
-            for approach in self.approaches:
-                count = metrics["task_specific"][task][approach]["count"]
-                if count > 0:
-                    metrics["task_specific"][task][approach]["time"] /= count
-                    metrics["task_specific"][task][approach]["tokens"] /= count
-                    metrics["task_specific"][task][approach]["retries"] /= count
-        
-        # Calculate averages for overall approach metrics
-        result_count = len(results)
-        if result_count > 0:
-            for approach in self.approaches:
-                metrics["approaches"][approach]["time"] /= result_count
-                metrics["approaches"][approach]["tokens"] /= result_count
-                metrics["approaches"][approach]["retries"] /= result_count
+                histograms = self.histograms.get((model, task, approach), {})
+                task_metrics[approach].update(distribution_columns(histograms.get("time"), "time"))
         
         return metrics
 
-    def _calculate_comparative_metrics(self, models_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Calculate comparative metrics across models"""
+    def _calculate_comparative_metrics(self, frame: pd.DataFrame) -> Dict[str, Any]:
+        """Calculate comparative metrics across models from the run's result store"""
         comparative_metrics = {
             "best_performing": {
                 "time": {},
                 "tokens": {},
                 "retries": {}
             },
-            "improvement_percentages": {
-                "controlled_vs_raw": {},
-                "few_shot_vs_raw": {},
-                "fine_tuned_vs_raw": {}
-            },
+            "improvement_percentages": {},
             "task_specific_best": {}
         }
         
+        table = frame.groupby(["model", "approach"], sort=False)[["latency", "tokens", "retries"]].mean()
+        table = table.rename(columns={"latency": "time"})
+        
         # Find best performing model for each metric
         for metric in ["time", "tokens", "retries"]:
+            values = table[metric].unstack("model")
             for approach in self.approaches:
-                best_model = None
-                best_value = float('inf')
-                
-                for model_key, model_data in models_data.items():
-                    value = model_data["metrics"]["approaches"][approach][metric]
-                    if value < best_value:
-                        best_value = value
-                        best_model = model_key
-                
+                best_model = values.loc[approach].idxmin()
                 comparative_metrics["best_performing"][metric][approach] = {
                     "model": best_model,
-                    "value": best_value
+                    "value": values.loc[approach, best_model]
                 }
         
-        # Calculate improvement percentages
-        for model_key, model_data in models_data.items():
-            comparative_metrics["improvement_percentages"]["controlled_vs_raw"][model_key] = {
-                "time": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["time"],
-                    model_data["metrics"]["approaches"]["controlled"]["time"]
-                ),
-                "tokens": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["tokens"],
-                    model_data["metrics"]["approaches"]["controlled"]["tokens"]
-                ),
-                "retries": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["retries"],
-                    model_data["metrics"]["approaches"]["controlled"]["retries"]
-                )
-            }
-            
-            comparative_metrics["improvement_percentages"]["few_shot_vs_raw"][model_key] = {
-                "time": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["time"],
-                    model_data["metrics"]["approaches"]["few_shot"]["time"]
-                ),
-                "tokens": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["tokens"],
-                    model_data["metrics"]["approaches"]["few_shot"]["tokens"]
-                ),
-                "retries": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["retries"],
-                    model_data["metrics"]["approaches"]["few_shot"]["retries"]
-                )
-            }
-            
-            comparative_metrics["improvement_percentages"]["fine_tuned_vs_raw"][model_key] = {
-                "time": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["time"],
-                    model_data["metrics"]["approaches"]["fine_tuned"]["time"]
-                ),
-                "tokens": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["tokens"],
-                    model_data["metrics"]["approaches"]["fine_tuned"]["tokens"]
-                ),
-                "retries": self._calculate_improvement_percentage(
-                    model_data["metrics"]["approaches"]["raw"]["retries"],
-                    model_data["metrics"]["approaches"]["fine_tuned"]["retries"]
-                )
-            }
+        # Calculate improvement percentages over the raw approach
+        improvements = improvement_over(table, "raw", lower_is_better=["time", "tokens", "retries"]).round(2)
+        for approach in self.approaches[1:]:
+            comparative_metrics["improvement_percentages"][f"{approach}_vs_raw"] = (
+                improvements.xs(approach, level="approach").to_dict(orient="index")
+            )
         
         # Find best performing model for each task
-        task_types = set()
-        for model_data in models_data.values():
-            for result in model_data["results"]:
-                task_types.add(result["task_type"])
-        
-        for task in task_types:
-            comparative_metrics["task_specific_best"][task] = {}
-            
-            for approach in self.approaches:
-                best_model = None
-                best_time = float('inf')
-                
-                for model_key, model_data in models_data.items():
-                    if task in model_data["metrics"]["task_specific"]:
-                        time_value = model_data["metrics"]["task_specific"][task][approach]["time"]
-                        if time_value < best_time:
-                            best_time = time_value
-                            best_model = model_key
-                
-                comparative_metrics["task_specific_best"][task][approach] = {
-                    "model": best_model,
-                    "time": best_time
-                }
+        task_times = frame.groupby(["task_type", "approach", "model"], sort=False)["latency"].mean()
+        for (task, approach), times in task_times.groupby(level=["task_type", "approach"], sort=False):
+            best = times.idxmin()
+            comparative_metrics["task_specific_best"].setdefault(task, {})[approach] = {
+                "model": best[-1],
+                "time": times[best]
+            }
         
         return comparative_metrics
 
-    def _calculate_improvement_percentage(self, baseline_value: float, improved_value: float) -> float:
-        """Calculate improvement percentage"""
-        if baseline_value == 0:
-            return 0
-        
-        improvement = baseline_value - improved_value
-        percentage = (improvement / baseline_value) * 100
-        return round(percentage, 2)
-
     def _save_comprehensive_results(self, results: Dict[str, Any]):
         """Save comprehensive benchmark results to file"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -723,17 +632,24 @@ class BenchmarkController:
         
         with open(f"logs/{filename}", "w") as f:
             json.dump(results, f, indent=2)
+        
+        # Per-generation rows go to Parquet for cross-run analysis
+        self.store.save()
             
     def get_available_models(self) -> List[str]:
         """Return list of available models from config"""
         return list(self.config.keys())
 
-    def _generate_visualizations(self, benchmark_results):
+    def _generate_visualizations(self, benchmark_results, render_charts_enabled=True):
         """
         Generate visualizations for benchmark results
         
         Args:
             benchmark_results: Dictionary with benchmark results
+            render_charts_enabled: Render PNG files; chart data is collected either way
+            
+        Returns:
+            Chart data keyed by chart id
         """
         # Create output directory for visualizations
         output_dir = Path("logs/visualizations")
@@ -750,168 +666,136 @@ class BenchmarkController:
         for model in models:
             for result in benchmark_results["models"][model]["results"]:
                 task_types.add(result["task_type"])
+        task_types = sorted(task_types)
+        
+        specs = []
         
         # 1. Generate task-specific processing time charts
         for task_type in task_types:
-            self._generate_task_processing_time_chart(benchmark_results, models, approaches, task_type, output_dir, timestamp)
+            specs.append(self._generate_task_processing_time_chart(benchmark_results, models, approaches, task_type, output_dir, timestamp))
         
         # 2. Generate task-specific token utilization charts
         for task_type in task_types:
-            self._generate_task_token_utilization_chart(benchmark_results, models, approaches, task_type, output_dir, timestamp)
+            specs.append(self._generate_task_token_utilization_chart(benchmark_results, models, approaches, task_type, output_dir, timestamp))
         
         # 3. Generate combined task comparison charts
-        self._generate_combined_task_comparison_chart(benchmark_results, models, approaches, task_types, output_dir, timestamp)
+        specs.extend(self._generate_combined_task_comparison_chart(benchmark_results, models, approaches, task_types, output_dir, timestamp))
+        
+        self.chart_data = {spec["id"]: chart_payload(spec) for spec in specs}
         
         # 4. Generate comparison tables for all tasks
         self._generate_comparison_tables(benchmark_results, models, approaches, output_dir, timestamp)
         
+        if not render_charts_enabled:
+            print(f"Chart rendering disabled, kept data for {len(specs)} charts")
+            return self.chart_data
+        
+        # Render all charts in parallel worker processes
+        render_charts(specs)
+        
         print(f"Visualizations saved to {output_dir}")
+        return self.chart_data
+
+    def _task_metric_by_model(self, benchmark_results, models, approaches, task_type, metric):
+        """Collect a task-specific metric per approach, one value per model"""
+        series = {}
+        for approach in approaches:
+            values = []
+            for model in models:
+                task_metrics = benchmark_results["models"][model]["metrics"]["task_specific"]
+                # Default to 0 if no data for this task
+                values.append(task_metrics[task_type][approach][metric] if task_type in task_metrics else 0)
+            series[approach.replace('_', ' ').title()] = values
+        return series
 
     def _generate_task_processing_time_chart(self, benchmark_results, models, approaches, task_type, output_dir, timestamp):
-        """Generate bar chart of models and processing time for a specific task"""
-        plt.figure(figsize=(12, 8))
-        
-        # Prepare data
-        data = []
-        for model in models:
-            model_data = []
-            for approach in approaches:
-                # Get task-specific metrics if available
-                if task_type in benchmark_results["models"][model]["metrics"]["task_specific"]:
-                    model_data.append(benchmark_results["models"][model]["metrics"]["task_specific"][task_type][approach]["time"])
-                else:
-                    model_data.append(0)  # Default if no data for this task
-            data.append(model_data)
-        
-        # Set up bar chart
-        x = np.arange(len(models))
-        width = 0.2
-        
-        # Plot bars
-        for i, approach in enumerate(approaches):
-            plt.bar(x + (i - 1.5) * width, [data[j][i] for j in range(len(models))], 
-                    width, label=approach.replace('_', ' ').title())
-        
-        # Add labels and legend
-        plt.xlabel('Models')
-        plt.ylabel('Processing Time (seconds)')
-        plt.title(f'Processing Time by Model and Approach for {task_type.title()} Task')
-        plt.xticks(x, models)
-        plt.legend()
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # Save figure
-        plt.tight_layout()
-        plt.savefig(output_dir / f"{task_type}_processing_time_{timestamp}.png", dpi=300)
-        plt.close()
+        """Build the bar chart spec of models and processing time for a specific task"""
+        return {
+            "id": f"{task_type}_processing_time",
+            "kind": "grouped_bar",
+            "path": str(output_dir / f"{task_type}_processing_time_{timestamp}.png"),
+            "figsize": (12, 8),
+            "data": {
+                "panels": [{
+                    "title": f"Processing Time by Model and Approach for {task_type.title()} Task",
+                    "xlabel": "Models",
+                    "ylabel": "Processing Time (seconds)",
+                    "categories": models,
+                    "series": self._task_metric_by_model(benchmark_results, models, approaches, task_type, "time")
+                }]
+            }
+        }
 
     def _generate_task_token_utilization_chart(self, benchmark_results, models, approaches, task_type, output_dir, timestamp):
-        """Generate bar chart of models and token utilization for a specific task"""
-        plt.figure(figsize=(12, 8))
-        
-        # Prepare data
-        data = []
-        for model in models:
-            model_data = []
-            for approach in approaches:
-                # Get task-specific metrics if available
-                if task_type in benchmark_results["models"][model]["metrics"]["task_specific"]:
-                    model_data.append(benchmark_results["models"][model]["metrics"]["task_specific"][task_type][approach]["tokens"])
-                else:
-                    model_data.append(0)  # Default if no data for this task
-            data.append(model_data)
-        
-        # Set up bar chart
-        x = np.arange(len(models))
-        width = 0.2
-        
-        # Plot bars
-        for i, approach in enumerate(approaches):
-            plt.bar(x + (i - 1.5) * width, [data[j][i] for j in range(len(models))], 
-                    width, label=approach.replace('_', ' ').title())
-        
-        # Add labels and legend
-        plt.xlabel('Models')
-        plt.ylabel('Tokens Utilized')
-        plt.title(f'Token Utilization by Model and Approach for {task_type.title()} Task')
-        plt.xticks(x, models)
-        plt.legend()
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # Save figure
-        plt.tight_layout()
-        plt.savefig(output_dir / f"{task_type}_token_utilization_{timestamp}.png", dpi=300)
-        plt.close()
+        """Build the bar chart spec of models and token utilization for a specific task"""
+        return {
+            "id": f"{task_type}_token_utilization",
+            "kind": "grouped_bar",
+            "path": str(output_dir / f"{task_type}_token_utilization_{timestamp}.png"),
+            "figsize": (12, 8),
+            "data": {
+                "panels": [{
+                    "title": f"Token Utilization by Model and Approach for {task_type.title()} Task",
+                    "xlabel": "Models",
+                    "ylabel": "Tokens Utilized",
+                    "categories": models,
+                    "series": self._task_metric_by_model(benchmark_results, models, approaches, task_type, "tokens")
+                }]
+            }
+        }
 
     def _generate_combined_task_comparison_chart(self, benchmark_results, models, approaches, task_types, output_dir, timestamp):
-        """Generate charts comparing all tasks for each approach"""
+        """Build chart specs comparing all tasks for each approach (processing time and tokens)"""
+        specs = []
         
-        # For each approach, create a chart comparing tasks
         for approach in approaches:
-            plt.figure(figsize=(14, 10))
-            
-            # Prepare data for processing time
-            task_data = {task: [] for task in task_types}
+            time_data = {task: [] for task in task_types}
+            token_data = {task: [] for task in task_types}
             
             for model in models:
+                task_metrics = benchmark_results["models"][model]["metrics"]["task_specific"]
                 for task in task_types:
-                    if task in benchmark_results["models"][model]["metrics"]["task_specific"]:
-                        task_data[task].append(benchmark_results["models"][model]["metrics"]["task_specific"][task][approach]["time"])
-                else:
-                        task_data[task].append(0)  # Default if no data
-            
-            # Set up bar chart
-            x = np.arange(len(models))
-            width = 0.8 / len(task_types)
-            
-            # Plot bars for each task
-            for i, task in enumerate(task_types):
-                offset = (i - len(task_types)/2 + 0.5) * width
-                plt.bar(x + offset, task_data[task], width, label=task.title())
-            
-            # Add labels and legend
-            plt.xlabel('Models')
-        plt.ylabel('Processing Time (seconds)')
-        plt.title(f'Task Comparison for {approach.replace("_", " ").title()} Approach')
-        plt.xticks(x, models)
-        plt.legend()
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            # Save figure
-        plt.tight_layout()
-        plt.savefig(output_dir / f"task_comparison_{approach}_{timestamp}.png", dpi=300)
-        plt.close()
+                    if task in task_metrics:
+                        time_data[task].append(task_metrics[task][approach]["time"])
+                        token_data[task].append(task_metrics[task][approach]["tokens"])
+                    else:
+                        # Default if no data
+                        time_data[task].append(0)
+                        token_data[task].append(0)
+            
+            specs.append({
+                "id": f"task_comparison_{approach}",
+                "kind": "grouped_bar",
+                "path": str(output_dir / f"task_comparison_{approach}_{timestamp}.png"),
+                "figsize": (14, 10),
+                "data": {
+                    "panels": [{
+                        "title": f'Task Comparison for {approach.replace("_", " ").title()} Approach',
+                        "xlabel": "Models",
+                        "ylabel": "Processing Time (seconds)",
+                        "categories": models,
+                        "series": {task.title(): time_data[task] for task in task_types}
+                    }]
+                }
+            })
+            
+            specs.append({
+                "id": f"task_token_comparison_{approach}",
+                "kind": "grouped_bar",
+                "path": str(output_dir / f"task_token_comparison_{approach}_{timestamp}.png"),
+                "figsize": (14, 10),
+                "data": {
+                    "panels": [{
+                        "title": f'Token Utilization by Task for {approach.replace("_", " ").title()} Approach',
+                        "xlabel": "Models",
+                        "ylabel": "Tokens Utilized",
+                        "categories": models,
+                        "series": {task.title(): token_data[task] for task in task_types}
+                    }]
+                }
+            })
         
-            # Also create a token utilization comparison
-        plt.figure(figsize=(14, 10))
-            
-            # Prepare data for token utilization
-        token_data = {task: [] for task in task_types}
-            
-        for model in models:
-            for task in task_types:
-                if task in benchmark_results["models"][model]["metrics"]["task_specific"]:
-                    token_data[task].append(benchmark_results["models"][model]["metrics"]["task_specific"][task][approach]["tokens"])
-                else:
-                    token_data[task].append(0)  # Default if no data
-            
-            # Plot bars for each task
-            for i, task in enumerate(task_types):
-                offset = (i - len(task_types)/2 + 0.5) * width
-                plt.bar(x + offset, token_data[task], width, label=task.title())
-            
-            # Add labels and legend
-        plt.xlabel('Models')
-        plt.ylabel('Tokens Utilized')
-        plt.title(f'Token Utilization by Task for {approach.replace("_", " ").title()} Approach')
-        plt.xticks(x, models)
-        plt.legend()
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            # Save figure
-        plt.tight_layout()
-        plt.savefig(output_dir / f"task_token_comparison_{approach}_{timestamp}.png", dpi=300)
-        plt.close()
+        return specs
         
     def _generate_comparison_tables(self, benchmark_results, models, approaches, output_dir, timestamp):
         """
@@ -924,62 +808,39 @@ class BenchmarkController:
             output_dir: Directory to save the tables
             timestamp: Timestamp for file naming
         """
-        # Get all task types from the benchmark results
-        task_types = set()
-        for model in models:
-            for result in benchmark_results["models"][model]["results"]:
-                task_types.add(result["type"])
+        frame = self.store.to_frame()
+        task_table = self._approach_table(frame, ["task_type", "model"])
         
         # Create a table for each task type
-        for task_type in task_types:
-            # Create a DataFrame for this task
-            columns = ["Model", "Parameter", "Temperature", "Turns", "Processing time", "Tokens utilized"]
-            # Add approach columns
-            for approach in approaches:
-                columns.append(approach.replace('_', ' ').title())
-            
-            # Initialize the DataFrame with empty rows for each model
+        for task_type, task_rows in task_table.groupby(level="task_type", sort=False):
+            task_rows = task_rows.droplevel("task_type")
             table_data = []
             
-            # Fill in data for each model
+            # Fill in data for each model that ran this task
             for model in models:
+                if model not in task_rows.index.get_level_values("model"):
+                    continue
                 model_metrics = benchmark_results["models"][model]["metrics"]
+                first_approach = task_rows.loc[(model, approaches[0])]
                 
-                # Filter results for this task type
-                task_results = [r for r in benchmark_results["models"][model]["results"] if r["type"] == task_type]
-                
-                if not task_results:
-                    continue
-                    
                 # Basic model info (same for all approaches)
                 row = {
                     "Model": model,
                     "Parameter": model_metrics.get("parameter", "N/A"),
                     "Temperature": 0,  # Assuming temperature is 0 as set in _generate_raw_response
                     "Turns": 1,  # Assuming single turn for all approaches
+                    "Processing time": f"{first_approach['time']:.2f}s",
+                    "Tokens utilized": round(first_approach['tokens'], 1)
                 }
                 
-                # Add metrics for each approach
+                # Tail latency of the same approach
+                time_histogram = self.histograms[(model, task_type, approaches[0])]["time"]
+                for name, q in [("P50", 0.50), ("P95", 0.95), ("P99", 0.99)]:
+                    row[f"Processing time {name}"] = f"{time_histogram.quantile(q):.2f}s"
+                
+                # Quality scores (BLEU, accuracy) are not measured by this benchmark yet
                 for approach in approaches:
-                    approach_metrics = model_metrics["approaches"][approach]
-                    
-                    # If this is the first approach, add the common metrics
-                    if approach == approaches[0]:
-                        row["Processing time"] = f"{approach_metrics['time']:.2f}s"
-                        row["Tokens utilized"] = approach_metrics['tokens']
-                    
-                    # Add the approach-specific column
-                    # For the approach column, we could use accuracy or other relevant metric
-                    if task_type == "translation":
-                        row[approach.replace('_', ' ').title()] = f"{approach_metrics.get('bleu', 'N/A'):.2f}"
-                    elif task_type == "json":
-                        row[approach.replace('_', ' ').title()] = f"{approach_metrics.get('accuracy', 'N/A'):.2f}"
-                    elif task_type == "sql":
-                        row[approach.replace('_', ' ').title()] = f"{approach_metrics.get('accuracy', 'N/A'):.2f}"
-                    elif task_type == "sentiment":
-                        row[approach.replace('_', ' ').title()] = f"{approach_metrics.get('accuracy', 'N/A'):.2f}"
-                    else:
-                        row[approach.replace('_', ' ').title()] = "N/A"
+                    row[approach.replace('_', ' ').title()] = "N/A"
                 
                 table_data.append(row)
             
@@ -993,4 +854,4 @@ class BenchmarkController:
                 json_path = output_dir / f"{task_type}_comparison_table_{timestamp}.json"
                 df.to_json(json_path, orient="records")
                 
-                print(f"Comparison table for {task_type} saved to {csv_path} and {json_path}") 
\ No newline at end of file
+                print(f"Comparison table for {task_type} saved to {csv_path} and {json_path}")
@@ -0,0 +1,145 @@
+import glob
+import os
+from datetime import datetime
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+RUNS_DIR = os.path.join("logs", "benchmark_runs")
+
+
+class BenchmarkResultStore:
+    """
+    Columnar store with one row per benchmark generation
+
+    Values are appended column by column, so turning a run into a DataFrame
+    (and from there into Parquet) needs no per-row conversion. Aggregations,
+    comparison tables and cross-run queries all work on that frame.
+    """
+
+    # Column name -> pandas dtype
+    COLUMNS = {
+        "run_id": "string",
+        "benchmark": "string",
+        "model": "string",
+        "approach": "string",
+        "complexity": "string",
+        "task_type": "string",
+        "domain": "string",
+        "original_complexity": "string",
+        "input_length": "float64",
+        "latency": "float64",
+        "input_tokens": "float64",
+        "output_tokens": "float64",
+        "tokens": "float64",
+        "retries": "float64",
+        "error": "bool",
+        "exact_match": "float64",
+        "execution_match": "float64",
+        "component_match": "float64",
+        "token_efficiency": "float64",
+        "semantic_similarity": "float64",
+    }
+
+    def __init__(self, benchmark: str, run_id: str = None):
+        self.benchmark = benchmark
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._columns = {name: [] for name in self.COLUMNS}
+
+    def __len__(self):
+        return len(self._columns["run_id"])
+
+    def record(self, **values):
+        """Append one generation; columns that don't apply are stored as missing"""
+        values.setdefault("run_id", self.run_id)
+        values.setdefault("benchmark", self.benchmark)
+        values.setdefault("error", False)
+
+        for name, column in self._columns.items():
+            column.append(values.get(name))
+
+    def to_frame(self) -> pd.DataFrame:
+        """The run as a typed DataFrame"""
+        frame = pd.DataFrame(self._columns)
+        for name, dtype in self.COLUMNS.items():
+            if dtype == "float64":
+                frame[name] = pd.to_numeric(frame[name], errors="coerce").astype(dtype)
+            else:
+                frame[name] = frame[name].astype(dtype)
+        return frame
+
+    def save(self, directory: str = RUNS_DIR) -> str:
+        """Write the run to Parquet and return the file path"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.benchmark}_{self.run_id}.parquet")
+        self.to_frame().to_parquet(path, index=False)
+        return path
+
+
+def load_runs(directory: str = RUNS_DIR, benchmark: str = None) -> pd.DataFrame:
+    """Load every saved run (optionally of one benchmark type) into a single frame"""
+    pattern = f"{benchmark}_*.parquet" if benchmark else "*.parquet"
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if not paths:
+        return BenchmarkResultStore("empty").to_frame()
+    return pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+
+
+def summarize(frame: pd.DataFrame, by: List[str], metrics: List[str] = None) -> pd.DataFrame:
+    """
+    Mean of each metric and the generation count per group
+
+    Args:
+        frame: Rows from a BenchmarkResultStore (one run or several)
+        by: Columns to group on, e.g. ["model", "approach"]
+        metrics: Numeric columns to average (defaults to latency, tokens and the scores)
+    """
+    metrics = metrics or [
+        "latency", "tokens", "retries", "exact_match", "execution_match",
+        "component_match", "token_efficiency", "semantic_similarity"
+    ]
+    grouped = frame.groupby(by, sort=False)
+    summary = grouped[metrics].mean()
+    summary["count"] = grouped.size()
+    summary["errors"] = grouped["error"].sum()
+    return summary
+
+
+def improvement_over(table: pd.DataFrame, baseline: str, level: str = "approach",
+                     higher_is_better: List[str] = (), lower_is_better: List[str] = ()) -> pd.DataFrame:
+    """
+    Percentage improvement of every row over the baseline row of its group
+
+    Args:
+        table: Aggregated metrics with a MultiIndex that includes `level`
+        baseline: Index value at `level` to compare against (e.g. "raw")
+        higher_is_better: Metrics where improvement is (value / baseline - 1) * 100
+        lower_is_better: Metrics where improvement is (1 - value / baseline) * 100
+
+    Metrics whose baseline is zero get an improvement of 0, like the
+    controllers' scalar helpers.
+    """
+    base = table.xs(baseline, level=level).reindex(table.index.droplevel(level))
+    base.index = table.index
+
+    improvements = pd.DataFrame(index=table.index)
+    for metric in higher_is_better:
+        ratio = table[metric] / base[metric]
+        improvements[metric] = np.where(base[metric] > 0, (ratio - 1) * 100, 0.0)
+    for metric in lower_is_better:
+        ratio = table[metric] / base[metric]
+        improvements[metric] = np.where(base[metric] > 0, (1 - ratio) * 100, 0.0)
+    return improvements
+
+
+def nested_dict(table: pd.DataFrame) -> Dict[str, Any]:
+    """Turn a frame with a MultiIndex into nested {level0: {level1: {...: {column: value}}}} dicts"""
+    result = {}
+    for index, row in zip(table.index, table.to_dict(orient="records")):
+        keys = index if isinstance(index, tuple) else (index,)
+        node = result
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = row
+    return result
@@ -0,0 +1,283 @@
+import contextvars
+import math
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Any, List, Tuple
+
+from controllers.llm_gateway import invoke_llm, cancel_calls, current_cancel
+from controllers.metrics import REGISTRY
+from controllers.tracing import span
+
+# Hedging defaults; main.py applies the "hedging" section of settings.json
+DEFAULT_HEDGING = {
+    "enabled": False,
+    "controllers": ["SentimentController", "TranslationController"],  # Controllers whose LLM calls may be hedged
+    "backup_models": {},         # Primary model -> model that receives the hedge
+    "delay_percentile": 0.95,    # Hedge once the primary has run longer than this quantile of its latency
+    "window_size": 200,          # Recent primary latencies kept per (controller, model)
+    "window_seconds": 600,       # Older latencies are dropped, so the delay follows the current load
+    "min_samples": 20,           # Recent primary calls needed before the percentile is trusted
+    "default_delay_ms": 1000,    # Delay used until then
+    "min_delay_ms": 50,
+    "max_hedge_rate": 0.1,       # Hedges allowed per eligible call, on average
+    "burst": 5,                  # Hedges that may be sent back to back when the budget is full
+    "max_prompt_chars": 2000,    # Longer prompts are not hedged; their latency is dominated by generation
+}
+
+HEDGE_CALLS = REGISTRY.counter(
+    "aici_hedge_calls_total", "Hedge-eligible LLM calls by what happened to them", ["model", "outcome"]
+)
+HEDGE_WINS = REGISTRY.counter(
+    "aici_hedge_wins_total", "Hedged LLM calls by the side whose answer was used", ["model", "winner"]
+)
+
+
+class HedgeStats:
+    """Counters for one primary model"""
+
+    def __init__(self):
+        self.calls = 0
+        self.hedged = 0
+        self.budget_denied = 0
+        self.primary_wins = 0
+        self.backup_wins = 0
+        self.no_valid_answer = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+            "budget_denied": self.budget_denied,
+            "primary_wins": self.primary_wins,
+            "backup_wins": self.backup_wins,
+            "no_valid_answer": self.no_valid_answer,
+        }
+
+
+class LatencyWindow:
+    """Primary-call latencies of one (controller, model) pair, the newest window_size within window_seconds"""
+
+    def __init__(self, size: int, max_age: float):
+        self.max_age = max_age
+        self._samples = deque(maxlen=size)  # (monotonic time, seconds)
+
+    def add(self, seconds: float):
+        self._samples.append((time.monotonic(), seconds))
+
+    def quantile(self, q: float) -> Tuple[int, float]:
+        """(recent sample count, q-quantile of their latency in seconds)"""
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        if not self._samples:
+            return 0, 0.0
+        latencies = sorted(seconds for _, seconds in self._samples)
+        return len(latencies), latencies[min(len(latencies) - 1, math.ceil(q * len(latencies)) - 1)]
+
+
+class Hedger:
+    """
+    Hedged LLM calls for tail-latency control
+
+    The primary model is called first. If it has not answered after the
+    delay_percentile of its recent latency for the calling controller (a
+    sentiment label and a poem take very different times on the same model),
+    the same prompt goes to the backup
+    model and the first valid answer wins. The other call is cancelled: still
+    queued, it leaves the gateway's queue at once; already generating, it is
+    stopped through its token stream, which frees its slot without counting
+    against the model's health. Hedges draw from a token bucket refilled by max_hedge_rate
+    per eligible call, so a slow backend cannot double its own load.
+    """
+
+    def __init__(self, **settings):
+        self._lock = threading.Lock()
+        self.configure(settings)
+
+    def configure(self, settings: Dict[str, Any] = None):
+        settings = {**DEFAULT_HEDGING, **(settings or {})}
+        with self._lock:
+            self.enabled = settings["enabled"]
+            self.controllers = set(settings["controllers"])
+            self.backup_models = dict(settings["backup_models"])
+            self.delay_percentile = settings["delay_percentile"]
+            self.window_size = settings["window_size"]
+            self.window_seconds = settings["window_seconds"]
+            self.min_samples = settings["min_samples"]
+            self.default_delay = settings["default_delay_ms"] / 1000
+            self.min_delay = settings["min_delay_ms"] / 1000
+            self.max_hedge_rate = settings["max_hedge_rate"]
+            self.burst = settings["burst"]
+            self.max_prompt_chars = settings["max_prompt_chars"]
+            self._tokens = float(self.burst)
+            self._stats: Dict[str, HedgeStats] = {}
+            self._latencies: Dict[Tuple[str, str], LatencyWindow] = {}
+
+    def backup_for(self, controller: str, model: str, prompt: str):
+        """The backup model for this call, or None when it is not hedged"""
+        if not self.enabled or controller not in self.controllers or len(prompt) > self.max_prompt_chars:
+            return None
+        backup = self.backup_models.get(model)
+        return backup if backup and backup != model else None
+
+    def _window(self, controller: str, model: str) -> LatencyWindow:
+        window = self._latencies.get((controller, model))
+        if window is None:
+            window = self._latencies[(controller, model)] = LatencyWindow(self.window_size, self.window_seconds)
+        return window
+
+    def delay_for(self, controller: str, model: str) -> float:
+        """Seconds to wait for the primary before hedging this controller's call"""
+        with self._lock:
+            count, latency = self._window(controller, model).quantile(self.delay_percentile)
+        if count < self.min_samples:
+            return self.default_delay
+        return max(latency, self.min_delay)
+
+    def _record_latency(self, controller: str, model: str, seconds: float):
+        with self._lock:
+            self._window(controller, model).add(seconds)
+
+    def _take_hedge(self, stats: HedgeStats) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                stats.hedged += 1
+                return True
+            stats.budget_denied += 1
+            return False
+
+    def _start(self, model: str, prompt: str, stop: List[str], kwargs: Dict[str, Any], role: str,
+               results: queue.Queue) -> threading.Event:
+        """Run one side of the race in a thread that shares the caller's deadline, priority and trace"""
+        cancel = threading.Event()
+
+        def run():
+            current_cancel.set(cancel)
+            try:
+                results.put((role, invoke_llm(model, prompt, stop=stop, **kwargs), None))
+            except Exception as e:
+                results.put((role, None, e))
+
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name=f"hedge-{role}", daemon=True).start()
+        return cancel
+
+    def invoke(self, controller: str, model: str, prompt: str, accept: Callable[[str], Any] = None,
+               stop: List[str] = None, **kwargs) -> Tuple[str, Any]:
+        """
+        Generate text, hedging to the backup model when the primary is slow
+
+        Args:
+            controller: Calling controller's class name, checked against the configured controllers
+            model: Primary Ollama model
+            prompt: Prompt sent to both models
+            accept: Whether an output is a valid answer (None rejects it); any output is valid without it
+            stop: Stop sequences for both calls
+            kwargs: Passed to both LLM calls
+
+        Returns:
+            (output, value): the output used and what accept() returned for it (the output itself
+            without accept). accept() runs once per output, so callers should not call it again.
+        """
+        check = accept if accept is not None else (lambda output: output)
+        backup = self.backup_for(controller, model, prompt)
+        if backup is None:
+            output = invoke_llm(model, prompt, stop=stop, **kwargs)
+            return output, check(output)
+
+        with self._lock:
+            stats = self._stats.setdefault(model, HedgeStats())
+            stats.calls += 1
+            self._tokens = min(self.burst, self._tokens + self.max_hedge_rate)
+
+        delay = self.delay_for(controller, model)
+        results = queue.Queue()
+        with span("llm.hedge", model=model, backup=backup, delay_ms=delay * 1000) as hedge_span:
+            cancels = {"primary": self._start(model, prompt, stop, kwargs, "primary", results)}
+            started = time.perf_counter()
+            answers = {}
+            hedge_decided = False
+
+            while len(answers) < len(cancels):
+                timeout = None if hedge_decided else max(delay - (time.perf_counter() - started), 0)
+                try:
+                    role, output, error = results.get(timeout=timeout)
+                except queue.Empty:
+                    # The primary is slower than usual: race it against the backup if the budget allows
+                    hedge_decided = True
+                    if self._take_hedge(stats):
+                        cancels["backup"] = self._start(backup, prompt, stop, kwargs, "backup", results)
+                    continue
+
+                value = check(output) if error is None else None
+                answers[role] = (output, error, value)
+                if role == "primary":
+                    self._record_latency(controller, model, time.perf_counter() - started)
+                if error is None and value is not None:
+                    for loser, cancel in cancels.items():
+                        if loser != role:
+                            cancel_calls(cancel)
+                    if role == "backup" and "primary" not in answers:
+                        # The primary has run at least this long; leaving it out would bias the delay low
+                        self._record_latency(controller, model, time.perf_counter() - started)
+                    self._record(model, stats, hedge_decided, len(cancels) > 1, role, hedge_span)
+                    return output, value
+                if not hedge_decided:
+                    # The primary answered before the delay; hedging is about latency, not retries
+                    break
+
+            self._record(model, stats, hedge_decided, len(cancels) > 1, None, hedge_span)
+
+        # No valid answer: hand the primary's outcome to the caller (its retry policy decides what next)
+        output, error, value = answers.get("primary") or answers["backup"]
+        if error is not None:
+            raise error
+        return output, value
+
+    def _record(self, model: str, stats: HedgeStats, slow: bool, hedged: bool, winner: str, hedge_span):
+        """Count one finished call; winner is the role whose answer was used, None if neither was valid"""
+        if hedged:
+            outcome = "hedged"
+        else:
+            outcome = "budget_denied" if slow else "not_needed"
+        with self._lock:
+            if winner is None:
+                stats.no_valid_answer += 1
+            elif hedged:
+                if winner == "primary":
+                    stats.primary_wins += 1
+                else:
+                    stats.backup_wins += 1
+        HEDGE_CALLS.inc(model=model, outcome=outcome)
+        if hedged and winner is not None:
+            HEDGE_WINS.inc(model=model, winner=winner)
+        if hedge_span is not None:
+            hedge_span.set(outcome=outcome, winner=winner)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedging settings summary and per-model counters"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "budget_tokens": self._tokens,
+                "models": {model: stats.to_dict() for model, stats in self._stats.items()},
+            }
+
+
+hedger = Hedger()
+
+
+def hedged_invoke(controller: str, model: str, prompt: str, accept: Callable[[str], Any] = None,
+                  stop: List[str] = None, **kwargs) -> str:
+    """Generate text through the shared hedger (see Hedger.invoke); returns only the output"""
+    return hedger.invoke(controller, model, prompt, accept, stop=stop, **kwargs)[0]
+
+
+def hedged_accept(controller: str, model: str, prompt: str, accept: Callable[[str], Any],
+                  stop: List[str] = None, **kwargs) -> Tuple[str, Any]:
+    """(output, accept(output)) through the shared hedger, with accept run once"""
+    return hedger.invoke(controller, model, prompt, accept, stop=stop, **kwargs)
@@ -1,9 +1,106 @@
+import codecs
 import re
 from datetime import datetime
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Iterable, Iterator
 import json
-from jsonschema import validate
 import jsonschema
+from controllers.schema_cache import validator_cache, validate_cached
+from controllers.tracing import span
+
+# Characters read from the input per step in streaming mode
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Longest text without a record boundary a stream may hold; longer input ends the stream
+MAX_SEGMENT_CHARS = 1024 * 1024
+
+# Where streamed text can be cut without changing what is extracted. A user block ends at the
+# first ". <letter>" after at least one character past its "earns ₹<amount> ", so the one
+# boundary a block can span is the one right after that space; boundaries after "<digit or
+# comma> " are never cut at. One after a newline isn't either, since a cut there would make the
+# newline the segment's last character, which a block end ($) treats specially.
+RECORD_BOUNDARY = re.compile(r'(?<![\d,] )(?<!\n)\. (?=[A-Za-z])')
+
+# Building blocks of the extraction scanner. None of them can backtrack more than
+# a constant amount, so a scan is linear in the input whatever the input is.
+_NAME_RUN = re.compile(r'[A-Za-z\s]+')
+_WORD_RUN = re.compile(r'[\w\s]+')
+_AMOUNT = re.compile(r'[\d,]+')
+_BLOCK_END = re.compile(r'\. [A-Za-z]')
+_SPENDS = re.compile(r'spends ₹([\d,]+)')
+_INVESTED = re.compile(r'invested ₹([\d,]+) in ([^,\.]+)')
+_SAVINGS = re.compile(r'savings of ₹([\d,]+) in ([^,\.]+)')
+
+
+class SegmentTooLong(ValueError):
+    """Streamed text ran past MAX_SEGMENT_CHARS without a record boundary"""
+
+
+def _search_start(pattern: re.Pattern, text: str, pos: int) -> int:
+    match = pattern.search(text, pos)
+    return match.start() if match else -1
+
+
+class _NextMatch:
+    """
+    Position of the next occurrence at or after a position, for positions that only increase
+
+    The last answer is reused while it is still ahead, so the text is searched
+    at most once in total.
+    """
+
+    def __init__(self, find, length: int):
+        self.find = find          # Like str.find: position at or after pos, or -1
+        self.length = length
+        self.found = -1
+
+    def at_or_after(self, pos: int) -> int:
+        """The next position, or the length of the text when there is none"""
+        if self.found < pos:
+            found = self.find(pos)
+            self.found = found if found != -1 else self.length
+        return self.found
+
+
+def read_text_chunks(stream, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """Decode a binary stream as UTF-8, chunk by chunk (multi-byte characters may straddle chunks)"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def split_text(text: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    return (text[start:start + chunk_size] for start in range(0, len(text), chunk_size))
+
+
+def item_schema_parts(schema: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Split a response schema into (envelope schema, user item schema)
+
+    The envelope is the schema without its "users" property, so the date can be
+    checked up front; each user record is checked against the item schema, which
+    keeps the root's definitions for $ref.
+    """
+    properties = dict(schema.get('properties', {}))
+    users_schema = properties.pop('users', {})
+    envelope = {
+        **schema,
+        'properties': properties,
+        'required': [field for field in schema.get('required', []) if field != 'users'],
+    }
+    item_schema = users_schema.get('items', {}) if isinstance(users_schema, dict) else {}
+    if isinstance(item_schema, dict):
+        definitions = {key: schema[key] for key in ('definitions', '$defs') if key in schema}
+        item_schema = {**definitions, **item_schema}
+    return envelope, item_schema
+
 
 class JSONController:
     def __init__(self, model):
@@ -14,49 +111,99 @@ class JSONController:
         # Remove ₹ symbol and convert to integer
         return int(amount_str.replace('₹', '').replace(',', ''))
 
+    def _user_blocks(self, text: str) -> Iterator[Tuple[int, int, int, re.Match]]:
+        """
+        (start, name end, end, salary match) of each user block, left to right
+
+        Finds what re.finditer(r'([A-Za-z\\s]+) earns ₹([\\d,]+) .+?(?=\\. [A-Za-z]|$)')
+        would, in linear time. A name is a run of letters and whitespace, and
+        " earns " is made of the same characters, so the only possible name end
+        is 7 characters before the run's end; every run is therefore tried once
+        instead of once per starting position. The block then ends at the first
+        ". <letter>" (or the end of the text) with no newline before it.
+        """
+        length = len(text)
+        text_end = length - 1 if text.endswith('\n') else length
+        boundary = _NextMatch(lambda pos: _search_start(_BLOCK_END, text, pos), length)
+        newline = _NextMatch(lambda pos: text.find('\n', pos), length)
+
+        pos = 0
+        while True:
+            run = _NAME_RUN.search(text, pos)
+            if run is None:
+                return
+            run_start, run_end = run.span()
+            name_end = run_end - len(' earns ')
+            pos = run_end
+            if name_end <= run_start or not text.startswith(' earns ₹', name_end):
+                continue
+            salary = _AMOUNT.match(text, run_end + 1)
+            if salary is None or not text.startswith(' ', salary.end()):
+                continue
+            tail = salary.end() + 1
+            if tail >= length or text[tail] == '\n':
+                continue
+            # At least one character, then up to the first block end
+            end = boundary.at_or_after(tail + 1)
+            if text_end >= tail + 1:
+                end = min(end, text_end)
+            if newline.at_or_after(tail) < end:
+                continue
+            yield run_start, name_end, end, salary
+            pos = end
+
+    def _owed_amounts(self, text: str, start: int, end: int, marker: str) -> Iterator[Tuple[str, str]]:
+        """
+        (words, amount) for each r'([\\w\\s]+) <marker> ₹([\\d,]+)' match in text[start:end]
+
+        The same single-candidate argument as for names applies: the run of word
+        characters and whitespace can only end in the marker, so each run is
+        tried once.
+        """
+        suffix = f' {marker} ₹'
+        pos = start
+        while True:
+            run = _WORD_RUN.search(text, pos, end)
+            if run is None:
+                return
+            run_start, run_end = run.span()
+            words_end = run_end - len(suffix) + 1
+            pos = run_end
+            if words_end <= run_start or run_end >= end or not text.startswith(suffix, words_end):
+                continue
+            amount = _AMOUNT.match(text, run_end + 1, end)
+            if amount is None:
+                continue
+            yield text[run_start:words_end], amount.group()
+            pos = amount.end()
+
     def _extract_user_data(self, text: str) -> list[dict]:
-        # Extract user information using regex patterns
+        # Extract user information in one left-to-right scan (see _user_blocks)
         users = []
-        
-        # Pattern to match user data blocks
-        user_pattern = r'([A-Za-z\s]+) earns ₹([\d,]+) .+?(?=\. [A-Za-z]|$)'
-        matches = re.finditer(user_pattern, text)
-
-        for match in matches:
-            user_block = match.group(0)
-            name = match.group(1).strip()
-            
+
+        for start, name_end, end, salary_match in self._user_blocks(text):
+            name = text[start:name_end].strip()
+
             # Extract financial details
-            salary = self._extract_amount(re.search(r'earns ₹([\d,]+)', user_block).group(1))
-            expenses = self._extract_amount(re.search(r'spends ₹([\d,]+)', user_block).group(1))
-            
+            salary = self._extract_amount(salary_match.group())
+            expenses = self._extract_amount(_SPENDS.search(text, start, end).group(1))
+
             # Initialize dictionaries for financial categories
             investments = {}
             debts = {}
             loans = {}
             savings = 0
 
-            # Extract investments
-            investment_patterns = [
-                (r'invested ₹([\d,]+) in ([^,\.]+)', 'investments'),
-                (r'savings of ₹([\d,]+) in ([^,\.]+)', 'savings'),
-                (r'([\w\s]+) loan of ₹([\d,]+)', 'loans'),
-                (r'([\w\s]+) debt of ₹([\d,]+)', 'debts')
-            ]
-
-            for pattern, category in investment_patterns:
-                for investment_match in re.finditer(pattern, user_block):
-                    amount = self._extract_amount(investment_match.group(1))
-                    item = investment_match.group(2).strip().lower()
-                    
-                    if category == 'investments':
-                        investments[item] = amount
-                    elif category == 'savings':
-                        savings = amount
-                    elif category == 'loans':
-                        loans[item] = amount
-                    elif category == 'debts':
-                        debts[item] = amount
+            for investment_match in _INVESTED.finditer(text, start, end):
+                amount = self._extract_amount(investment_match.group(1))
+                investments[investment_match.group(2).strip().lower()] = amount
+            for savings_match in _SAVINGS.finditer(text, start, end):
+                savings = self._extract_amount(savings_match.group(1))
+            # As before, the words before "loan of"/"debt of" are parsed as the amount and the amount becomes the key
+            for words, amount in self._owed_amounts(text, start, end, 'loan of'):
+                loans[amount.strip().lower()] = self._extract_amount(words)
+            for words, amount in self._owed_amounts(text, start, end, 'debt of'):
+                debts[amount.strip().lower()] = self._extract_amount(words)
 
             users.append({
                 "name": name,
@@ -70,6 +217,91 @@ class JSONController:
 
         return users
 
+    def iter_segments(self, chunks: Iterable[str], max_chars: int = MAX_SEGMENT_CHARS) -> Iterator[str]:
+        """
+        Regroup text chunks into segments that end just before a record boundary
+
+        Only the text after the last boundary seen is buffered, as a list of
+        chunks joined once when a segment is cut, so each character is scanned
+        and copied a bounded number of times. A block may run from any point
+        to the next boundary, so no earlier cut is safe: when more than
+        max_chars accumulate without one, SegmentTooLong is raised instead of
+        buffering the rest of the input.
+        """
+        pending = []
+        pending_chars = 0
+        tail = ''
+        for chunk in chunks:
+            if not chunk:
+                continue
+            # Rescan the last few buffered characters too: a boundary may straddle chunks, and
+            # the two before it are needed for the lookbehinds
+            window = tail + chunk
+            cut = None
+            for boundary in RECORD_BOUNDARY.finditer(window, max(len(tail) - 2, 0)):
+                cut = boundary.start()
+            pending.append(chunk)
+            if cut is not None and pending_chars - len(tail) + cut > 0:
+                buffer = ''.join(pending)
+                cut += pending_chars - len(tail)
+                yield buffer[:cut]
+                pending = [buffer[cut:]]
+                pending_chars = len(buffer) - cut
+            else:
+                pending_chars += len(chunk)
+            if pending_chars > max_chars:
+                raise SegmentTooLong(f"No record boundary in {pending_chars} characters (limit {max_chars})")
+            tail = window[-4:]
+        if pending_chars:
+            yield ''.join(pending)
+
+    def iter_user_data(self, chunks: Iterable[str]) -> Iterator[dict]:
+        """The records _extract_user_data finds in the concatenated chunks, in order, as they are read"""
+        for segment in self.iter_segments(chunks):
+            yield from self._extract_user_data(segment)
+
+    def stream_financial_data(self, date_str: str, schema: Dict[str, Any], chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_financial_data: one message per extracted user
+
+        Yields {"date"} first, then {"user"} for each valid record or {"error"}
+        for one that fails the item schema, and finally a {"done"} summary. A
+        schema problem with the envelope ends the stream after an {"error"} message.
+        """
+        envelope, item_schema = item_schema_parts(schema)
+        try:
+            validate_cached({"date": date_str}, envelope)
+            item_validator = validator_cache.get(item_schema)
+        except (jsonschema.exceptions.ValidationError, jsonschema.exceptions.SchemaError) as e:
+            yield {"error": f"Schema validation failed: {str(e)}", "status": "error", "code": 400}
+            return
+        yield {"date": date_str}
+
+        counter = _CountingChunks(chunks)
+        users = invalid = output_tokens = 0
+        try:
+            for index, user in enumerate(self.iter_user_data(counter)):
+                with span("json.validate", index=index):
+                    error = item_validator.best_error(user)
+                if error is not None:
+                    invalid += 1
+                    yield {"index": index, "error": f"Schema validation failed: {error.message}", "record": user}
+                    continue
+                users += 1
+                output_tokens += len(str(user).split())
+                yield {"index": index, "user": user}
+        except SegmentTooLong as e:
+            yield {"error": str(e), "users": users, "invalid": invalid, "status": "error", "code": 413}
+            return
+
+        yield {
+            "done": True,
+            "users": users,
+            "invalid": invalid,
+            "tokens_used": counter.words + output_tokens,
+            "status": "success",
+        }
+
     def process_financial_data(self, input_data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
         try:
             # Extract date, text and schema from input
@@ -78,7 +310,8 @@ class JSONController:
             schema = input_data['schema']
             
             # Process the text to extract user data
-            users_data = self._extract_user_data(text)
+            with span("json.extract"):
+                users_data = self._extract_user_data(text)
             
             # Create the response structure
             response_data = {
@@ -88,8 +321,9 @@ class JSONController:
             
             # Validate against the provided schema
             try:
-                validate(instance=response_data, schema=schema)
-            except jsonschema.exceptions.ValidationError as e:
+                with span("json.validate"):
+                    validate_cached(response_data, schema)
+            except (jsonschema.exceptions.ValidationError, jsonschema.exceptions.SchemaError) as e:
                 return {
                     "error": f"Schema validation failed: {str(e)}",
                     "timestamp": datetime.now().isoformat(),
@@ -111,4 +345,21 @@ class JSONController:
                 "status": "error",
                 "code": 500
             }
-            return error_response, 0
\ No newline at end of file
+            return error_response, 0
+
+class _CountingChunks:
+    """Passes chunks through while counting their whitespace-separated words"""
+
+    def __init__(self, chunks: Iterable[str]):
+        self.chunks = chunks
+        self.words = 0
+        self.characters = 0
+
+    def __iter__(self):
+        in_word = False
+        for chunk in self.chunks:
+            self.characters += len(chunk)
+            # A word split across chunks is counted once
+            self.words += len(chunk.split()) - (1 if in_word and chunk[:1] and not chunk[0].isspace() else 0)
+            in_word = bool(chunk) and not chunk[-1].isspace()
+            yield chunk
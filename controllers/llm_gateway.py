@@ -0,0 +1,717 @@
+import contextvars
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from langchain_community.llms import Ollama
+from langchain_core.callbacks import BaseCallbackHandler
+
+from controllers.metrics import REGISTRY, LLM_CALLS, LLM_LATENCY, LLM_TOKENS, LLM_REJECTED
+from controllers.stream_histogram import StreamingHistogram
+from controllers.tracing import span
+
+# Limits used for models without their own entry in settings.json
+DEFAULT_LIMITS = {
+    "max_concurrency": 8,        # Upper bound on generations in flight per model
+    "max_queue": 16,             # Requests allowed to wait for a slot
+    "queue_timeout": 30.0,       # Seconds a request may wait before it is shed
+    "adaptive": True,            # Let the AIMD limiter pick the limit below max_concurrency
+    "min_concurrency": 1,
+    "initial_concurrency": 2,
+    "latency_tolerance": 1.5,    # Back off when recent time per token exceeds baseline by this factor
+    "backoff": 0.75,             # Multiplicative decrease factor
+    "batch_queue_timeout": 600.0,  # Queue timeout for batch (benchmark) calls, which can afford to wait
+    "priority_aging": 5.0,       # Seconds of waiting that promote a call by one priority class
+}
+
+# Model-affinity dispatch (see ModelAffinity)
+DEFAULT_AFFINITY = {
+    "enabled": False,
+    "max_loaded": 1,             # Models the backend keeps in memory at once (OLLAMA_MAX_LOADED_MODELS)
+    "burst": 16,                 # Calls admitted for a loaded model before waiting models get a turn
+    "max_wait": 2.0,             # Extra seconds a call may be held back waiting for its model's turn
+}
+
+# Ollama reports a few milliseconds of load_duration even for a resident model
+COLD_LOAD_SECONDS = 0.1
+
+# Priority classes, most urgent first. Interactive API calls are served before
+# queued benchmark generations; aging keeps the latter from starving.
+PRIORITY_CLASSES = {"interactive": 0, "batch": 1}
+
+# Priority class of the LLM calls made in the current context
+current_priority = contextvars.ContextVar("llm_priority", default="interactive")
+
+
+@contextmanager
+def llm_priority(priority_class: str):
+    """Run the LLM calls made inside the block with the given priority class"""
+    if priority_class not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {priority_class}. Supported: {list(PRIORITY_CLASSES)}")
+    token = current_priority.set(priority_class)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the request's deadline passes before or during an LLM call"""
+
+
+class Deadline:
+    """Absolute point in time by which a request must be answered"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires = time.perf_counter() + timeout
+        self.exceeded = False  # Set once any step gave up because of this deadline
+
+    def remaining(self) -> float:
+        return self.expires - time.perf_counter()
+
+    def check(self):
+        """Raise DeadlineExceeded (and remember it) once the deadline has passed"""
+        if self.remaining() <= 0:
+            self.exceeded = True
+            raise DeadlineExceeded(f"Deadline of {self.timeout * 1000:.0f} ms exceeded")
+
+
+# Deadline of the request being served in the current context; None means no limit
+current_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(timeout_ms: float = None):
+    """Enforce a deadline on the LLM calls made inside the block (no limit for None)"""
+    deadline = Deadline(timeout_ms / 1000) if timeout_ms is not None else None
+    token = current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        current_deadline.reset(token)
+
+
+def check_deadline():
+    """Raise DeadlineExceeded if the current request is out of time"""
+    deadline = current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def deadline_exceeded() -> bool:
+    """Whether the current request gave up on some work because its deadline passed"""
+    deadline = current_deadline.get()
+    return deadline is not None and deadline.exceeded
+
+
+class CallCancelled(Exception):
+    """Raised inside an LLM call whose result is no longer wanted (e.g. the losing side of a hedge)"""
+
+
+# Event set to abandon the LLM calls made in the current context; None means they are never cancelled
+current_cancel = contextvars.ContextVar("llm_cancel", default=None)
+
+
+def check_cancelled():
+    """Raise CallCancelled if the calls in the current context were abandoned"""
+    cancel = current_cancel.get()
+    if cancel is not None and cancel.is_set():
+        raise CallCancelled("LLM call cancelled")
+
+
+class _StreamGuard(BaseCallbackHandler):
+    """Stops a streamed generation once the deadline passes or the call is cancelled, so Ollama drops the request"""
+
+    raise_error = True
+
+    def __init__(self, deadline: Deadline = None, cancel: threading.Event = None):
+        self.deadline = deadline
+        self.cancel = cancel
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.deadline is not None:
+            self.deadline.check()
+        if self.cancel is not None and self.cancel.is_set():
+            raise CallCancelled("LLM call cancelled")
+
+
+class OverloadedError(Exception):
+    """
+    Raised when a model's lane cannot take a request
+
+    status_code is 429 when the wait queue is full (rejected on arrival) and
+    503 when the request waited for queue_timeout without getting a slot.
+    retry_after is the suggested client back-off in whole seconds.
+    """
+
+    def __init__(self, model: str, reason: str, retry_after: int, status_code: int):
+        super().__init__(f"Model {model} is overloaded: {reason}")
+        self.model = model
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class AIMDLimit:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit
+
+    Latency is measured per generated token (Ollama's eval_duration over
+    eval_count), so a mix of short and long answers doesn't look like load:
+    whole-call time grows with the answer's length, time per token with the
+    number of generations sharing the backend. Recent latency is a fast EWMA
+    of it. The baseline is the lowest recent latency seen over the last one or
+    two windows, an estimate of the unloaded latency that can still move up if
+    the hardware gets slower. While the limit is in use and recent latency
+    stays within latency_tolerance of the baseline, the limit grows by about
+    one slot per limit's worth of completions. When latency rises past that,
+    or a generation fails, it is multiplied by backoff (at most once per
+    recent call duration, so one slow burst doesn't collapse it).
+    """
+
+    RECENT_ALPHA = 0.2
+    BASELINE_WINDOW = 300.0  # Seconds
+
+    def __init__(self, initial: float, minimum: float, maximum: float, latency_tolerance: float, backoff: float):
+        self.limit = float(initial)
+        self.configure(minimum, maximum, latency_tolerance, backoff)
+        self.recent = None
+        self.recent_call = None
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._window_start = time.perf_counter()
+        self._window_min = None
+        self._previous_min = None
+
+    def configure(self, minimum, maximum, latency_tolerance, backoff):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.limit = min(max(self.limit, minimum), maximum)
+
+    @property
+    def baseline(self):
+        candidates = [value for value in (self._window_min, self._previous_min) if value is not None]
+        return min(candidates) if candidates else None
+
+    @property
+    def gradient(self) -> float:
+        """Baseline over recent latency: 1.0 when unloaded, falling as queueing builds up in the backend"""
+        if not self.recent:
+            return 1.0
+        return self.baseline / self.recent
+
+    def _observe(self, latency: float, now: float):
+        """Fold one time-per-token sample into the recent and baseline latency"""
+        self.recent = latency if self.recent is None else self.recent + self.RECENT_ALPHA * (latency - self.recent)
+        if now - self._window_start >= self.BASELINE_WINDOW:
+            self._previous_min, self._window_min = self._window_min, None
+            self._window_start = now
+        if self._window_min is None or self.recent < self._window_min:
+            self._window_min = self.recent
+
+    def on_sample(self, service_time: float, token_time: Optional[float], failed: bool, in_flight: int):
+        """
+        Update the limit after a generation that took service_time seconds, token_time seconds per
+        generated token, with in_flight generations running. Without a token time (the backend
+        reported no eval counts) the call only paces backoff.
+        """
+        now = time.perf_counter()
+        if not failed:
+            self.recent_call = (service_time if self.recent_call is None
+                                else self.recent_call + self.RECENT_ALPHA * (service_time - self.recent_call))
+            if token_time is not None:
+                self._observe(token_time, now)
+
+        if failed or self.gradient < 1 / self.latency_tolerance:
+            if now - self._last_decrease >= (self.recent_call or 0):
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self.decreases += 1
+                self._last_decrease = now
+        elif in_flight >= int(self.limit):
+            # Only grow when the current limit is actually being used
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.increases += 1
+
+
+class Ticket:
+    """A call waiting for a slot"""
+
+    __slots__ = ("priority_class", "priority", "sequence", "arrived")
+
+    def __init__(self, priority_class: str, sequence: int, arrived: float):
+        self.priority_class = priority_class
+        self.priority = PRIORITY_CLASSES[priority_class]
+        self.sequence = sequence
+        self.arrived = arrived
+
+    def rank(self, now: float, aging: float):
+        """Sort key: effective priority (improving with time waited), then arrival order"""
+        promotions = int((now - self.arrived) / aging) if aging > 0 else 0
+        return (self.priority - promotions, self.sequence)
+
+
+class ModelLane:
+    """Admission state for one model: slots, priority wait queue and counters"""
+
+    def __init__(self, model: str, **limits):
+        self.model = model
+        self.limiter = None
+        self.apply_limits(limits)
+        self.in_flight = 0
+        self.waiters = []
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.completed = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.wait_time = StreamingHistogram()
+        self.service_time = StreamingHistogram()
+        self.load_time = StreamingHistogram()
+        self.cold_loads = 0
+        self.class_stats = {
+            name: {"admitted": 0, "rejected": 0, "timed_out": 0, "wait_time": StreamingHistogram()}
+            for name in PRIORITY_CLASSES
+        }
+
+    def apply_limits(self, limits: Dict[str, Any]):
+        """Set (or update) the lane's configured limits"""
+        self.max_concurrency = limits["max_concurrency"]
+        self.max_queue = limits["max_queue"]
+        self.queue_timeout = limits["queue_timeout"]
+        self.batch_queue_timeout = limits["batch_queue_timeout"]
+        self.priority_aging = limits["priority_aging"]
+        self.adaptive = limits["adaptive"]
+        limiter_args = (limits["min_concurrency"], self.max_concurrency, limits["latency_tolerance"], limits["backoff"])
+        if self.limiter is None:
+            self.limiter = AIMDLimit(min(limits["initial_concurrency"], self.max_concurrency), *limiter_args)
+        else:
+            self.limiter.configure(*limiter_args)
+
+    @property
+    def limit(self) -> int:
+        if self.adaptive:
+            return int(self.limiter.limit)
+        return self.max_concurrency
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < self.limit
+
+    def next_waiter(self, now: float) -> Ticket:
+        """The waiter to admit next: highest effective priority, oldest first"""
+        return min(self.waiters, key=lambda ticket: ticket.rank(now, self.priority_aging))
+
+    def queued(self, priority_class: str) -> int:
+        return sum(1 for ticket in self.waiters if ticket.priority_class == priority_class)
+
+    def timeout_for(self, priority_class: str) -> float:
+        return self.batch_queue_timeout if priority_class == "batch" else self.queue_timeout
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained, assuming the mean service time"""
+        service = self.service_time.mean if self.service_time.count else 1.0
+        return max(1, math.ceil(service * (len(self.waiters) + 1) / max(self.limit, 1)))
+
+    def stats(self) -> Dict[str, Any]:
+        wait = self.wait_time.summary()
+        service = self.service_time.summary()
+        load = self.load_time.summary()
+        return {
+            "limit": self.limit,
+            "adaptive": self.adaptive,
+            "max_concurrency": self.max_concurrency,
+            "adaptive_limit": self.limiter.limit,
+            "latency_gradient": self.limiter.gradient,
+            "baseline_token_ms": (self.limiter.baseline or 0) * 1000,
+            "recent_token_ms": (self.limiter.recent or 0) * 1000,
+            "limit_increases": self.limiter.increases,
+            "limit_decreases": self.limiter.decreases,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "completed": self.completed,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "wait_ms": {stat: wait[stat] * 1000 for stat in ["mean", "p50", "p95", "p99", "max"]},
+            "service_ms": {stat: service[stat] * 1000 for stat in ["mean", "p50", "p95", "p99", "max"]},
+            "cold_loads": self.cold_loads,
+            "load_ms_total": self.load_time.mean * self.load_time.count * 1000,
+            "load_ms": {stat: load[stat] * 1000 for stat in ["mean", "p50", "p95", "max"]},
+            "priority_classes": {
+                name: {
+                    "queue_depth": self.queued(name),
+                    "admitted": stats["admitted"],
+                    "rejected": stats["rejected"],
+                    "timed_out": stats["timed_out"],
+                    "wait_ms": {
+                        stat: value * 1000
+                        for stat, value in stats["wait_time"].summary().items()
+                        if stat in ("mean", "p50", "p95", "p99", "max")
+                    },
+                }
+                for name, stats in self.class_stats.items()
+            },
+        }
+
+
+class ModelAffinity:
+    """
+    Groups LLM calls by model so the backend rarely has to swap weights
+
+    On a host that can only keep max_loaded models in memory, alternating
+    calls between models make Ollama evict and reload weights on nearly every
+    switch. The gateway tracks which models it considers loaded and holds
+    back calls for other models while a loaded model still has work. A
+    loaded model is given up once it is idle, or once it has had burst calls
+    while other models wait. No call is held back for more than max_wait
+    seconds on top of its normal queueing; after that it is admitted anyway.
+    """
+
+    def __init__(self, **settings):
+        self.loaded = OrderedDict()  # Model -> calls admitted since it was loaded, least recently used first
+        self.loads = 0
+        self.swaps = 0
+        self.forced_swaps = 0
+        self.apply(settings)
+
+    def apply(self, settings: Dict[str, Any]):
+        settings = {**DEFAULT_AFFINITY, **(settings or {})}
+        self.enabled = settings["enabled"]
+        self.max_loaded = settings["max_loaded"]
+        self.burst = settings["burst"]
+        self.max_wait = settings["max_wait"]
+
+    def _others_waiting(self, model: str, lanes: Dict[str, "ModelLane"]) -> bool:
+        return any(lane.waiters for name, lane in lanes.items() if name != model and name not in self.loaded)
+
+    def _evictable(self, model: str, lanes: Dict[str, "ModelLane"]) -> bool:
+        """A loaded model can be swapped out once it is idle and has no more work or has used its burst"""
+        lane = lanes.get(model)
+        if lane is None:
+            return True
+        if lane.in_flight:
+            return False
+        return not lane.waiters or self.loaded[model] >= self.burst
+
+    def allows(self, model: str, lanes: Dict[str, "ModelLane"], held: float) -> bool:
+        """Whether a call for the model, held back for `held` seconds so far, may be admitted now"""
+        if not self.enabled:
+            return True
+        if model in self.loaded:
+            return self.loaded[model] < self.burst or not self._others_waiting(model, lanes)
+        if len(self.loaded) < self.max_loaded or held >= self.max_wait:
+            return True
+        return any(self._evictable(name, lanes) for name in self.loaded)
+
+    def hold_time(self, model: str, held: float) -> float:
+        """Seconds until the extra-wait budget of a held-back call runs out"""
+        if not self.enabled or model in self.loaded:
+            return math.inf
+        return max(self.max_wait - held, 0.0)
+
+    def admit(self, model: str, lanes: Dict[str, "ModelLane"]):
+        """Account for an admitted call, swapping its model in if needed"""
+        if not self.enabled:
+            return
+        if model not in self.loaded:
+            if len(self.loaded) >= self.max_loaded:
+                evictable = [name for name in self.loaded if self._evictable(name, lanes)]
+                if evictable:
+                    del self.loaded[evictable[0]]
+                else:
+                    # The call used up max_wait; the backend will have to hold both models
+                    self.loaded.popitem(last=False)
+                    self.forced_swaps += 1
+                self.swaps += 1
+            self.loaded[model] = 0
+            self.loads += 1
+        self.loaded[model] += 1
+        self.loaded.move_to_end(model)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_loaded": self.max_loaded,
+            "burst": self.burst,
+            "max_wait": self.max_wait,
+            "loaded": dict(self.loaded),
+            "loads": self.loads,
+            "swaps": self.swaps,
+            "forced_swaps": self.forced_swaps,
+        }
+
+
+class LLMGateway:
+    """
+    Single entry point for every LLM call
+
+    Each model gets a lane with a concurrency limit and a bounded FIFO wait
+    queue. Requests beyond the queue are rejected immediately, and requests that
+    wait longer than the queue timeout are shed, so a spike turns into fast
+    429/503 responses instead of everyone's latency climbing until timeouts.
+    By default the limit is adaptive (see AIMDLimit), so each model finds its
+    own throughput-optimal concurrency on whatever hardware serves it. All
+    lanes share one condition variable, so admission decisions see the whole
+    backend, which is what lets ModelAffinity batch calls across models.
+    """
+
+    def __init__(self, default_limits: Dict[str, Any] = None, model_limits: Dict[str, Dict[str, Any]] = None,
+                 affinity: Dict[str, Any] = None):
+        self._condition = threading.Condition()
+        self._lanes = {}
+        self._sequence = itertools.count()
+        self.affinity = ModelAffinity()
+        self.configure(default_limits, model_limits, affinity)
+
+    def configure(self, default_limits: Dict[str, Any] = None, model_limits: Dict[str, Dict[str, Any]] = None,
+                  affinity: Dict[str, Any] = None):
+        """
+        Set limits; lanes that already exist are updated in place
+
+        Args:
+            default_limits: Overrides for DEFAULT_LIMITS
+            model_limits: Per-model overrides keyed by Ollama model name
+            affinity: Overrides for DEFAULT_AFFINITY
+        """
+        with self._condition:
+            self.default_limits = {**DEFAULT_LIMITS, **(default_limits or {})}
+            self.model_limits = model_limits or {}
+            for model, lane in self._lanes.items():
+                lane.apply_limits(self._limits_for(model))
+            self.affinity.apply(affinity)
+            self._condition.notify_all()
+
+    def _limits_for(self, model: str) -> Dict[str, Any]:
+        return {**self.default_limits, **self.model_limits.get(model, {})}
+
+    def _lane(self, model: str) -> ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = ModelLane(model, **self._limits_for(model))
+        return lane
+
+    def acquire(self, model: str) -> ModelLane:
+        """
+        Wait for a slot on the model's lane, or raise OverloadedError
+
+        Waiters are admitted by priority class (see current_priority), oldest
+        first within a class. Each priority_aging seconds of waiting promotes a
+        call by one class, so batch calls still get through under steady
+        interactive load. Every class has its own max_queue and timeout. With
+        model affinity enabled, calls may also be held back (up to max_wait)
+        while another model has its turn on the backend. A call never waits
+        past the request's deadline; it raises DeadlineExceeded instead. A call
+        whose current_cancel is set (see cancel) leaves the queue with
+        CallCancelled.
+        """
+        priority_class = current_priority.get()
+        deadline = current_deadline.get()
+        cancel = current_cancel.get()
+        check_deadline()
+        check_cancelled()
+        with self._condition:
+            lane = self._lane(model)
+            class_stats = lane.class_stats[priority_class]
+            arrived = time.perf_counter()
+
+            if not lane.has_capacity() or lane.waiters or not self.affinity.allows(model, self._lanes, 0.0):
+                if lane.queued(priority_class) >= lane.max_queue:
+                    lane.rejected += 1
+                    class_stats["rejected"] += 1
+                    raise OverloadedError(model, "wait queue is full", lane.retry_after(), 429)
+
+                ticket = Ticket(priority_class, next(self._sequence), arrived)
+                lane.waiters.append(ticket)
+                queue_deadline = arrived + lane.timeout_for(priority_class)
+                # Time spent ready for admission but held back for another model's turn
+                held, held_since = 0.0, None
+                try:
+                    while True:
+                        now = time.perf_counter()
+                        if held_since is not None:
+                            held, held_since = held + now - held_since, None
+                        if lane.next_waiter(now) is ticket and lane.has_capacity():
+                            if self.affinity.allows(model, self._lanes, held):
+                                break
+                            held_since = now
+                        if deadline is not None and deadline.expires <= now:
+                            deadline.check()
+                        if cancel is not None and cancel.is_set():
+                            # Nobody wants the answer any more: give up the queue position now
+                            lane.cancelled += 1
+                            raise CallCancelled("LLM call cancelled while queued")
+                        remaining = queue_deadline - now
+                        if deadline is not None:
+                            remaining = min(remaining, deadline.expires - now)
+                        if remaining <= 0:
+                            lane.timed_out += 1
+                            class_stats["timed_out"] += 1
+                            raise OverloadedError(model, "timed out waiting for a slot", lane.retry_after(), 503)
+                        if held_since is not None:
+                            # Wake up when the affinity budget runs out, even if nothing else changes
+                            remaining = min(remaining, self.affinity.hold_time(model, held) + 0.001)
+                        self._condition.wait(remaining)
+                finally:
+                    lane.waiters.remove(ticket)
+                    # Another waiter may now be next in line
+                    self._condition.notify_all()
+
+            waited = time.perf_counter() - arrived
+            self.affinity.admit(model, self._lanes)
+            lane.in_flight += 1
+            lane.admitted += 1
+            lane.wait_time.record(waited)
+            class_stats["admitted"] += 1
+            class_stats["wait_time"].record(waited)
+            return lane
+
+    def cancel(self, cancel: threading.Event):
+        """Set a current_cancel event, waking its calls that are still waiting for a slot"""
+        cancel.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def release(self, lane: ModelLane, service_time: float, failed: bool = False, load_time: float = None,
+                cancelled: bool = False, token_time: float = None):
+        with self._condition:
+            if cancelled:
+                # Cut short by the client's deadline: says nothing about backend latency or health
+                lane.in_flight -= 1
+                lane.cancelled += 1
+                self._condition.notify_all()
+                return
+            lane.limiter.on_sample(service_time, token_time, failed, lane.in_flight)
+            lane.in_flight -= 1
+            if failed:
+                lane.errors += 1
+            else:
+                lane.completed += 1
+                lane.service_time.record(service_time)
+            if load_time is not None:
+                lane.load_time.record(load_time)
+                if load_time >= COLD_LOAD_SECONDS:
+                    lane.cold_loads += 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, model: str):
+        """Hold one of the model's concurrency slots for the duration of the block"""
+        lane = self.acquire(model)
+        started = time.perf_counter()
+        failed = True
+        cancelled = False
+        # The block may store the backend's reported model load time and time per generated token here
+        info = {"load_time": None, "token_time": None}
+        try:
+            yield info
+            failed = False
+        except (DeadlineExceeded, CallCancelled):
+            cancelled = True
+            raise
+        finally:
+            self.release(lane, time.perf_counter() - started, failed, info["load_time"], cancelled,
+                         info["token_time"])
+
+    def invoke(self, model: str, prompt: str, stop: List[str] = None, **kwargs) -> str:
+        """Run one generation on the model once admitted; extra kwargs go to Ollama"""
+        kwargs.setdefault("temperature", 0)
+        queued = time.perf_counter()
+        try:
+            with span("llm.invoke", model=model, prompt_chars=len(prompt)) as llm_span, self.slot(model) as info:
+                started = time.perf_counter()
+                deadline = current_deadline.get()
+                cancel = current_cancel.get()
+                check_cancelled()
+                callbacks = []
+                if deadline is not None:
+                    deadline.check()
+                    # The HTTP timeout bounds each read; the callback bounds the whole stream
+                    kwargs.setdefault("timeout", max(1, math.ceil(deadline.remaining())))
+                if deadline is not None or cancel is not None:
+                    callbacks.append(_StreamGuard(deadline, cancel))
+                llm = Ollama(model=model, **kwargs)
+                try:
+                    generation = llm.generate([prompt], stop=stop, callbacks=callbacks).generations[0][0]
+                except DeadlineExceeded:
+                    LLM_CALLS.inc(model=model, outcome="deadline")
+                    raise
+                except CallCancelled:
+                    LLM_CALLS.inc(model=model, outcome="cancelled")
+                    raise
+                except Exception as e:
+                    if deadline is not None and deadline.remaining() <= 0:
+                        # The HTTP read timed out at the deadline
+                        LLM_CALLS.inc(model=model, outcome="deadline")
+                        deadline.exceeded = True
+                        raise DeadlineExceeded(f"Deadline of {deadline.timeout * 1000:.0f} ms exceeded") from e
+                    LLM_CALLS.inc(model=model, outcome="error")
+                    raise
+                LLM_CALLS.inc(model=model, outcome="ok")
+                LLM_LATENCY.observe(time.perf_counter() - started, model=model)
+
+                generation_info = generation.generation_info or {}
+                if "load_duration" in generation_info:
+                    info["load_time"] = generation_info["load_duration"] / 1e9
+                if generation_info.get("eval_count") and "eval_duration" in generation_info:
+                    info["token_time"] = generation_info["eval_duration"] / generation_info["eval_count"] / 1e9
+                LLM_TOKENS.inc(generation_info.get("prompt_eval_count", 0), model=model, kind="prompt")
+                LLM_TOKENS.inc(generation_info.get("eval_count", 0), model=model, kind="completion")
+                if llm_span is not None:
+                    llm_span.set(
+                        queue_ms=(started - queued) * 1000,
+                        load_ms=(info["load_time"] or 0) * 1000,
+                        prompt_tokens=generation_info.get("prompt_eval_count"),
+                        completion_tokens=generation_info.get("eval_count"),
+                    )
+                return generation.text
+        except OverloadedError as e:
+            LLM_REJECTED.inc(model=model, status=str(e.status_code))
+            raise
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model queue depth, in-flight count, outcome counters, wait/service/load time percentiles"""
+        with self._condition:
+            return {model: lane.stats() for model, lane in self._lanes.items()}
+
+    def lane_values(self, getter) -> Dict[str, float]:
+        """One value per model, read from its lane (for scrape-time gauges)"""
+        with self._condition:
+            return {model: getter(lane) for model, lane in self._lanes.items()}
+
+    def affinity_stats(self) -> Dict[str, Any]:
+        """Models considered loaded, and how many loads and swaps the gateway has caused"""
+        with self._condition:
+            return self.affinity.stats()
+
+
+# Shared by all controllers; main.py applies settings.json at startup
+gateway = LLMGateway()
+
+REGISTRY.gauge("aici_llm_in_flight", "LLM generations running per model", ["model"],
+               lambda: gateway.lane_values(lambda lane: lane.in_flight))
+REGISTRY.gauge("aici_llm_queue_depth", "LLM calls waiting for a slot per model", ["model"],
+               lambda: gateway.lane_values(lambda lane: len(lane.waiters)))
+REGISTRY.gauge("aici_llm_concurrency_limit", "Current admission limit per model", ["model"],
+               lambda: gateway.lane_values(lambda lane: lane.limit))
+
+
+def invoke_llm(model: str, prompt: str, stop: List[str] = None, **kwargs) -> str:
+    """Generate text through the shared gateway (see LLMGateway.invoke)"""
+    return gateway.invoke(model, prompt, stop=stop, **kwargs)
+
+
+def cancel_calls(cancel: threading.Event):
+    """Abandon the calls made under a current_cancel event, queued or running (see LLMGateway.cancel)"""
+    gateway.cancel(cancel)
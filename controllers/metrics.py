@@ -0,0 +1,214 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# Default histogram buckets (seconds): from fast routes up to slow multi-sentence generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """A named family of samples, one per combination of label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: List[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def samples(self):
+        """(suffix, label string, value) for every sample, at scrape time"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", _format_labels(self.label_names, key), value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down, set directly or computed at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: List[str] = (), callback: Callable = None):
+        super().__init__(name, documentation, labels)
+        # Returns {label values tuple: value}; read on every scrape instead of stored values
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def in_progress(self, **labels):
+        """Count the block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        if self.callback is None:
+            yield from super().samples()
+            return
+        for key, value in self.callback().items():
+            key = key if isinstance(key, tuple) else (key,)
+            yield "", _format_labels(self.label_names, key), value
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts plus sum and count, as Prometheus histograms expect"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: List[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.label_names, key, f'le="{_format_value(float(bound))}"'), cumulative
+            labels = _format_labels(self.label_names, key)
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """Metrics exposed together on /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: List[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: List[str] = (), callback: Callable = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, callback))
+
+    def histogram(self, name: str, documentation: str, labels: List[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# HTTP layer (recorded by main.py for every request)
+HTTP_REQUESTS = REGISTRY.counter("aici_http_requests_total", "HTTP requests by route, method and status", ["route", "method", "status"])
+HTTP_LATENCY = REGISTRY.histogram("aici_http_request_duration_seconds", "HTTP request latency by route", ["route"])
+
+# Controllers (one call per API request, may make several LLM calls)
+CONTROLLER_CALLS = REGISTRY.counter("aici_controller_calls_total", "Controller calls by outcome", ["controller", "outcome"])
+CONTROLLER_LATENCY = REGISTRY.histogram("aici_controller_duration_seconds", "Controller call latency", ["controller"])
+
+# LLM calls through the gateway
+LLM_CALLS = REGISTRY.counter("aici_llm_calls_total", "LLM generations by model and outcome", ["model", "outcome"])
+LLM_LATENCY = REGISTRY.histogram("aici_llm_call_duration_seconds", "LLM generation latency, excluding queueing", ["model"])
+LLM_TOKENS = REGISTRY.counter("aici_llm_tokens_total", "Tokens reported by the backend", ["model", "kind"])
+LLM_RETRIES = REGISTRY.counter("aici_llm_retries_total", "LLM calls repeated because the first output was unusable", ["model", "controller"])
+LLM_REJECTED = REGISTRY.counter("aici_llm_rejected_total", "LLM calls shed by admission control", ["model", "status"])
+
+# Caches report lookups here, labelled with the cache name
+CACHE_REQUESTS = REGISTRY.counter("aici_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+
+# Request log writes waiting for (or holding) the CSV lock
+LOG_WRITES_PENDING = REGISTRY.gauge("aici_log_writes_pending", "Request log writes queued behind the log lock")
+
+BENCHMARKS_ACTIVE = REGISTRY.gauge("aici_benchmarks_active", "Benchmark runs in progress", ["benchmark"])
+
+
+def record_cache(cache: str, hit: bool):
+    """Count one lookup in a named cache"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
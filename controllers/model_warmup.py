@@ -0,0 +1,181 @@
+import threading
+import time
+from typing import Dict, Any, List
+
+import requests
+
+from controllers.metrics import REGISTRY
+
+# Warm-up defaults; main.py applies the "warmup" section of settings.json
+DEFAULT_WARMUP = {
+    "enabled": False,
+    "base_url": "http://localhost:11434",
+    "models": [],                    # Models preloaded at startup and kept resident, in load order
+    "primary_models": [],            # Models that must be warm before /ready reports ready
+    "keep_alive": "30m",             # How long Ollama keeps a model after each request or ping
+    "ping_interval_seconds": 240,    # Keep-alive period; must be shorter than keep_alive
+    "load_timeout_seconds": 600,     # Large GGUF models can take minutes to load from disk
+}
+
+MODEL_STATES = ("cold", "warming", "warm", "failed")
+
+WARMUP_LOADS = REGISTRY.counter(
+    "aici_model_warmup_loads_total", "Preload and keep-alive requests by model and outcome", ["model", "outcome"]
+)
+
+
+class ModelWarmth:
+    """Warm or cold state of one model, as last seen by the manager"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.state = "cold"
+        self.loads = 0
+        self.pings = 0
+        self.last_load_seconds = None  # Duration of the last request that found the model cold
+        self.last_ping = None          # Unix time of the last successful preload or ping
+        self.error = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "loads": self.loads,
+            "pings": self.pings,
+            "last_load_seconds": self.last_load_seconds,
+            "last_ping": self.last_ping,
+            "error": self.error,
+        }
+
+
+class WarmupManager:
+    """
+    Preloads models at startup and keeps them resident in Ollama
+
+    A generate request with an empty prompt makes Ollama load the model and
+    return without generating; its keep_alive resets the eviction timer. The
+    manager sends one for every configured model at start, then again every
+    ping_interval_seconds from a background thread. Between pings it asks
+    Ollama which models are loaded (/api/ps), so a model evicted by memory
+    pressure shows up as cold and is reloaded on the next round.
+
+    Keep the list within what the host can hold at once
+    (OLLAMA_MAX_LOADED_MODELS); otherwise the pings evict each other.
+    """
+
+    def __init__(self, **settings):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.configure(settings)
+
+    def configure(self, settings: Dict[str, Any] = None):
+        settings = {**DEFAULT_WARMUP, **(settings or {})}
+        with self._lock:
+            self.enabled = settings["enabled"]
+            self.base_url = settings["base_url"].rstrip("/")
+            self.models: List[str] = list(settings["models"])
+            # Primary models are always warmed, and first
+            self.primary_models: List[str] = list(settings["primary_models"])
+            for model in reversed(self.primary_models):
+                if model not in self.models:
+                    self.models.insert(0, model)
+            self.keep_alive = settings["keep_alive"]
+            self.ping_interval = settings["ping_interval_seconds"]
+            self.load_timeout = settings["load_timeout_seconds"]
+            self._models = {model: ModelWarmth(model) for model in self.models}
+
+    def start(self):
+        """Warm the configured models and keep them warm, from a background thread"""
+        if not self.enabled or not self.models or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            for model in self.models:
+                if self._stop.is_set():
+                    return
+                self.ping(model)
+            if self._stop.wait(self.ping_interval):
+                return
+            self.refresh()
+
+    def ping(self, model: str) -> bool:
+        """Load the model (if needed) and reset its keep-alive timer; returns whether it is warm"""
+        warmth = self._models[model]
+        with self._lock:
+            if warmth.state != "warm":
+                warmth.state = "warming"
+        started = time.perf_counter()
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "prompt": "", "keep_alive": self.keep_alive, "stream": False},
+                timeout=self.load_timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            WARMUP_LOADS.inc(model=model, outcome="error")
+            with self._lock:
+                warmth.state = "failed"
+                warmth.error = str(e)
+            print(f"Warm-up of {model} failed: {e}")
+            return False
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if warmth.state == "warming":
+                warmth.loads += 1
+                warmth.last_load_seconds = elapsed
+                WARMUP_LOADS.inc(model=model, outcome="loaded")
+            else:
+                WARMUP_LOADS.inc(model=model, outcome="kept_alive")
+            warmth.pings += 1
+            warmth.state = "warm"
+            warmth.last_ping = time.time()
+            warmth.error = None
+        return True
+
+    def refresh(self):
+        """Mark models Ollama no longer holds in memory as cold"""
+        try:
+            response = requests.get(f"{self.base_url}/api/ps", timeout=10)
+            response.raise_for_status()
+            loaded = {entry.get("name") for entry in response.json().get("models", [])}
+            loaded |= {name.split(":")[0] for name in loaded if name.endswith(":latest")}
+        except (requests.RequestException, ValueError):
+            # Unknown; the next ping finds out
+            return
+        with self._lock:
+            for model, warmth in self._models.items():
+                if warmth.state == "warm" and model not in loaded:
+                    warmth.state = "cold"
+
+    def ready(self) -> bool:
+        """Whether every primary model is warm (always true when warm-up is disabled)"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            return all(self._models[model].state == "warm" for model in self.primary_models)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "primary_models": list(self.primary_models),
+                "models": {model: warmth.to_dict() for model, warmth in self._models.items()},
+            }
+
+
+warmup = WarmupManager()
+
+REGISTRY.gauge("aici_model_warm", "1 when the model is warm, 0 otherwise", ["model"],
+               lambda: {model: int(info["state"] == "warm") for model, info in warmup.stats()["models"].items()})
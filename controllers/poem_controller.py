@@ -1,12 +1,15 @@
 import re
 import tiktoken
-from langchain_community.llms import Ollama
+from controllers.llm_gateway import invoke_llm
+from controllers.retry_policy import retry_policies
+from controllers.tracing import span
 
 
 class PoemController:
     def __init__(self, model):
         self.model = model
         self.total_output_list = []
+        self.retry_policy = retry_policies.get("PoemController")
     
     def check_output(self, output, input_text_split):
         line_boolean = None
@@ -49,19 +52,17 @@ class PoemController:
         if len(lines) < n_lines:
             diff_line = n_lines - len(lines)
             prompt =  f"generate me {diff_line} line poem whose previous line is {previous_line}"
-            output = self.generate_output_from_llm(prompt, '\n')
+            with span("poem.maintain_lines", missing=diff_line):
+                output = self.generate_output_from_llm(prompt, '\n')
             lines.append(output)
             
             return '\n'.join(lines[:5])   
     
     def generate_output_from_llm(self, final_prompt, stop = None):
         if stop:
-            llm = Ollama(model=self.model, temperature = 0)
-            output = llm.invoke(final_prompt, stop = ['\n'])
+            output = invoke_llm(self.model, final_prompt, stop = ['\n'])
         else:
-            print("I am not stop")
-            llm = Ollama(model=self.model, temperature = 0)
-            output = llm.invoke(final_prompt)
+            output = invoke_llm(self.model, final_prompt)
         
         return output
     
@@ -70,41 +71,24 @@ class PoemController:
         initial_prompt = "generate me a five line poem with words : "
         final_prompt = f"{initial_prompt} '{input_text}'"
         
-        output = self.generate_output_from_llm(final_prompt)
-        line_boolean, word_boolean = self.check_output(output, input_text_split)
-        
-        print(output)
-        print(line_boolean, word_boolean)
-        
-        if line_boolean == False:
-            final_prompt = final_prompt + '. You did wrong. The total number of lines must be five'
-            
-            counter = 0
-            while line_boolean is False:
-                print("-------------")
-                print(final_prompt)
-                output = self.generate_output_from_llm(final_prompt)
-                print(output)
-                line_boolean, word_boolean = self.check_output(output, input_text_split)
-                print(line_boolean, word_boolean)
-                                
-                if counter > 1:
-                    output = self.maintain_lines(output)
-                    print(output)
-                    line_boolean, word_boolean = self.check_output(output, input_text_split)
-                    print(line_boolean, word_boolean)
-                
-                counter = counter + 1
-                
-                if counter > 5:
-                    return 'please try again with next LLM'
-
-        
-        if word_boolean == False:
-            final_prompt = final_prompt + '. Poem must contains defined words'
-            while word_boolean is False:
-                output = self.generate_output_from_llm(final_prompt)
-                line_boolean, word_boolean = self.check_output(output, input_text_split)
+        def accept(output, complete=False):
+            n_lines = len([line for line in output.split('\n') if line.strip()])
+            # Extra lines are trimmed rather than spending another call on them; on the last
+            # attempt missing lines are generated too
+            if n_lines > 5 or (complete and 0 < n_lines < 5):
+                output = self.maintain_lines(output)
+            line_boolean, word_boolean = self.check_output(output, input_text_split)
+            return output if line_boolean and word_boolean else None
+        
+        result = self.retry_policy.run(self.model, [
+            final_prompt,
+            final_prompt + '. You did wrong. The total number of lines must be five',
+            final_prompt + '. You did wrong. The total number of lines must be five. Poem must contains defined words',
+        ], accept, final_accept=lambda output: accept(output, complete=True))
+        
+        if not result.accepted:
+            return 'please try again with next LLM'
+        output = result.value
         
         self.total_output_list.append(output)
         
@@ -118,10 +102,11 @@ class PoemController:
         input_text_split = self.input_preprocess(input_text)
         poem = self.get_poem(input_text, input_text_split)
         
-        encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-        query_token = len(encoding.encode(''.join(input_text_split)))
-        response_token = len(encoding.encode(''.join(self.total_output_list)))
-        total_token = query_token + response_token
+        with span("tokens.count"):
+            encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+            query_token = len(encoding.encode(''.join(input_text_split)))
+            response_token = len(encoding.encode(''.join(self.total_output_list)))
+            total_token = query_token + response_token
         
         
         return poem, total_token
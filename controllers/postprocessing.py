@@ -0,0 +1,167 @@
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+Replacement = Union[str, Callable[[re.Match], str]]
+
+
+class Rule:
+    """One substitution applied to model output"""
+
+    def __init__(self, pattern: str, replacement: Replacement = '', flags: int = 0,
+                 languages: Sequence[str] = None):
+        self.pattern = pattern
+        self.replacement = replacement
+        self.flags = flags
+        self.languages = set(languages) if languages is not None else None  # None: every language
+        self.compiled = re.compile(pattern, flags)
+
+    def applies_to(self, language: Optional[str]) -> bool:
+        return language is None or self.languages is None or language in self.languages
+
+
+class RuleSet:
+    """
+    Ordered substitutions for one task, compiled once
+
+    Rules run one after another, like the re.sub calls they replace, because
+    one rule's removal can create or break another's match. Where that cannot
+    happen, a single rule combines the alternatives (see SQL_EQUIVALENTS) or
+    does several substitutions in one pass (see SQL_OPERATORS). Alternations
+    are not used as a pre-scan: sre cannot skip ahead on case-insensitive
+    alternatives, so one scan of the alternation costs more than the separate
+    literal-prefixed scans.
+    """
+
+    def __init__(self, name: str, rules: List[Rule]):
+        self.name = name
+        self.rules = list(rules)
+
+    def apply(self, text: str) -> str:
+        for rule in self.rules:
+            text = rule.compiled.sub(rule.replacement, text)
+        return text
+
+    def for_language(self, language: Optional[str]) -> "RuleSet":
+        """The rules that apply to one language, in the same order"""
+        return RuleSet(f"{self.name}.{language}", [rule for rule in self.rules if rule.applies_to(language)])
+
+
+def collapse_whitespace(text: str) -> str:
+    """Same result as re.sub(r'\\s+', ' ', text).strip(); str.split() uses the same whitespace class"""
+    return ' '.join(text.split())
+
+
+# Translation
+
+# A leading ```lang line and a trailing ``` fence
+MARKDOWN_FENCES = RuleSet("markdown_fences", [
+    Rule(r'^```.*?\n'),
+    Rule(r'\n```$'),
+])
+
+# Explanations and instructions the models echo around a translation, tagged with the language
+# they appear in. English phrases and quoted text (often the original sentence) are removed for
+# every target language.
+TRANSLATION_CHATTER = RuleSet("translation_chatter", [
+    Rule(r'La respuesta debe.*?contener', flags=re.IGNORECASE, languages=["spanish"]),
+    Rule(r'The response should.*?contain', flags=re.IGNORECASE),
+    Rule(r'Texto original en inglés.*?', flags=re.IGNORECASE, languages=["spanish"]),
+    Rule(r'Original English text.*?', flags=re.IGNORECASE),
+    Rule(r'Translation:', flags=re.IGNORECASE),
+    Rule(r'Traducción:', flags=re.IGNORECASE, languages=["spanish"]),
+    Rule(r'Übersetzung:', flags=re.IGNORECASE, languages=["german"]),
+    Rule(r'y no se deben modificar los datos del entrada', flags=re.IGNORECASE, languages=["spanish"]),
+    Rule(r'and don\'t alter input text', flags=re.IGNORECASE),
+    Rule(r'\"[^\"]*?\"'),
+])
+
+# Rule sets by target language; None (and any language without rules of its own) gets every rule
+TRANSLATION_RULES: Dict[Optional[str], RuleSet] = {
+    language: TRANSLATION_CHATTER.for_language(language) for language in ("german", "spanish")
+}
+TRANSLATION_RULES[None] = TRANSLATION_CHATTER
+
+# Lines this short are headings or labels rather than part of the translation
+MIN_TRANSLATION_LINE = 5
+
+
+def clean_translation(translation: str, target_language: str = None) -> str:
+    """
+    Remove markdown, explanations, original text and short label lines an LLM
+    added around a translation, and collapse whitespace
+    """
+    translation = MARKDOWN_FENCES.apply(translation)
+    language = target_language.lower() if target_language else None
+    translation = TRANSLATION_RULES.get(language, TRANSLATION_CHATTER).apply(translation)
+    lines = [line for line in translation.split('\n') if len(line.strip()) > MIN_TRANSLATION_LINE]
+    return collapse_whitespace(' '.join(lines))
+
+
+# SQL
+
+# An opening ```sql line, then an opening ``` line, then a closing fence; the first rule removes
+# both openers in one anchored match, as two passes did
+SQL_FENCES = RuleSet("sql_fences", [
+    Rule(r'\A(?:```sql\n(?:```\n)?|```\n)'),
+    Rule(r'\n```$'),
+])
+
+
+def _pad_operators(match: re.Match) -> str:
+    """
+    Spacing of a run of comparison operators
+
+    Each operator gets one space on either side; the space between two equal
+    operators is doubled ("a==b" -> "a =  = b"). This is what padding "=",
+    then ">", then "<" in separate passes produced, and stored exact-match
+    scores depend on it.
+    """
+    operators = [char for char in match.group(0) if char != ' ']
+    padded = ' ' + operators[0]
+    for previous, operator in zip(operators, operators[1:]):
+        padded += ('  ' if operator == previous else ' ') + operator
+    return padded + ' '
+
+
+# Runs on single-spaced text; one pass instead of one per operator
+SQL_OPERATORS = RuleSet("sql_operators", [
+    Rule(r' ?[=<>](?: ?[=<>])* ?', _pad_operators),
+])
+
+# Keyword spellings and quoting that differ between otherwise equal queries. Removing quotes can
+# join words, so these run one after another; the aggregate functions cannot affect each other and
+# share one pattern.
+SQL_EQUIVALENTS = RuleSet("sql_equivalents", [
+    Rule(r'`([^`]*)`', r'\1'),
+    Rule(r'"([^"]*)"', r'\1'),
+    Rule(r'\binner\s+join\b', 'join'),
+    Rule(r'\bleft\s+join\b', 'left join'),
+    Rule(r'\bright\s+join\b', 'right join'),
+    Rule(r'\bfull\s+join\b', 'full join'),
+    Rule(r'\bgroup\s+by\b', 'group by'),
+    Rule(r'\border\s+by\b', 'order by'),
+    Rule(r'\b(\w+)\s+as\s+(\w+)', r'\1 \2'),
+    Rule(r'\b(count|sum|avg|max|min)\s*\(', r'\1('),
+])
+
+
+def clean_sql(sql_query: str) -> str:
+    """Remove markdown code fences around a generated query and put it on one line"""
+    return SQL_FENCES.apply(sql_query).replace('\n', ' ').strip()
+
+
+def _strip_semicolon(query: str) -> str:
+    return query[:-1] if query.endswith(';') else query
+
+
+def normalize_sql(query: str) -> str:
+    """Lowercase, single-spaced query without its trailing semicolon and with spaced operators, for comparison"""
+    return SQL_OPERATORS.apply(_strip_semicolon(collapse_whitespace(query.lower())))
+
+
+def normalize_sql_advanced(query: str) -> str:
+    """normalize_sql's cleanup plus unquoted identifiers and canonical keyword spellings, without aliases' AS"""
+    if not query:
+        return ""
+    query = _strip_semicolon(collapse_whitespace(query.lower()))
+    return SQL_EQUIVALENTS.apply(query)
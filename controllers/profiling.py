@@ -0,0 +1,178 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List
+
+# Profiling defaults; main.py applies the "profiling" section of settings.json
+DEFAULT_PROFILING = {
+    "admin_token_env": "AICI_ADMIN_TOKEN",  # Environment variable holding the admin token; unset disables profiling
+    "directory": "logs/profiles",
+    "sample_interval_ms": 5,
+}
+
+PROFILE_MODES = ("sample", "cprofile")
+
+# The interpreter allows one deterministic profiler at a time
+_cprofile_lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a background thread
+
+    The profiled code runs at full speed apart from the GIL hand-offs to the
+    sampler, so this is suited to live requests. Samples are kept as collapsed
+    stacks ("outer;inner;leaf count"), the input format of flamegraph.pl and
+    speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """One profiled request or benchmark job, saved under the profile directory when stopped"""
+
+    def __init__(self, mode: str, name: str, directory: str, sample_interval: float):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}. Supported: {list(PROFILE_MODES)}")
+        self.mode = mode
+        label = re.sub(r"[^\w.-]+", "_", name).strip("_") or "profile"
+        self.profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{label}_{uuid.uuid4().hex[:8]}"
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.files: List[str] = []
+        self._profiler = None
+        self._sampler = None
+        self._started = None
+        self.summary = None
+
+    def start(self):
+        """Start profiling the calling thread"""
+        self._started = time.perf_counter()
+        if self.mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+            # Another request holds the deterministic profiler; sample this one instead
+            self.mode = "sample"
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.sample_interval)
+            self._sampler.start()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop profiling and write the results; returns a summary with the written files"""
+        if self.summary is not None:
+            return self.summary
+        elapsed = time.perf_counter() - self._started
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.profile_id)
+
+        if self.mode == "cprofile":
+            self._profiler.disable()
+            _cprofile_lock.release()
+            self._profiler.dump_stats(base + ".prof")
+            report = io.StringIO()
+            pstats.Stats(self._profiler, stream=report).sort_stats("cumulative").print_stats(50)
+            with open(base + ".txt", "w") as f:
+                f.write(report.getvalue())
+            self.files = [base + ".prof", base + ".txt"]
+            samples = None
+        else:
+            self._sampler.stop()
+            with open(base + ".collapsed", "w") as f:
+                f.write(self._sampler.collapsed())
+            self.files = [base + ".collapsed"]
+            samples = sum(self._sampler.stacks.values())
+
+        self.summary = {
+            "profile_id": self.profile_id,
+            "mode": self.mode,
+            "elapsed_seconds": elapsed,
+            "samples": samples,
+            "files": self.files,
+        }
+        return self.summary
+
+
+class Profiler:
+    """Admin-gated entry point for profiling requests and benchmark jobs"""
+
+    def __init__(self, **settings):
+        self.configure(settings)
+
+    def configure(self, settings: Dict[str, Any] = None):
+        settings = {**DEFAULT_PROFILING, **(settings or {})}
+        self.admin_token = os.environ.get(settings["admin_token_env"])
+        self.directory = settings["directory"]
+        self.sample_interval = settings["sample_interval_ms"] / 1000
+
+    def requested_mode(self, mode: str, token: str):
+        """
+        The profile mode to use, or None
+
+        Profiling is only honoured with the admin token, compared in constant
+        time; without a configured token it is disabled altogether.
+        """
+        if not mode or not self.admin_token or not token:
+            return None
+        if not hmac.compare_digest(token.encode(), self.admin_token.encode()):
+            return None
+        mode = mode.lower()
+        if mode in ("1", "true", "yes"):
+            mode = "sample"
+        return mode if mode in PROFILE_MODES else None
+
+    def session(self, mode: str, name: str) -> ProfileSession:
+        """A new session; its profile id is known before it starts"""
+        return ProfileSession(mode, name, self.directory, self.sample_interval)
+
+    @contextmanager
+    def profile(self, session: ProfileSession):
+        """Profile the calling thread with the session for the duration of the block (no-op for None)"""
+        if session is None:
+            yield None
+            return
+        session.start()
+        try:
+            yield session
+        finally:
+            session.stop()
+
+
+profiler = Profiler()
@@ -0,0 +1,130 @@
+import time
+from typing import Callable, Dict, Any, List, Optional
+
+from controllers.hedging import hedged_accept
+from controllers.metrics import REGISTRY, LLM_RETRIES
+from controllers.tracing import span
+
+# Used for controllers without their own entry in settings.json
+DEFAULT_RETRY = {
+    "max_attempts": 3,           # LLM calls per operation, including the first
+    "budget_seconds": 60.0,      # No new attempt starts once this much time has passed
+    "fallback_model": None,      # Ollama model tried last, after the rephrasings (None: no model switch)
+}
+
+RETRY_ATTEMPTS = REGISTRY.counter(
+    "aici_retry_attempts_total", "LLM attempts made under a retry policy", ["policy", "strategy", "outcome"]
+)
+RETRY_EXHAUSTED = REGISTRY.counter(
+    "aici_retry_exhausted_total", "Operations that ran out of attempts or budget without an accepted output",
+    ["policy", "reason"]
+)
+
+
+class RetryResult:
+    """Outcome of a retried LLM operation"""
+
+    def __init__(self, value: Any, output: Optional[str], attempts: List[Dict[str, Any]], accepted: bool):
+        self.value = value          # What accept() returned for the accepted output, else None
+        self.output = output        # Raw output of the last attempt
+        self.attempts = attempts    # Telemetry, one dict per attempt
+        self.accepted = accepted
+
+
+class RetryPolicy:
+    """
+    Bounded retries with escalation for one controller
+
+    Generations run at temperature 0, so repeating an identical call rarely
+    helps. Each attempt therefore escalates: the first uses the original
+    prompt, the following ones the caller's rephrasings in order, and the last
+    the original prompt on fallback_model (when configured). At most
+    max_attempts calls are made, and none is started after budget_seconds, so
+    the worst case is bounded by the budget plus one call. Attempts go through
+    the hedger, so with hedging enabled for the controller a slow attempt may
+    also be raced against a backup model.
+    """
+
+    def __init__(self, name: str, max_attempts: int, budget_seconds: float, fallback_model: str = None):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.budget_seconds = budget_seconds
+        self.fallback_model = fallback_model
+
+    def plan(self, model: str, prompts: List[str]) -> List[tuple]:
+        """(strategy, model, prompt) for each attempt, in order"""
+        steps = [("initial", model, prompts[0])]
+        steps += [("rephrase", model, prompt) for prompt in prompts[1:]]
+        if self.fallback_model and self.fallback_model != model:
+            steps.append(("switch_model", self.fallback_model, prompts[0]))
+        return steps[:max(self.max_attempts, 1)]
+
+    def run(self, model: str, prompts: List[str], accept: Callable[[str], Any], stop: List[str] = None,
+            final_accept: Callable[[str], Any] = None, **invoke_kwargs) -> RetryResult:
+        """
+        Call the LLM until accept() returns something other than None
+
+        Args:
+            model: Ollama model for the initial and rephrased attempts
+            prompts: The original prompt followed by rephrasings, in escalation order
+            accept: Validates (and may post-process) an output; None rejects it
+            stop: Stop sequences for every attempt
+            final_accept: Used instead of accept on the last planned attempt, e.g. to repair an output
+                rather than reject it
+            invoke_kwargs: Passed to every LLM call (e.g. format="json")
+        """
+        started = time.perf_counter()
+        attempts = []
+        output = None
+
+        steps = self.plan(model, prompts)
+        for number, (strategy, attempt_model, prompt) in enumerate(steps, start=1):
+            if number > 1:
+                if time.perf_counter() - started >= self.budget_seconds:
+                    RETRY_EXHAUSTED.inc(policy=self.name, reason="budget")
+                    return RetryResult(None, output, attempts, False)
+                LLM_RETRIES.inc(model=attempt_model, controller=self.name)
+
+            attempt_started = time.perf_counter()
+            with span("retry.attempt", policy=self.name, attempt=number, strategy=strategy, model=attempt_model) as attempt_span:
+                check = final_accept if final_accept is not None and number == len(steps) else accept
+                output, value = hedged_accept(self.name, attempt_model, prompt, check, stop=stop, **invoke_kwargs)
+                if attempt_span is not None:
+                    attempt_span.set(accepted=value is not None)
+
+            outcome = "accepted" if value is not None else "rejected"
+            RETRY_ATTEMPTS.inc(policy=self.name, strategy=strategy, outcome=outcome)
+            attempts.append({
+                "attempt": number,
+                "strategy": strategy,
+                "model": attempt_model,
+                "duration_ms": (time.perf_counter() - attempt_started) * 1000,
+                "outcome": outcome,
+            })
+            if value is not None:
+                return RetryResult(value, output, attempts, True)
+
+        RETRY_EXHAUSTED.inc(policy=self.name, reason="attempts")
+        return RetryResult(None, output, attempts, False)
+
+
+class RetryPolicies:
+    """Per-controller retry settings; main.py applies settings.json at startup"""
+
+    def __init__(self):
+        self.configure()
+
+    def configure(self, default: Dict[str, Any] = None, controllers: Dict[str, Dict[str, Any]] = None):
+        """
+        Args:
+            default: Overrides for DEFAULT_RETRY
+            controllers: Per-controller overrides keyed by class name, e.g. "PoemController"
+        """
+        self.default = {**DEFAULT_RETRY, **(default or {})}
+        self.controllers = controllers or {}
+
+    def get(self, name: str) -> RetryPolicy:
+        return RetryPolicy(name, **{**self.default, **self.controllers.get(name, {})})
+
+
+retry_policies = RetryPolicies()
@@ -0,0 +1,312 @@
+import hashlib
+import itertools
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+
+import jsonschema
+
+from controllers.metrics import record_cache
+
+# Validators kept; clients send a handful of schemas, so this rarely evicts
+DEFAULT_CACHE_SIZE = 64
+
+# Keywords that don't affect validation here: jsonschema.validate checks "format" only with a
+# format checker, and definitions only matter through $ref, which is never compiled
+_ANNOTATIONS = {"$schema", "$id", "$comment", "title", "description", "default", "examples", "format",
+                "readOnly", "writeOnly", "definitions", "$defs"}
+
+_COMPILED_KEYWORDS = {
+    "type", "properties", "required", "additionalProperties", "items", "enum", "const",
+    "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "minLength", "maxLength",
+    "pattern", "minItems", "maxItems", "minProperties", "maxProperties",
+}
+
+# Exact-type tests; stricter than jsonschema for subclasses, which only costs a trip through jsonschema
+_TYPE_TESTS = {
+    "object": "type({0}) is dict",
+    "array": "type({0}) is list",
+    "string": "type({0}) is str",
+    "boolean": "type({0}) is bool",
+    "null": "{0} is None",
+    "number": "type({0}) in (int, float)",
+    "integer": "(type({0}) is int or (type({0}) is float and {0}.is_integer()))",
+}
+
+# Draft 4 predates integral floats counting as integers
+_DRAFT4_TYPE_TESTS = {**_TYPE_TESTS, "integer": "type({0}) is int"}
+
+Check = Callable[[Any], bool]
+
+# Deepest indentation the generated code may use. Python allows 20 nested loops and 100
+# indentation levels; deeper schemas are left to jsonschema.
+_MAX_DEPTH = 16
+
+
+class Unsupported(Exception):
+    """The schema uses a keyword the fast path does not compile"""
+
+
+def schema_key(schema: Dict[str, Any]) -> str:
+    """Hash of the schema's canonical JSON form, so key order and whitespace don't matter"""
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _strict_equal(one, two) -> bool:
+    """Equal with the same type at every depth, so True never equals 1, not even inside a list"""
+    if type(one) is not type(two):
+        return False
+    if type(one) is dict:
+        return one.keys() == two.keys() and all(_strict_equal(value, two[key]) for key, value in one.items())
+    if type(one) is list:
+        return len(one) == len(two) and all(_strict_equal(a, b) for a, b in zip(one, two))
+    return one == two
+
+
+def _in_enum(value, options) -> bool:
+    return any(_strict_equal(value, option) for option in options)
+
+
+class _CodeGenerator:
+    """
+    Writes a Python function that returns True only for instances the schema accepts
+
+    The function may return False for a valid instance (enum and const compare
+    types strictly, for example); callers confirm every False with jsonschema,
+    so only True must be exact. Schema values never appear in the source: they
+    are passed in as named constants.
+    """
+
+    def __init__(self, type_tests: Dict[str, str] = None):
+        self.type_tests = type_tests or _TYPE_TESTS
+        self.lines = ["def check(instance):"]
+        self.constants = {"_in_enum": _in_enum}
+        self._names = itertools.count()
+
+    def name(self, prefix: str) -> str:
+        return f"{prefix}{next(self._names)}"
+
+    def constant(self, value) -> str:
+        name = self.name("c")
+        self.constants[name] = value
+        return name
+
+    def line(self, depth: int, text: str):
+        self.lines.append("    " * depth + text)
+
+    def function(self, schema) -> Check:
+        self.emit(schema, "instance", 1)
+        self.line(1, "return True")
+        namespace = dict(self.constants)
+        exec("\n".join(self.lines), namespace)
+        return namespace["check"]
+
+    def emit(self, schema, var: str, depth: int):
+        """Statements that return False when var fails the schema"""
+        if depth > _MAX_DEPTH:
+            raise Unsupported("nesting depth")
+        if schema is True:
+            return
+        if schema is False:
+            self.line(depth, "return False")
+            return
+        if not isinstance(schema, dict):
+            raise Unsupported(repr(schema))
+        unknown = set(schema) - _ANNOTATIONS - _COMPILED_KEYWORDS
+        if unknown:
+            raise Unsupported(", ".join(sorted(unknown)))
+
+        types = schema.get("type")
+        known = None
+        if types is not None:
+            types = [types] if isinstance(types, str) else list(types)
+            if any(name not in self.type_tests for name in types):
+                raise Unsupported(f"type {types}")
+            self.line(depth, f"if not ({' or '.join(self.type_tests[name].format(var) for name in types)}): return False")
+            if len(types) == 1:
+                # Later checks can skip their own type guard
+                known = types[0]
+
+        self._numbers(schema, var, depth, known)
+        self._strings(schema, var, depth, known)
+        self._objects(schema, var, depth, known)
+        self._arrays(schema, var, depth, known)
+
+        if "enum" in schema:
+            self.line(depth, f"if not _in_enum({var}, {self.constant(list(schema['enum']))}): return False")
+        if "const" in schema:
+            self.line(depth, f"if not _in_enum({var}, {self.constant([schema['const']])}): return False")
+
+    def _guarded(self, depth: int, var: str, kind: str, known: str) -> int:
+        """Open an "if <var> is a <kind>" block unless the type is already known; returns the body depth"""
+        if known == kind or (kind == "number" and known == "integer"):
+            return depth
+        self.line(depth, f"if {self.type_tests[kind].format(var)}:")
+        return depth + 1
+
+    def _numbers(self, schema, var, depth, known):
+        comparisons = [("minimum", "<"), ("maximum", ">"), ("exclusiveMinimum", "<="), ("exclusiveMaximum", ">=")]
+        present = [(keyword, op) for keyword, op in comparisons if keyword in schema]
+        if not present:
+            return
+        for keyword in ("exclusiveMinimum", "exclusiveMaximum"):
+            if isinstance(schema.get(keyword), bool):
+                # Draft 4 form, which modifies minimum/maximum
+                raise Unsupported(keyword)
+        body = self._guarded(depth, var, "number", known)
+        for keyword, op in present:
+            self.line(body, f"if {var} {op} {self.constant(schema[keyword])}: return False")
+
+    def _strings(self, schema, var, depth, known):
+        if not any(keyword in schema for keyword in ("minLength", "maxLength", "pattern")):
+            return
+        body = self._guarded(depth, var, "string", known)
+        if "minLength" in schema:
+            self.line(body, f"if len({var}) < {self.constant(schema['minLength'])}: return False")
+        if "maxLength" in schema:
+            self.line(body, f"if len({var}) > {self.constant(schema['maxLength'])}: return False")
+        if "pattern" in schema:
+            self.line(body, f"if {self.constant(re.compile(schema['pattern']))}.search({var}) is None: return False")
+
+    def _objects(self, schema, var, depth, known):
+        properties = schema.get("properties", {})
+        required = schema.get("required", [])
+        additional = schema.get("additionalProperties", True)
+        if not (properties or required or additional is not True
+                or "minProperties" in schema or "maxProperties" in schema):
+            return
+        body = self._guarded(depth, var, "object", known)
+        if required:
+            self.line(body, f"for name in {self.constant(tuple(required))}:")
+            self.line(body + 1, f"if name not in {var}: return False")
+        if "minProperties" in schema:
+            self.line(body, f"if len({var}) < {self.constant(schema['minProperties'])}: return False")
+        if "maxProperties" in schema:
+            self.line(body, f"if len({var}) > {self.constant(schema['maxProperties'])}: return False")
+        for name, subschema in properties.items():
+            if subschema is True or subschema == {}:
+                continue
+            item = self.name("v")
+            key = self.constant(name)
+            self.line(body, f"if {key} in {var}:")
+            self.line(body + 1, f"{item} = {var}[{key}]")
+            self.emit(subschema, item, body + 1)
+        if additional is not True:
+            names = self.constant(frozenset(properties))
+            key, item = self.name("k"), self.name("v")
+            self.line(body, f"for {key}, {item} in {var}.items():")
+            self.line(body + 1, f"if {key} not in {names}:")
+            self.emit(additional, item, body + 2)
+
+    def _arrays(self, schema, var, depth, known):
+        items = schema.get("items", True)
+        if items is not True and not isinstance(items, (dict, bool)):
+            # Tuple form, whose meaning changed between drafts
+            raise Unsupported("items")
+        if items == {}:
+            items = True
+        if items is True and "minItems" not in schema and "maxItems" not in schema:
+            return
+        body = self._guarded(depth, var, "array", known)
+        if "minItems" in schema:
+            self.line(body, f"if len({var}) < {self.constant(schema['minItems'])}: return False")
+        if "maxItems" in schema:
+            self.line(body, f"if len({var}) > {self.constant(schema['maxItems'])}: return False")
+        if items is not True:
+            item = self.name("v")
+            self.line(body, f"for {item} in {var}:")
+            self.emit(items, item, body + 1)
+
+
+class CompiledSchema:
+    """
+    A schema checked once and prepared for repeated validation
+
+    Schemas built from the common keywords (type, properties, required, items,
+    numeric and length bounds, ...) are compiled into a generated Python
+    function that accepts a valid instance without going through jsonschema's
+    per-keyword dispatch. Anything
+    the checks reject, and every schema using other keywords ($ref, allOf, ...),
+    goes to a jsonschema validator built once for the schema, so errors and
+    edge cases match jsonschema.validate exactly.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        self.schema = schema
+        self.validator = validator_class(schema)
+        self.fast_check: Optional[Check] = None
+        self.source = None
+        if validator_class is not jsonschema.Draft3Validator:
+            # Draft 3 gives "required" and "type" different meanings
+            draft4 = validator_class is jsonschema.Draft4Validator
+            generator = _CodeGenerator(_DRAFT4_TYPE_TESTS if draft4 else _TYPE_TESTS)
+            try:
+                self.fast_check = generator.function(schema)
+                self.source = "\n".join(generator.lines)
+            except (Unsupported, SyntaxError, RecursionError, MemoryError):
+                # jsonschema validates what the generated code can't express
+                pass
+
+    @property
+    def compiled(self) -> bool:
+        return self.fast_check is not None
+
+    def best_error(self, instance) -> Optional[jsonschema.exceptions.ValidationError]:
+        """The error jsonschema.validate would raise for the instance, or None if it is valid"""
+        if self.fast_check is not None and self.fast_check(instance):
+            return None
+        return jsonschema.exceptions.best_match(self.validator.iter_errors(instance))
+
+    def validate(self, instance):
+        """Raise jsonschema's ValidationError if the instance is invalid"""
+        error = self.best_error(instance)
+        if error is not None:
+            raise error
+
+
+class SchemaValidatorCache:
+    """Compiled schemas by canonical hash, least recently used evicted first"""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._validators = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, schema: Dict[str, Any]) -> CompiledSchema:
+        """The compiled schema; raises jsonschema's SchemaError for an invalid schema (not cached)"""
+        key = schema_key(schema)
+        with self._lock:
+            compiled = self._validators.get(key)
+            if compiled is not None:
+                self._validators.move_to_end(key)
+        record_cache("json_schema", compiled is not None)
+        if compiled is not None:
+            return compiled
+
+        compiled = CompiledSchema(schema)
+        with self._lock:
+            self._validators[key] = compiled
+            while len(self._validators) > self.max_size:
+                self._validators.popitem(last=False)
+        return compiled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._validators),
+                "max_size": self.max_size,
+                "compiled": sum(1 for compiled in self._validators.values() if compiled.compiled),
+            }
+
+
+validator_cache = SchemaValidatorCache()
+
+
+def validate_cached(instance, schema: Dict[str, Any]):
+    """Drop-in for jsonschema.validate(instance, schema) that reuses the schema's compiled validator"""
+    validator_cache.get(schema).validate(instance)
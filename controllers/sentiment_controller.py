@@ -1,12 +1,105 @@
+import json
 import re
+import threading
+import nltk
 import tiktoken
-from langchain_community.llms import Ollama
+from controllers.llm_gateway import DeadlineExceeded
+from controllers.hedging import hedged_accept
+from controllers.metrics import REGISTRY
+from controllers.retry_policy import retry_policies
+from controllers.tracing import span
+
+SENTIMENT_LABELS = ['positive', 'negative', 'neutral']
+
+# Structured-output settings; main.py applies the "sentiment" section of settings.json
+SENTIMENT_OPTIONS = {
+    "structured": True,          # Ask Ollama for JSON constrained to the labels instead of scanning free text
+    "batch_sentences": True,     # Classify all sentences of a request in one structured call
+    "lexicon": True,             # Label clear-cut sentences with the VADER lexicon, without an LLM call
+    "lexicon_threshold": 0.6,    # Minimum |compound| score for a lexicon label; weaker scores go to the LLM
+}
+
+# Which stage labelled each sentence: lexicon, llm_batch, llm, or default (no usable answer)
+SENTIMENT_STAGES = REGISTRY.counter("aici_sentiment_stage_total", "Sentences labelled by each sentiment stage", ["stage"])
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+_lexicon_failed = False
+
+
+def configure_sentiment(options=None):
+    SENTIMENT_OPTIONS.update(options or {})
+
+
+def load_lexicon():
+    """
+    Load the shared VADER analyzer, downloading the lexicon if it is missing
+
+    main.py calls this at startup, so no request waits for the download.
+    Returns the analyzer, or None if the lexicon is unavailable.
+    """
+    global _lexicon, _lexicon_failed
+    with _lexicon_lock:
+        if _lexicon is None and not _lexicon_failed:
+            try:
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                try:
+                    _lexicon = SentimentIntensityAnalyzer()
+                except LookupError:
+                    with span("nltk.download", package="vader_lexicon"):
+                        nltk.download('vader_lexicon', quiet=True)
+                    _lexicon = SentimentIntensityAnalyzer()
+            except (LookupError, ImportError, OSError) as e:
+                # Every sentence goes to the LLM, as before the lexicon stage existed
+                print(f"\033[91mVADER lexicon unavailable, skipping the lexicon stage: {e}\033[0m")
+                _lexicon_failed = True
+    return _lexicon
+
+
+def lexicon_analyzer():
+    """The shared VADER analyzer if load_lexicon succeeded, else None; never loads or downloads"""
+    return _lexicon
+
+
+def lexicon_label(sentence):
+    """'positive' or 'negative' when the lexicon is confident about the sentence, else None"""
+    analyzer = lexicon_analyzer()
+    if analyzer is None:
+        return None
+    compound = analyzer.polarity_scores(sentence)['compound']
+    if abs(compound) < SENTIMENT_OPTIONS["lexicon_threshold"]:
+        # Weak, mixed or neutral wording: leave it to the model
+        return None
+    return 'positive' if compound > 0 else 'negative'
+
+
+def parse_json_answer(output):
+    """The JSON object in a model answer, or None"""
+    try:
+        data = json.loads(output)
+    except (json.JSONDecodeError, TypeError):
+        # Tolerate text around the object
+        match = re.search(r'\{.*\}', output or '', re.DOTALL)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_label(value):
+    """A sentiment label from a structured answer, or None"""
+    label = str(value).strip().lower() if value is not None else ''
+    return label if label in SENTIMENT_LABELS else None
 
 
 class SentimentController:
     def __init__(self, model):
         self.model = model
         self.total_output_list = []
+        self.retry_policy = retry_policies.get("SentimentController")
 
     def filter_sentiment(self, output, input_text):
         output_lower = output.lower()
@@ -20,43 +113,75 @@ class SentimentController:
                 return output_sentiment
         return None
 
-    def get_sentiment(self, input_text):
-        llm = Ollama(model=self.model, temperature=0)
-        initial_prompt = "sentiment of this sentence is"
-        final_prompt = f"{initial_prompt} '{input_text}'"
+    def get_sentiment_structured(self, input_text):
+        """Label from a JSON answer constrained to the three labels, or None"""
+        prompt = (
+            f"Classify the sentiment of this sentence as positive, negative or neutral: '{input_text}'\n"
+            'Answer with JSON only, in the form {"sentiment": "positive"}.'
+        )
+        result = self.retry_policy.run(
+            self.model,
+            [prompt],
+            lambda output: parse_label((parse_json_answer(output) or {}).get('sentiment')),
+            format='json'
+        )
+        return result.value
+
+    def get_sentiments_structured(self, sentence_list):
+        """
+        Labels for all sentences from one JSON answer
+
+        Entries the model left out or got wrong are None, so the caller can
+        classify just those sentences individually.
+        """
+        numbered = '\n'.join(f"{index + 1}. {sentence}" for index, sentence in enumerate(sentence_list))
+        prompt = (
+            "Classify the sentiment of each numbered sentence as positive, negative or neutral.\n"
+            f"{numbered}\n"
+            f'Answer with JSON only, in the form {{"sentiments": ["positive", ...]}}, '
+            f"with exactly {len(sentence_list)} labels in sentence order."
+        )
+        _, answer = hedged_accept("SentimentController", self.model, prompt, parse_json_answer, format='json')
+        answer = answer or {}
+        labels = answer.get('sentiments')
+        if not isinstance(labels, list) or len(labels) != len(sentence_list):
+            return [None] * len(sentence_list)
+        return [parse_label(label) for label in labels]
+
+    def get_sentiment(self, input_text, use_lexicon=True):
+        if use_lexicon and SENTIMENT_OPTIONS["lexicon"]:
+            output_sentiment = lexicon_label(input_text)
+            if output_sentiment is not None:
+                SENTIMENT_STAGES.inc(stage="lexicon")
+                return output_sentiment
 
-        print("final_prompt", final_prompt)
+        if SENTIMENT_OPTIONS["structured"]:
+            output_sentiment = self.get_sentiment_structured(input_text)
+            if output_sentiment is not None:
+                SENTIMENT_STAGES.inc(stage="llm")
+                return output_sentiment
 
-        output = llm.invoke(final_prompt, stop=['.'])
-        print("output:", output)
-        output_sentiment = self.filter_sentiment(output, input_text)
-        
-        print("output_sentiment:", output_sentiment)
+        # Free-text answer scanned for a label
+        initial_prompt = "sentiment of this sentence is"
+        final_prompt = f"{initial_prompt} '{input_text}'"
 
-        if output_sentiment is None:
-            counter = 0 
-            while output_sentiment is None:
-                output = llm.invoke(final_prompt + ' in positive, negative and neutral is', stop=['.'])
-                self.total_output_list.append(output)
-                print(output)
-                output_sentiment = self.filter_sentiment(output, input_text)
-                counter = counter + 1
-                if counter > 5:
-                    break
-            
-            counter = 0
-            while output_sentiment is None:
-                output = llm.invoke(final_prompt)
-                print(output)
-                output_sentiment = self.filter_sentiment(output, input_text)
-                counter = counter + 1
-                if counter > 5:
-                    break
+        # Escalate by naming the choices, then (if configured) by switching model
+        result = self.retry_policy.run(
+            self.model,
+            [final_prompt, final_prompt + ' in positive, negative and neutral is'],
+            lambda output: self.filter_sentiment(output, input_text),
+            stop=['.']
+        )
+        if len(result.attempts) > 1:
+            self.total_output_list.append(result.output)
+        output_sentiment = result.value
         
         if output_sentiment is None:
+            SENTIMENT_STAGES.inc(stage="default")
             return "neutral"
         
         else:
+            SENTIMENT_STAGES.inc(stage="llm")
             return output_sentiment
 
     def input_preprocess(self, input_text):
@@ -65,7 +190,6 @@ class SentimentController:
 
     def generate_sentiment(self, input_text):
         sentence_list = self.input_preprocess(input_text)
-        print(sentence_list)
 
         sentiment_dict = {
             'positive': 0,
@@ -73,8 +197,36 @@ class SentimentController:
             'neutral': 0
         }
 
-        for sentence in sentence_list:
-            sentiment_type = self.get_sentiment(sentence)
+        labels = [None] * len(sentence_list)
+        try:
+            # Clear-cut sentences are labelled locally; only the rest cost LLM calls
+            if SENTIMENT_OPTIONS["lexicon"] and lexicon_analyzer() is not None:
+                with span("sentiment.lexicon", sentences=len(sentence_list)) as lexicon_span:
+                    labels = [lexicon_label(sentence) for sentence in sentence_list]
+                    labelled = sum(label is not None for label in labels)
+                    if lexicon_span is not None:
+                        lexicon_span.set(labelled=labelled)
+                SENTIMENT_STAGES.inc(labelled, stage="lexicon")
+
+            pending = [index for index, label in enumerate(labels) if label is None]
+            if SENTIMENT_OPTIONS["structured"] and SENTIMENT_OPTIONS["batch_sentences"] and len(pending) > 1:
+                with span("sentiment.batch", sentences=len(pending)):
+                    batch_labels = self.get_sentiments_structured([sentence_list[index] for index in pending])
+                for index, label in zip(pending, batch_labels):
+                    if label is not None:
+                        labels[index] = label
+                        SENTIMENT_STAGES.inc(stage="llm_batch")
+
+            for index, sentence in enumerate(sentence_list):
+                if labels[index] is None:
+                    with span("sentiment.sentence", index=index):
+                        labels[index] = self.get_sentiment(sentence, use_lexicon=False)
+        except DeadlineExceeded:
+            # Out of time: return the counts so far, if any sentence has been labelled
+            if not any(labels):
+                raise
+
+        for sentiment_type in labels:
             if sentiment_type:
                 sentiment_dict[sentiment_type] += 1
         
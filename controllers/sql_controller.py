@@ -1,6 +1,7 @@
-import re
 import tiktoken
-from langchain_community.llms import Ollama
+from controllers.llm_gateway import OverloadedError, DeadlineExceeded
+from controllers.retry_policy import retry_policies
+from controllers.postprocessing import clean_sql
 from typing import Dict, Tuple, Any
 from datetime import datetime  # Add this import for the error handler
 
@@ -8,6 +9,7 @@ class SQLController:
     def __init__(self, model):
         self.model = model
         self.total_output_list = []
+        self.retry_policy = retry_policies.get("SQLController")
         self.supported_operations = {
             "select": "Generate a SELECT query to retrieve data",
             "insert": "Generate an INSERT query to add data",
@@ -33,16 +35,7 @@ class SQLController:
         Clean the SQL query output by removing markdown code block formatting
         and any other unnecessary formatting.
         """
-        # Remove markdown code block formatting
-        sql_query = re.sub(r'^```sql\n', '', sql_query)
-        sql_query = re.sub(r'^```\n', '', sql_query)
-        sql_query = re.sub(r'\n```$', '', sql_query)
-        sql_query = re.sub(r'\n', ' ', sql_query)
-        
-        # Remove any leading/trailing whitespace
-        sql_query = sql_query.strip()
-        
-        return sql_query
+        return clean_sql(sql_query)
 
     def generate_sql_query(self, input_data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
         try:
@@ -67,15 +60,15 @@ class SQLController:
             4. Uses proper data types for CREATE TABLE
             """
 
-            # Generate SQL query
-            llm = Ollama(model=self.model, temperature=0)
-            sql_query = llm.invoke(prompt).strip()
-
-            # Validate the generated query
-            if not self.validate_sql(sql_query):
-                # Retry with more specific prompt
-                retry_prompt = f"{prompt}\nPrevious attempt was invalid. Please ensure proper SQL syntax."
-                sql_query = llm.invoke(retry_prompt).strip()
+            # Generate SQL query, retrying with a more specific prompt while validation fails;
+            # if every attempt fails, the last query is returned as before
+            retry_prompt = f"{prompt}\nPrevious attempt was invalid. Please ensure proper SQL syntax."
+            result = self.retry_policy.run(
+                self.model,
+                [prompt, retry_prompt],
+                lambda output: output.strip() if self.validate_sql(output.strip()) else None
+            )
+            sql_query = result.value if result.accepted else result.output.strip()
 
             # Clean the SQL query output
             sql_query = self.clean_sql_output(sql_query)
@@ -96,6 +89,8 @@ class SQLController:
 
             return response_data, total_token
 
+        except (OverloadedError, DeadlineExceeded):
+            raise
         except Exception as e:
             error_response = {
                 "error": str(e),
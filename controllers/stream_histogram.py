@@ -0,0 +1,161 @@
+import math
+from statistics import NormalDist
+from typing import Dict, Any, Iterable
+
+# Quantiles reported by StreamingHistogram.summary()
+SUMMARY_QUANTILES = {"p50": 0.50, "p90": 0.90, "p95": 0.95, "p99": 0.99}
+
+
+class StreamingHistogram:
+    """
+    Log-bucketed histogram for latencies and token counts
+
+    Values fall into buckets whose bounds grow by a constant factor, so every
+    quantile is within about half of that growth (2.5% by default) of the
+    exact value, however many samples are recorded. Mean and variance are
+    tracked exactly with Welford's algorithm. Histograms with the same bucket
+    layout merge by adding counts, so per-worker or per-run histograms can be
+    combined without the raw samples.
+    """
+
+    def __init__(self, growth: float = 1.05, min_value: float = 1e-6):
+        self.growth = growth
+        self.min_value = min_value
+        self._log_growth = math.log(growth)
+        self.buckets = {}  # Bucket index -> count
+        self.zero_count = 0  # Values at or below min_value (e.g. 0 tokens)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], **kwargs) -> "StreamingHistogram":
+        """Build a histogram from an iterable of values"""
+        histogram = cls(**kwargs)
+        for value in values:
+            histogram.record(value)
+        return histogram
+
+    def record(self, value: float):
+        """Add one observation"""
+        value = float(value)
+        if value <= self.min_value:
+            self.zero_count += 1
+        else:
+            index = math.floor(math.log(value / self.min_value) / self._log_growth)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+
+        # Welford's online update of mean and sum of squared deviations
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "StreamingHistogram") -> "StreamingHistogram":
+        """Fold another histogram with the same bucket layout into this one"""
+        if (other.growth, other.min_value) != (self.growth, self.min_value):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        if other.count == 0:
+            return self
+
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+
+        # Chan et al. parallel combination of the Welford statistics
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0 <= q <= 1); 0 for an empty histogram"""
+        if self.count == 0:
+            return 0.0
+
+        rank = q * (self.count - 1) + 1
+        seen = self.zero_count
+        if seen >= rank:
+            return self.min
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Geometric midpoint of the bucket, kept inside the observed range
+                value = self.min_value * self.growth ** (index + 0.5)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def stddev(self) -> float:
+        """Sample standard deviation"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def confidence_interval(self, level: float = 0.95):
+        """Normal-approximation confidence interval for the mean"""
+        if self.count < 2:
+            return (self.mean, self.mean)
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        margin = z * self.stddev / math.sqrt(self.count)
+        return (self.mean - margin, self.mean + margin)
+
+    def summary(self) -> Dict[str, float]:
+        """Count, mean, spread, tail quantiles and the 95% confidence interval of the mean"""
+        ci_low, ci_high = self.confidence_interval()
+        summary = {
+            "count": self.count,
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+        }
+        for name, q in SUMMARY_QUANTILES.items():
+            summary[name] = self.quantile(q)
+        summary["ci95_low"] = ci_low
+        summary["ci95_high"] = ci_high
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable state, enough to restore and merge the histogram later"""
+        return {
+            "growth": self.growth,
+            "min_value": self.min_value,
+            "buckets": {str(index): count for index, count in sorted(self.buckets.items())},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self._m2,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingHistogram":
+        """Restore a histogram saved with to_dict"""
+        histogram = cls(growth=data["growth"], min_value=data["min_value"])
+        histogram.buckets = {int(index): count for index, count in data["buckets"].items()}
+        histogram.zero_count = data["zero_count"]
+        histogram.count = data["count"]
+        histogram.mean = data["mean"]
+        histogram._m2 = data["m2"]
+        if histogram.count:
+            histogram.min = data["min"]
+            histogram.max = data["max"]
+        return histogram
+
+
+def distribution_columns(histogram: StreamingHistogram, prefix: str) -> Dict[str, float]:
+    """Tail statistics of a histogram as flat columns, e.g. {"time_p95": ..., "time_stddev": ...}"""
+    summary = (histogram if histogram is not None else StreamingHistogram()).summary()
+    stats = list(SUMMARY_QUANTILES) + ["max", "stddev", "ci95_low", "ci95_high"]
+    return {f"{prefix}_{stat}": summary[stat] for stat in stats}
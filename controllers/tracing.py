@@ -0,0 +1,142 @@
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, List
+
+# Tracing defaults; main.py applies the "tracing" section of settings.json
+DEFAULT_TRACING = {
+    "sample_rate": 0.0,          # Fraction of requests traced without asking for it
+    "path": "logs/traces.jsonl",
+}
+
+# Span the code is currently running in; None when the request is not traced
+current_span = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    """One timed step of a traced request"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "start", "_clock", "duration", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: str = None, attributes: Dict[str, Any] = None):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self._clock = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def end(self):
+        self.duration = time.perf_counter() - self._clock
+
+    def set(self, **attributes):
+        """Add attributes to the span"""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": (self.duration or 0) * 1000,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """The spans of one request, exported together when it finishes"""
+
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = self.add(name, None, attributes)
+
+    def add(self, name: str, parent_id: str, attributes: Dict[str, Any]) -> Span:
+        span = Span(self, name, parent_id, attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+
+class Tracer:
+    """Starts traces for sampled requests and appends finished ones to a JSON lines file"""
+
+    def __init__(self, **settings):
+        self._lock = threading.Lock()
+        self.configure(settings)
+
+    def configure(self, settings: Dict[str, Any] = None):
+        settings = {**DEFAULT_TRACING, **(settings or {})}
+        self.sample_rate = settings["sample_rate"]
+        self.path = settings["path"]
+
+    def should_trace(self, requested: bool = False) -> bool:
+        """Trace when the caller asked for it, or by sampling"""
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self, name: str, **attributes):
+        """Begin a trace and make its root span current; returns (trace, token for finish)"""
+        trace = Trace(name, **attributes)
+        return trace, current_span.set(trace.root)
+
+    def finish(self, trace: Trace, token, **attributes):
+        """Close the root span, restore the context and export every span of the trace"""
+        root = trace.root
+        root.set(**attributes)
+        root.end()
+        current_span.reset(token)
+        self.export(trace)
+
+    def export(self, trace: Trace):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in trace.spans)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(lines)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a step of the current request as a child of the current span
+
+    When the request is not traced this only reads a context variable, so it
+    can wrap hot paths. Yields the Span (or None) so callers can add attributes.
+    """
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.trace.add(name, parent.span_id, attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.end()
+        current_span.reset(token)
+
+
+def annotate(**attributes):
+    """Add attributes to the current span, if the request is traced"""
+    current = current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+tracer = Tracer()
@@ -2,13 +2,18 @@ import re
 import nltk
 from nltk.corpus import words
 import tiktoken
-from langchain.llms import Ollama
+from controllers.llm_gateway import OverloadedError, DeadlineExceeded
+from controllers.hedging import hedged_invoke
+from controllers.postprocessing import clean_translation
+from controllers.language_id import language_id
+from controllers.tracing import span
 
 class TranslationController:
     def __init__(self, model):
         self.model = model
-        nltk.download('words')
-        self.english_words = set(words.words())
+        with span("nltk.download", package="words"):
+            nltk.download('words')
+            self.english_words = set(words.words())
         self.total_output_list = []
         self.supported_languages = {
             "german": {
@@ -30,46 +35,17 @@ class TranslationController:
         Clean the translation output by removing any explanations, original text,
         or instructions that might have been included by the LLM.
         """
-        # Remove markdown formatting if present
-        translation = re.sub(r'^```.*?\n', '', translation)
-        translation = re.sub(r'\n```$', '', translation)
-        
-        # Remove phrases that indicate explanations or instructions
-        explanation_patterns = [
-            r'(?i)La respuesta debe.*?contener',
-            r'(?i)The response should.*?contain',
-            r'(?i)Texto original en inglés.*?',
-            r'(?i)Original English text.*?',
-            r'(?i)Translation:',
-            r'(?i)Traducción:',
-            r'(?i)Übersetzung:',
-            r'(?i)y no se deben modificar los datos del entrada',
-            r'(?i)and don\'t alter input text',
-            r'\"[^\"]*?\"',  # Remove quoted text which often contains original text
-        ]
-        
-        for pattern in explanation_patterns:
-            translation = re.sub(pattern, '', translation)
-        
-        # Remove any lines that are too short (likely not part of the translation)
-        lines = translation.split('\n')
-        filtered_lines = [line for line in lines if len(line.strip()) > 5]
-        translation = ' '.join(filtered_lines)
-        
-        # Remove extra spaces
-        translation = re.sub(r'\s+', ' ', translation).strip()
-        
-        return translation
+        return clean_translation(translation, target_language)
 
     def check_multiline_and_german(self, output_translation):
         """
         Checks english content at line level
         """
-        output_multiline_length = len(output_translation.split('\n'))
-        if output_multiline_length > 1:
-            multiline_split = output_translation.split('\n')
-            for line in multiline_split:
-                language, _ = langid.classify(line)
+        multiline_split = output_translation.split('\n')
+        if len(multiline_split) > 1:
+            # All lines in one call; lines seen before come from the cache
+            languages = language_id.classify_lines(multiline_split)
+            for line, (language, _) in zip(multiline_split, languages):
                 if language == 'de':
                     cleaned_line = self.remove_extra(line)
                     return cleaned_line
@@ -105,11 +81,11 @@ class TranslationController:
         language_config = self.supported_languages[target_language.lower()]
         prompt = f"{language_config['prompt']}{sentence}"
         
-        llm = Ollama(model=self.model, temperature=0)
-        translation = llm.invoke(prompt)
+        translation = hedged_invoke("TranslationController", self.model, prompt, lambda output: output.strip() or None)
         
         # Clean the translation output
-        translation = self.clean_translation_output(translation, target_language)
+        with span("translation.clean"):
+            translation = self.clean_translation_output(translation, target_language)
         
         self.total_output_list.append(translation)
         return translation
@@ -129,26 +105,39 @@ class TranslationController:
             if target_language not in self.supported_languages:
                 raise ValueError(f"Unsupported language: {target_language}. Supported languages: {list(self.supported_languages.keys())}")
 
-            sentence_list = self.input_preprocess(input_text)
+            with span("translation.split") as split_span:
+                sentence_list = self.input_preprocess(input_text)
+                if split_span is not None:
+                    split_span.set(sentences=len(sentence_list))
             print(f"Translating to {target_language}...")
             print(sentence_list)
 
             translation_list = []
             for index in range(len(sentence_list)):
                 print("-----------")
-                translation = self.get_translation_from_LLM(sentence_list[index], target_language)
+                try:
+                    with span("translation.sentence", index=index):
+                        translation = self.get_translation_from_LLM(sentence_list[index], target_language)
+                except DeadlineExceeded:
+                    # Out of time: return the sentences translated so far, if there are any
+                    if not translation_list:
+                        raise
+                    break
                 print(translation)
                 translation_list.append(translation)
                 if not translation.endswith(('.', '!', '?', '...', '"', "'", ')', ';', ':')):
                     translation_list.append('.')
             
-            encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-            query_token = len(encoding.encode(''.join(sentence_list)))
-            response_token = len(encoding.encode(''.join(translation_list)))
-            total_token = query_token + response_token
+            with span("tokens.count"):
+                encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+                query_token = len(encoding.encode(''.join(sentence_list)))
+                response_token = len(encoding.encode(''.join(translation_list)))
+                total_token = query_token + response_token
 
             return ''.join(translation_list), total_token
 
+        except (OverloadedError, DeadlineExceeded):
+            raise
         except Exception as e:
             print(f"\033[91mTranslation error: {str(e)}\033[0m")
             return str(e), 0
@@ -1,21 +1,99 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import json
 import threading
-from controllers.sentiment_controller import SentimentController
+import time
+from controllers.sentiment_controller import SentimentController, SENTIMENT_OPTIONS, configure_sentiment, load_lexicon
 from controllers.translation_controller import TranslationController
 from controllers.poem_controller import PoemController
-from controllers.json_controller import JSONController
+from controllers.json_controller import JSONController, read_text_chunks, split_text
 from controllers.sql_controller import SQLController
-from utils import load_config, class_factory
+from utils import load_config, load_settings, class_factory
 from controllers.benchmark_controller import BenchmarkController
 from controllers.SQL_benchmark_controller import SQLBenchmarkController
+from controllers.benchmark_store import load_runs, summarize
+from controllers.llm_gateway import (
+    gateway, llm_priority, current_deadline, Deadline, deadline_exceeded, OverloadedError, DeadlineExceeded
+)
+from controllers.tracing import tracer, span
+from controllers.profiling import profiler
+from controllers.retry_policy import retry_policies
+from controllers.hedging import hedger
+from controllers.model_warmup import warmup
+from controllers.language_id import language_id
+from controllers.metrics import (
+    REGISTRY, HTTP_REQUESTS, HTTP_LATENCY, CONTROLLER_CALLS, CONTROLLER_LATENCY, LOG_WRITES_PENDING,
+    BENCHMARKS_ACTIVE
+)
 import os
+import uuid
 
 app = Flask(__name__)
 
 # Load configuration
 CONFIG = load_config()
+SETTINGS = load_settings()
+
+# Admission limits per model and model-affinity batching; settings.json may use config keys or Ollama model names
+gateway_settings = SETTINGS.get('gateway', {})
+gateway.configure(
+    gateway_settings.get('default'),
+    {CONFIG.get(model, model): limits for model, limits in gateway_settings.get('models', {}).items()},
+    gateway_settings.get('affinity')
+)
+tracer.configure(SETTINGS.get('tracing'))
+profiler.configure(SETTINGS.get('profiling'))
+configure_sentiment(SETTINGS.get('sentiment'))
+# The VADER lexicon is loaded (and downloaded if missing) now rather than by the first request;
+# without it every sentence goes to the LLM
+if SENTIMENT_OPTIONS['lexicon']:
+    load_lexicon()
+
+# Retry policies per controller; fallback models may also be given as config keys
+def _resolve_fallback(policy):
+    if policy.get('fallback_model'):
+        return {**policy, 'fallback_model': CONFIG.get(policy['fallback_model'], policy['fallback_model'])}
+    return policy
+
+retry_settings = SETTINGS.get('retry', {})
+retry_policies.configure(
+    _resolve_fallback(retry_settings.get('default', {})),
+    {name: _resolve_fallback(policy) for name, policy in retry_settings.get('controllers', {}).items()}
+)
+
+# Hedged calls; primary and backup models may be given as config keys
+hedging_settings = SETTINGS.get('hedging', {})
+hedger.configure({
+    **hedging_settings,
+    'backup_models': {
+        CONFIG.get(primary, primary): CONFIG.get(backup, backup)
+        for primary, backup in hedging_settings.get('backup_models', {}).items()
+    }
+})
+
+# Models preloaded and kept resident from a background thread; /ready waits for the primary ones
+warmup_settings = SETTINGS.get('warmup', {})
+warmup.configure({
+    **warmup_settings,
+    'models': [CONFIG.get(model, model) for model in warmup_settings.get('models', [])],
+    'primary_models': [CONFIG.get(model, model) for model in warmup_settings.get('primary_models', [])]
+})
+warmup.start()
+
+# Language identification for translation output checks; with "preload" set, the model (about 2 s to load) is loaded now
+language_id.configure(SETTINGS.get('language_id'))
+if language_id.preload:
+    language_id.load()
+
+# Worker pool shared by the batch endpoints; each item is one task, so concurrent batches interleave
+batch_settings = {'max_items': 1000, 'workers': 8, **SETTINGS.get('batch', {})}
+batch_pool = ThreadPoolExecutor(max_workers=batch_settings['workers'], thread_name_prefix='batch')
+
+# Endpoints that profile their background job rather than the request that starts it
+JOB_PROFILED_ENDPOINTS = {'sql_benchmark'}
 
 logs_csv = pd.read_csv('logs/input_output.csv', index_col=0)
 lock = threading.Lock()
@@ -23,6 +101,82 @@ lock = threading.Lock()
 # Create a global dictionary to store benchmark jobs
 benchmark_jobs = {}
 
+def new_job_id():
+    """Timestamped job id; the random suffix keeps runs started in the same second apart"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Optional client deadline: "timeout_ms" in any JSON body bounds the LLM work done for it
+    body = request.get_json(silent=True) if request.is_json else None
+    timeout_ms = body.get('timeout_ms') if isinstance(body, dict) else None
+    if timeout_ms is not None:
+        if isinstance(timeout_ms, bool) or not isinstance(timeout_ms, (int, float)) or timeout_ms <= 0:
+            return jsonify({
+                'error': 'timeout_ms must be a positive number of milliseconds',
+                'status': 'error',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        g.deadline_token = current_deadline.set(Deadline(timeout_ms / 1000))
+    # Trace when the client sends "X-Trace: 1", or when the request is sampled
+    requested = request.headers.get('X-Trace', '').lower() in ('1', 'true', 'yes')
+    if tracer.should_trace(requested):
+        g.trace, g.trace_token = tracer.start(request.path, method=request.method)
+    # Admin-only profiling: "X-Profile: sample|cprofile" (or ?profile=) together with X-Admin-Token
+    g.profile_mode = profiler.requested_mode(
+        request.headers.get('X-Profile') or request.args.get('profile'),
+        request.headers.get('X-Admin-Token')
+    )
+    if g.profile_mode and request.endpoint not in JOB_PROFILED_ENDPOINTS:
+        g.profile = profiler.session(g.profile_mode, request.path)
+        g.profile.start()
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by route pattern rather than path, so the number of series stays bounded
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=str(response.status_code))
+    if 'request_started' in g:
+        HTTP_LATENCY.observe(time.perf_counter() - g.request_started, route=route)
+    if 'trace' in g:
+        g.trace.root.set(route=route, status=response.status_code)
+        response.headers['X-Trace-Id'] = g.trace.trace_id
+    if 'profile' in g:
+        response.headers['X-Profile-Id'] = g.profile.stop()['profile_id']
+    return response
+
+@app.teardown_request
+def finish_trace(error):
+    if 'deadline_token' in g:
+        current_deadline.reset(g.deadline_token)
+    if 'profile' in g:
+        # No-op unless the response never reached after_request
+        g.profile.stop()
+    if 'trace' in g:
+        tracer.finish(g.trace, g.trace_token, **({'error': repr(error)} if error else {}))
+
+def deadline_response(error):
+    """504 for a request whose deadline passed before any result was ready"""
+    return jsonify({
+        'error': str(error),
+        'partial': False,
+        'status': 'error',
+        'timestamp': datetime.now().isoformat()
+    }), 504
+
+def overloaded_response(error):
+    """Fast 429/503 for a request the LLM gateway could not admit"""
+    response = jsonify({
+        'error': str(error),
+        'model': error.model,
+        'retry_after': error.retry_after,
+        'status': 'error',
+        'timestamp': datetime.now().isoformat()
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status_code
+
 @app.route('/translate', methods=['POST'])
 def translate():
     try:
@@ -50,6 +204,8 @@ def translate():
                 'translation': translated_text,
                 'target_language': input_data['target_language'],
                 'tokens_used': total_token,
+                # True when the deadline cut the translation short
+                'partial': deadline_exceeded(),
                 'status': 'success',
                 'timestamp': datetime.now().isoformat()
             }), 200
@@ -60,6 +216,10 @@ def translate():
                 'timestamp': datetime.now().isoformat()
             }), 500
 
+    except OverloadedError as e:
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -76,7 +236,87 @@ def analyze_sentiment():
         model = data.get('model', 'phi3')  # Use a default model if not provided
         controller_name = 'SentimentController'
         sentiment_result, total_token = generate_response(text, model, controller_name)
-        return jsonify({'response': sentiment_result, "total_token" : total_token})
+        return jsonify({'response': sentiment_result, "total_token" : total_token, 'partial': deadline_exceeded()})
+    except OverloadedError as e:
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+def batch_items(data):
+    """The "items" list of a batch request, or an error message"""
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, 'items must be a non-empty list'
+    if len(items) > batch_settings['max_items']:
+        return None, f"At most {batch_settings['max_items']} items per batch"
+    return items, None
+
+def batch_response(results, total_token):
+    return jsonify({
+        'results': results,
+        'tokens_used': total_token,
+        'succeeded': sum(1 for item in results if item['status'] == 'success'),
+        'failed': sum(1 for item in results if item['status'] != 'success'),
+        # True when the deadline cut some items short
+        'partial': deadline_exceeded(),
+        'status': 'success',
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@app.route('/translate/batch', methods=['POST'])
+def translate_batch():
+    try:
+        data = request.get_json()
+        items, error = batch_items(data)
+        if error:
+            return jsonify({'error': error, 'status': 'error', 'timestamp': datetime.now().isoformat()}), 400
+
+        # Items are texts or {"text", "target_language"} objects; the batch's language is the default
+        default_language = data.get('target_language', 'german')
+        input_list = []
+        for item in items:
+            if isinstance(item, dict) and isinstance(item.get('text'), str):
+                input_list.append({'text': item['text'], 'target_language': item.get('target_language', default_language)})
+            elif isinstance(item, str):
+                input_list.append({'text': item, 'target_language': default_language})
+            else:
+                return jsonify({
+                    'error': 'Each item must be a text or an object with a text field',
+                    'status': 'error',
+                    'timestamp': datetime.now().isoformat()
+                }), 400
+
+        model = data.get('model', 'phi3')
+        if model not in CONFIG:
+            return jsonify({'error': f'Unknown model: {model}', 'status': 'error', 'timestamp': datetime.now().isoformat()}), 400
+        results, total_token = generate_batch_response(input_list, model, 'TranslationController')
+        return batch_response(results, total_token)
+
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/sentiment/batch', methods=['POST'])
+def analyze_sentiment_batch():
+    try:
+        data = request.get_json()
+        items, error = batch_items(data)
+        if error:
+            return jsonify({'error': error}), 400
+        if not all(isinstance(item, str) for item in items):
+            return jsonify({'error': 'Each item must be a text'}), 400
+
+        model = data.get('model', 'phi3')
+        if model not in CONFIG:
+            return jsonify({'error': f'Unknown model: {model}'}), 400
+        results, total_token = generate_batch_response(items, model, 'SentimentController')
+        return batch_response(results, total_token)
+
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -89,11 +329,17 @@ def generate_poem():
         controller_name = 'PoemController'
         poem_result, total_token = generate_response(text, model, controller_name)
         return jsonify({'response': poem_result, "total_token" : total_token})
+    except OverloadedError as e:
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @app.route('/process-json', methods=['POST'])
 def process_json():
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return process_json_stream()
     try:
         data = request.get_json()
         
@@ -134,6 +380,10 @@ def process_json():
                 'timestamp': datetime.now().isoformat()
             }), 500
 
+    except OverloadedError as e:
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -141,6 +391,75 @@ def process_json():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def process_json_stream():
+    """
+    NDJSON variant of /process-json: each user record is sent as soon as it is extracted
+
+    The body is either the usual JSON object, or (for large statements) a first
+    line holding a JSON object with "date" and "schema" followed by the raw text,
+    which is then read in chunks and never held in memory as a whole.
+    """
+    try:
+        if request.is_json:
+            data = request.get_json()
+            missing_fields = [field for field in ['text', 'date', 'schema'] if field not in data]
+            chunks = split_text(data.get('text', ''))
+        else:
+            data = json.loads(request.stream.readline() or b'{}')
+            missing_fields = [field for field in ['date', 'schema'] if field not in data]
+            chunks = read_text_chunks(request.stream)
+    except ValueError:
+        missing_fields = None
+    if missing_fields is None or not isinstance(data, dict):
+        return jsonify({
+            'error': 'The first line must be a JSON object with date and schema',
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    if missing_fields:
+        return jsonify({
+            'error': f'Missing required fields: {", ".join(missing_fields)}',
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }), 400
+
+    model_name = data.get('model', 'phi3')
+    if model_name not in CONFIG:
+        return jsonify({
+            'error': f'Unknown model: {model_name}',
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    controller = class_factory('JSONController', CONFIG[model_name])
+
+    def generate():
+        started = time.perf_counter()
+        outcome = 'error'
+        summary = None
+        try:
+            with span("controller.run", controller='JSONController', stream=True):
+                for message in controller.stream_financial_data(data['date'], data['schema'], chunks):
+                    if message.get('done'):
+                        summary = message
+                    yield json.dumps(message, ensure_ascii=False) + '\n'
+            outcome = 'ok' if summary else 'error'
+        except Exception as e:
+            print(f"\033[91mAn error occurred: {e}\033[0m")
+            yield json.dumps({'error': str(e), 'status': 'error', 'code': 500}) + '\n'
+        finally:
+            CONTROLLER_CALLS.inc(controller='JSONController', outcome=outcome)
+            CONTROLLER_LATENCY.observe(time.perf_counter() - started, controller='JSONController')
+            # The statement itself is not kept, so only a summary is logged
+            new_row = [datetime.now(), f"stream: date {data['date']}", str(summary)]
+            with span("log.write"), LOG_WRITES_PENDING.in_progress(), lock:
+                try:
+                    logs_csv.loc[len(logs_csv)] = new_row
+                    logs_csv.to_csv('logs/input_output.csv')
+                except Exception as save_error:
+                    print(f"\033[91mFailed to save log: {save_error}\033[0m")
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/generate-sql', methods=['POST'])
 def generate_sql():
     try:
@@ -167,6 +486,10 @@ def generate_sql():
         else:
             return jsonify(sql_output), sql_output.get('code', 500)
 
+    except OverloadedError as e:
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -200,11 +523,25 @@ def benchmark():
     
     benchmark_controller = BenchmarkController()
     
-    results = benchmark_controller.run_comprehensive_benchmark(
-        test_cases=test_cases,
-        models=data.get('models', ['phi3']),
-        target_language=data.get('target_language', 'german')
-    )
+    # Benchmark generations yield to interactive requests at the gateway
+    with llm_priority("batch"), BENCHMARKS_ACTIVE.in_progress(benchmark="tasks"):
+        results = benchmark_controller.run_comprehensive_benchmark(
+            test_cases=test_cases,
+            models=data.get('models', ['phi3']),
+            target_language=data.get('target_language', 'german'),
+            render_charts=data.get('render_charts', True)
+        )
+    
+    # Keep the run as a completed job so its chart data can be fetched later
+    job_id = new_job_id()
+    benchmark_jobs[job_id] = {
+        'status': 'completed',
+        'models': data.get('models', ['phi3']),
+        'results': results,
+        'charts': benchmark_controller.chart_data,
+        'timestamp': datetime.now().isoformat()
+    }
+    results['job_id'] = job_id
     
     return jsonify(results)
 
@@ -217,17 +554,25 @@ def sql_benchmark():
         # Extract parameters with defaults
         models = data.get('models', ['phi3'])
         num_samples = data.get('num_samples', 20)
-        job_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        job_id = new_job_id()
         
         # Initialize the SQL benchmark controller
         controller = SQLBenchmarkController()
+        controller.render_charts = data.get('render_charts', True)
+        
+        # An admin-profiled request profiles the whole job, in the benchmark thread
+        job_profile = profiler.session(g.profile_mode, f"sql-benchmark-{job_id}") if g.profile_mode else None
         
         # Start benchmark in a background thread to avoid blocking
         def run_benchmark():
             try:
-                results = controller.run_sql_benchmark(models=models, num_samples=num_samples)
+                # Context variables don't carry into threads, so set the priority here
+                with llm_priority("batch"), BENCHMARKS_ACTIVE.in_progress(benchmark="sql"), profiler.profile(job_profile):
+                    results = controller.run_sql_benchmark(models=models, num_samples=num_samples)
                 benchmark_jobs[job_id]['status'] = 'completed'
                 benchmark_jobs[job_id]['results'] = results
+                benchmark_jobs[job_id]['charts'] = controller.chart_data
+                benchmark_jobs[job_id]['store'] = controller.store
                 benchmark_jobs[job_id]['timestamp'] = datetime.now().isoformat()
             except Exception as e:
                 benchmark_jobs[job_id]['status'] = 'failed'
@@ -241,18 +586,23 @@ def sql_benchmark():
             'num_samples': num_samples,
             'start_time': datetime.now().isoformat()
         }
+        if job_profile:
+            benchmark_jobs[job_id]['profile_id'] = job_profile.profile_id
         
         # Start the benchmark thread
         thread = threading.Thread(target=run_benchmark)
         thread.daemon = True
         thread.start()
         
-        return jsonify({
+        response = jsonify({
             'job_id': job_id,
             'status': 'running',
             'message': f'Benchmark started for models: {models}',
             'timestamp': datetime.now().isoformat()
-        }), 202
+        })
+        if job_profile:
+            response.headers['X-Profile-Id'] = job_profile.profile_id
+        return response, 202
         
     except Exception as e:
         return jsonify({
@@ -271,7 +621,8 @@ def sql_benchmark_status(job_id):
             'timestamp': datetime.now().isoformat()
         }), 404
     
-    job = benchmark_jobs[job_id]
+    # Chart data and per-sample rows are served by /charts/<job_id> and the analysis reports
+    job = {key: value for key, value in benchmark_jobs[job_id].items() if key not in ('charts', 'store')}
     return jsonify(job), 200
 
 @app.route('/sql-benchmark/results/<job_id>', methods=['GET'])
@@ -384,6 +735,39 @@ def sql_benchmark_visualizations(job_id, viz_type, model):
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/charts/<job_id>', methods=['GET'])
+@app.route('/charts/<job_id>/<chart_id>', methods=['GET'])
+def benchmark_charts(job_id, chart_id=None):
+    """Get the data series behind a completed benchmark job's charts"""
+    if job_id not in benchmark_jobs:
+        return jsonify({
+            'error': 'Job not found',
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    
+    job = benchmark_jobs[job_id]
+    if job['status'] != 'completed':
+        return jsonify({
+            'error': 'Benchmark not yet completed',
+            'status': job['status'],
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    
+    charts = job.get('charts', {})
+    if chart_id is None:
+        return jsonify({'job_id': job_id, 'charts': charts, 'status': 'success'}), 200
+    
+    if chart_id not in charts:
+        return jsonify({
+            'error': f'No chart {chart_id} for job {job_id}',
+            'available': sorted(charts),
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    
+    return jsonify({'job_id': job_id, 'chart_id': chart_id, 'chart': charts[chart_id], 'status': 'success'}), 200
+
 @app.route('/sql-benchmark/quick-run', methods=['POST'])
 def sql_benchmark_quick_run():
     """Run a limited SQL benchmark for quick results"""
@@ -400,9 +784,22 @@ def sql_benchmark_quick_run():
         
         # Modify the benchmark to run only on specified complexity
         controller.complexity_levels = [complexity]
+        controller.render_charts = data.get('render_charts', True)
         
         # Run benchmark directly (blocking call for quick results)
-        results = controller.run_sql_benchmark(models=models, num_samples=num_samples)
+        with llm_priority("batch"), BENCHMARKS_ACTIVE.in_progress(benchmark="sql"):
+            results = controller.run_sql_benchmark(models=models, num_samples=num_samples)
+        
+        job_id = new_job_id()
+        benchmark_jobs[job_id] = {
+            'status': 'completed',
+            'models': models,
+            'num_samples': num_samples,
+            'results': results,
+            'charts': controller.chart_data,
+            'store': controller.store,
+            'timestamp': datetime.now().isoformat()
+        }
         
         # Find the latest comparison table CSV file
         log_dir = os.path.join('logs', 'sql_benchmark')
@@ -414,6 +811,7 @@ def sql_benchmark_quick_run():
         table_df = pd.read_csv(table_path)
         
         return jsonify({
+            'job_id': job_id,
             'table': table_df.to_dict(orient='records'),
             'message': 'Quick benchmark completed',
             'status': 'success',
@@ -443,12 +841,21 @@ def get_benchmark_analysis(job_id, analysis_type):
             'status': job['status']
         }), 400
     
+    # Only SQL benchmark jobs keep per-generation rows; other jobs (e.g. /benchmark runs) have nothing to analyze
+    if job.get('store') is None:
+        return jsonify({
+            'error': f'Job {job_id} has no SQL benchmark samples to analyze',
+            'status': 'error'
+        }), 404
+    
     try:
-        # Initialize the controller
+        # The dataset is only loaded on demand, so this controller just
+        # aggregates the per-generation rows stored with the job
         controller = SQLBenchmarkController()
         
         # Set results from the job
         controller.results = job['results']
+        controller.store = job['store']
         
         # Generate the requested analysis
         if analysis_type == 'task_type':
@@ -475,47 +882,129 @@ def get_benchmark_analysis(job_id, analysis_type):
             'status': 'error'
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request, controller and LLM metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 503 until the primary models are loaded in Ollama"""
+    is_ready = warmup.ready()
+    return jsonify({
+        'ready': is_ready,
+        'warmup': warmup.stats(),
+        'status': 'success' if is_ready else 'warming',
+        'timestamp': datetime.now().isoformat()
+    }), 200 if is_ready else 503
+
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    """Per-model limits, queue depth, in-flight count, shed requests, wait and load times, hedging"""
+    return jsonify({
+        'models': gateway.stats(),
+        'affinity': gateway.affinity_stats(),
+        'hedging': hedger.stats(),
+        'status': 'success',
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@app.route('/benchmark/runs/summary', methods=['GET'])
+def benchmark_runs_summary():
+    """Aggregate the per-generation rows of all saved benchmark runs"""
+    try:
+        benchmark = request.args.get('benchmark')
+        by = request.args.get('by', 'model,approach').split(',')
+        
+        frame = load_runs(benchmark=benchmark)
+        unknown = [column for column in by if column not in frame.columns]
+        if unknown:
+            return jsonify({
+                'error': f'Unknown columns: {", ".join(unknown)}',
+                'status': 'error'
+            }), 400
+        
+        summary = summarize(frame, by).reset_index()
+        # NaN (metrics a benchmark doesn't measure) isn't valid JSON
+        summary = summary.astype(object).where(summary.notna(), None)
+        
+        return jsonify({
+            'runs': int(frame['run_id'].nunique()),
+            'summary': summary.to_dict(orient='records'),
+            'status': 'success'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
 def generate_response(text, model, controller_name):
+    started = time.perf_counter()
+    outcome = 'error'
     try:
         model = CONFIG[model]
-        controller = class_factory(controller_name, model)
+        with span("controller.init", controller=controller_name, model=model):
+            controller = class_factory(controller_name, model)
         current_time = datetime.now()
 
         if isinstance(controller, TranslationController):
-            translated_text, total_token = controller.generate_translation(text)
+            with span("controller.run", controller=controller_name):
+                translated_text, total_token = controller.generate_translation(text)
             new_row = [current_time, text, translated_text]
+            outcome = 'ok'
             return translated_text, total_token
         
         elif isinstance(controller, SentimentController):
-            sentiment_result, total_token = controller.generate_sentiment(text)
+            with span("controller.run", controller=controller_name):
+                sentiment_result, total_token = controller.generate_sentiment(text)
             new_row = [current_time, text, sentiment_result]
+            outcome = 'ok'
             return sentiment_result, total_token
         
         elif isinstance(controller, PoemController):
-            poem_result, total_token = controller.generate_poem(text)
+            with span("controller.run", controller=controller_name):
+                poem_result, total_token = controller.generate_poem(text)
             new_row = [current_time, text, poem_result]
+            outcome = 'ok'
             return poem_result, total_token
             
         elif isinstance(controller, JSONController):
-            json_output, total_token = controller.process_financial_data(text)
+            with span("controller.run", controller=controller_name):
+                json_output, total_token = controller.process_financial_data(text)
             new_row = [current_time, str(text), str(json_output)]
+            outcome = 'ok'
             return json_output, total_token
 
         elif isinstance(controller, SQLController):
-            sql_output, total_token = controller.generate_sql_query(text)
+            with span("controller.run", controller=controller_name):
+                sql_output, total_token = controller.generate_sql_query(text)
             new_row = [current_time, str(text), str(sql_output)]
+            outcome = 'ok'
             return sql_output, total_token
 
         else:
             raise ValueError(f"Unsupported controller type: {controller_name}")
 
+    except OverloadedError:
+        # Let the route answer with 429/503 and Retry-After
+        outcome = 'overloaded'
+        raise
+    except DeadlineExceeded:
+        # Let the route answer with 504
+        outcome = 'deadline'
+        raise
     except Exception as e:
         print(f"\033[91mAn error occurred: {e}\033[0m")  # Print in red
         return None, 0  # Return tuple with None and 0 tokens
     
     finally:
+        CONTROLLER_CALLS.inc(controller=controller_name, outcome=outcome)
+        CONTROLLER_LATENCY.observe(time.perf_counter() - started, controller=controller_name)
+
         # Use a lock to ensure thread safety
-        with lock:
+        with span("log.write"), LOG_WRITES_PENDING.in_progress(), lock:
             try:
                 logs_csv.loc[len(logs_csv)] = new_row
                 logs_csv.to_csv('logs/input_output.csv')
@@ -525,6 +1014,73 @@ def generate_response(text, model, controller_name):
                 print(f"\033[91mFailed to save log: {save_error}\033[0m")
 
 
+def generate_batch_response(items, model, controller_name):
+    """
+    Run many inputs through one controller instance on the shared batch pool
+
+    The controller is built and the request log written once per batch. Returns
+    one result per item, in input order, and the total tokens used. A failed
+    item does not fail the batch; its status says what went wrong.
+    """
+    model = CONFIG[model]
+    with span("controller.init", controller=controller_name, model=model):
+        controller = class_factory(controller_name, model)
+    if isinstance(controller, TranslationController):
+        run = controller.generate_translation
+    elif isinstance(controller, SentimentController):
+        run = controller.generate_sentiment
+    else:
+        raise ValueError(f"Unsupported controller type for batches: {controller_name}")
+
+    def process(index, item):
+        started = time.perf_counter()
+        outcome = 'error'
+        entry = {'index': index}
+        try:
+            with span("batch.item", controller=controller_name, index=index):
+                result, total_token = run(item)
+            if isinstance(controller, TranslationController) and (not isinstance(result, str) or result.startswith('Error')):
+                entry.update(status='error', error=result, tokens_used=0)
+            else:
+                outcome = 'ok'
+                entry.update(status='success', result=result, tokens_used=total_token)
+        except OverloadedError as e:
+            outcome = 'overloaded'
+            entry.update(status='overloaded', error=str(e), retry_after=e.retry_after, tokens_used=0)
+        except DeadlineExceeded as e:
+            outcome = 'deadline'
+            entry.update(status='deadline', error=str(e), tokens_used=0)
+        except Exception as e:
+            entry.update(status='error', error=str(e), tokens_used=0)
+        finally:
+            CONTROLLER_CALLS.inc(controller=controller_name, outcome=outcome)
+            CONTROLLER_LATENCY.observe(time.perf_counter() - started, controller=controller_name)
+        return entry
+
+    # Each task runs in a copy of this request's context, so it keeps the deadline, priority and trace
+    with span("controller.run", controller=controller_name, items=len(items)):
+        futures = [
+            batch_pool.submit(contextvars.copy_context().run, process, index, item)
+            for index, item in enumerate(items)
+        ]
+        results = [future.result() for future in futures]
+
+    current_time = datetime.now()
+    new_rows = [
+        [current_time, item, entry.get('result')]
+        for item, entry in zip(items, results) if entry['status'] == 'success'
+    ]
+    with span("log.write"), LOG_WRITES_PENDING.in_progress(), lock:
+        try:
+            for new_row in new_rows:
+                logs_csv.loc[len(logs_csv)] = new_row
+            logs_csv.to_csv('logs/input_output.csv')
+            print(f"\033[92mLog saved successfully ({len(new_rows)} rows).\033[0m")
+        except Exception as save_error:
+            print(f"\033[91mFailed to save log: {save_error}\033[0m")
+
+    return results, sum(entry['tokens_used'] for entry in results)
+
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=50000)
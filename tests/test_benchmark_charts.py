@@ -0,0 +1,14 @@
+import json
+
+import numpy as np
+
+from controllers.benchmark_charts import chart_payload
+
+
+def test_payload_maps_non_finite_values_to_none():
+    spec = {"kind": "grouped_bar", "data": {
+        "series": {"phi3": [1.23456, float("nan"), np.float64("inf")], "mistral": [np.float32(-np.inf), np.int64(2)]},
+    }}
+    payload = chart_payload(spec)
+    assert payload["series"] == {"phi3": [1.2346, None, None], "mistral": [None, 2]}
+    json.dumps(payload, allow_nan=False)
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+
+from controllers import sentiment_controller, translation_controller
+from controllers.llm_gateway import DeadlineExceeded
+from controllers.sentiment_controller import SentimentController
+from controllers.translation_controller import TranslationController
+
+
+@pytest.fixture
+def translator(monkeypatch):
+    monkeypatch.setattr("nltk.download", lambda *args, **kwargs: True)
+    monkeypatch.setattr(translation_controller, "words", SimpleNamespace(words=lambda: ["the"]))
+    return TranslationController("test")
+
+
+def test_translation_deadline_before_first_sentence_raises(translator, monkeypatch):
+    def out_of_time(sentence, target_language="german"):
+        raise DeadlineExceeded("Deadline of 10 ms exceeded")
+
+    monkeypatch.setattr(translator, "get_translation_from_LLM", out_of_time)
+    with pytest.raises(DeadlineExceeded):
+        translator.generate_translation({"text": "Hello there. How are you?"})
+
+
+def test_translation_deadline_after_a_sentence_returns_it(translator, monkeypatch):
+    calls = []
+
+    def first_only(sentence, target_language="german"):
+        calls.append(sentence)
+        if len(calls) > 1:
+            raise DeadlineExceeded("Deadline of 10 ms exceeded")
+        return "Hallo."
+
+    monkeypatch.setattr(translator, "get_translation_from_LLM", first_only)
+    # The tokenizer's vocabulary is downloaded on first use
+    monkeypatch.setattr("tiktoken.encoding_for_model", lambda model: SimpleNamespace(encode=str.split))
+    translated, _ = translator.generate_translation({"text": "Hello there. How are you?"})
+    assert translated == "Hallo."
+
+
+def test_sentiment_deadline_with_nothing_labelled_raises(monkeypatch):
+    monkeypatch.setitem(sentiment_controller.SENTIMENT_OPTIONS, "lexicon", False)
+    monkeypatch.setitem(sentiment_controller.SENTIMENT_OPTIONS, "structured", False)
+    controller = SentimentController("test")
+
+    def out_of_time(sentence, use_lexicon=True):
+        raise DeadlineExceeded("Deadline of 10 ms exceeded")
+
+    monkeypatch.setattr(controller, "get_sentiment", out_of_time)
+    with pytest.raises(DeadlineExceeded):
+        controller.generate_sentiment("Great day. Awful night.")
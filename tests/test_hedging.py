@@ -0,0 +1,61 @@
+import time
+
+from controllers import hedging
+from controllers.hedging import Hedger
+from controllers.llm_gateway import CallCancelled, LLMGateway
+
+
+def test_accept_runs_once_per_output_and_delay_is_per_controller(monkeypatch):
+    def fake_invoke(model, prompt, stop=None, **kwargs):
+        time.sleep(0.3 if model == "slow" else 0.01)
+        return f"{model}:{prompt}"
+
+    monkeypatch.setattr(hedging, "invoke_llm", fake_invoke)
+    hedger = Hedger(enabled=True, controllers=["A", "B"], backup_models={"slow": "fast"},
+                    default_delay_ms=50, min_samples=1, burst=5)
+    accepted = []
+
+    def accept(output):
+        accepted.append(output)
+        return output.upper()
+
+    output, value = hedger.invoke("A", "slow", "hi", accept)
+    # The backup wins the race; its value is returned and nothing is validated twice
+    assert (output, value) == ("fast:hi", "FAST:HI")
+    assert accepted == ["fast:hi"]
+
+    # Controller A's window holds the slow primary; B has no samples of its own yet
+    assert hedger.delay_for("A", "slow") >= 0.05
+    assert hedger.delay_for("B", "slow") == hedger.default_delay
+
+
+def test_backup_cancelled_while_queued_leaves_the_queue(monkeypatch):
+    gateway = LLMGateway({"adaptive": False, "max_concurrency": 1, "max_queue": 4, "queue_timeout": 30})
+    occupied = gateway.acquire("fast")  # The backup model's only slot is taken
+    outcomes = []
+
+    def fake_invoke(model, prompt, stop=None, **kwargs):
+        if model == "slow":
+            time.sleep(0.2)
+            return "primary"
+        try:
+            gateway.acquire(model)
+        except CallCancelled:
+            outcomes.append("cancelled")
+            raise
+        outcomes.append("admitted")
+        return "backup"
+
+    monkeypatch.setattr(hedging, "invoke_llm", fake_invoke)
+    monkeypatch.setattr(hedging, "cancel_calls", gateway.cancel)
+    hedger = Hedger(enabled=True, controllers=["A"], backup_models={"slow": "fast"},
+                    default_delay_ms=50, min_samples=1, burst=5)
+
+    assert hedger.invoke("A", "slow", "hi") == ("primary", "primary")
+    started = time.perf_counter()
+    while not outcomes and time.perf_counter() - started < 2:
+        time.sleep(0.01)
+    # The losing backup gave up its queue position long before queue_timeout
+    assert outcomes == ["cancelled"]
+    assert gateway.lane_values(lambda lane: len(lane.waiters)) == {"fast": 0}
+    assert occupied.in_flight == 1
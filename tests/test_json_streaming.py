@@ -0,0 +1,63 @@
+import time
+
+from controllers.json_controller import JSONController, MAX_SEGMENT_CHARS
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "date": {"type": "string"},
+        "users": {"type": "array", "items": {"type": "object", "required": ["name", "salary"]}},
+    },
+}
+
+
+def test_segments_are_cut_at_boundaries_across_chunks():
+    controller = JSONController("test")
+    text = "Asha Rao earns ₹1,000 and spends ₹500. Ravi Kumar earns ₹2,000 and spends ₹900."
+    for size in (1, 2, 3, 7, len(text)):
+        chunks = [text[start:start + size] for start in range(0, len(text), size)]
+        segments = list(controller.iter_segments(chunks))
+        assert "".join(segments) == text
+        assert segments[-1].startswith(". Ravi")
+        assert [user["name"] for user in controller.iter_user_data(chunks)] == ["Asha Rao", "Ravi Kumar"]
+
+
+def test_boundary_right_after_the_salary_stays_inside_the_block():
+    controller = JSONController("test")
+    text = ("Asha Rao earns ₹1,000 . She spends ₹500 and has invested ₹200 in gold. "
+            "Ravi earns ₹2,000 and spends ₹900.")
+    expected = controller._extract_user_data(text)
+    assert [user["name"] for user in expected] == ["Asha Rao", "Ravi"]
+    for size in (1, 5, 20, 25, 64, len(text)):
+        chunks = [text[start:start + size] for start in range(0, len(text), size)]
+        assert list(controller.iter_user_data(chunks)) == expected, size
+
+
+def test_many_megabytes_without_a_boundary_end_the_stream():
+    controller = JSONController("test")
+    chunk = "word " * 13000
+    chunks_read = 0
+
+    def chunks():
+        nonlocal chunks_read
+        for _ in range(200):  # About 13 MB, all one sentence
+            chunks_read += 1
+            yield chunk
+
+    started = time.perf_counter()
+    messages = list(controller.stream_financial_data("2025-02-22", SCHEMA, chunks()))
+    assert time.perf_counter() - started < 2
+    assert messages[0] == {"date": "2025-02-22"}
+    assert messages[-1]["code"] == 413
+    assert not any(message.get("done") for message in messages)
+    # The input is not read past the cap
+    assert chunks_read * len(chunk) <= MAX_SEGMENT_CHARS + len(chunk)
+
+
+def test_long_input_with_boundaries_streams_every_record():
+    controller = JSONController("test")
+    statement = "Asha Rao earns ₹1,000 and spends ₹500 with " + "padding " * 40 + "words. "
+    chunks = [statement] * 20000  # About 7 MB
+    messages = list(controller.stream_financial_data("2025-02-22", SCHEMA, chunks))
+    assert messages[-1]["done"] is True
+    assert messages[-1]["users"] == 20000
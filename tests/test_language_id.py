@@ -0,0 +1,38 @@
+import pytest
+
+from controllers.language_id import LanguageDetector
+
+langid = pytest.importorskip("langid")
+from langid.langid import LanguageIdentifier, model  # noqa: E402
+
+CORPUS = [
+    "Das Wetter ist heute sehr schön und wir gehen in den Park.",
+    "El clima es muy agradable hoy.",
+    "The weather is nice today.",
+    "Übersetzung:",
+    "Traducción: El clima es muy agradable hoy.",
+    "Bonjour tout le monde",
+    "Hallo\nWelt",
+    "日本語のテキスト",
+    "42",
+    "",
+    "Das ist gut. The response should only contain the translation.",
+]
+
+
+def test_labels_and_scores_match_langid():
+    detector = LanguageDetector(preload=False)
+    for line, (language, score) in zip(CORPUS, detector.classify_lines(CORPUS)):
+        expected_language, expected_score = langid.classify(line)
+        assert language == expected_language, line
+        assert score == pytest.approx(expected_score, rel=1e-9, abs=1e-6), line
+
+
+def test_restricted_languages_match_langid():
+    detector = LanguageDetector(languages=["de", "es", "en"])
+    identifier = LanguageIdentifier.from_modelstring(model)
+    identifier.set_languages(["de", "es", "en"])
+    for line, (language, score) in zip(CORPUS, detector.classify_lines(CORPUS)):
+        expected_language, expected_score = identifier.classify(line)
+        assert language == expected_language, line
+        assert score == pytest.approx(expected_score, rel=1e-9, abs=1e-6), line
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from controllers.llm_gateway import AIMDLimit, DEFAULT_LIMITS, LLMGateway, ModelLane, OverloadedError, Ticket, llm_priority
+
+
+def test_limit_ignores_answer_length_and_backs_off_on_slower_tokens():
+    limiter = AIMDLimit(initial=2, minimum=1, maximum=8, latency_tolerance=1.5, backoff=0.75)
+    # Short and long answers at the same 20 ms per token: whole-call time varies 50x
+    for service_time, tokens in [(0.2, 10), (10.0, 500)] * 10:
+        limiter.on_sample(service_time, service_time / tokens, failed=False, in_flight=int(limiter.limit))
+    assert limiter.decreases == 0
+    assert limiter.limit > 2
+
+    grown = limiter.limit
+    limiter._last_decrease = float("-inf")
+    for _ in range(10):
+        limiter.on_sample(1.0, 0.1, failed=False, in_flight=int(limiter.limit))
+    assert limiter.decreases >= 1
+    assert limiter.limit < grown
+
+
+def test_sample_without_token_time_does_not_move_latency():
+    limiter = AIMDLimit(initial=2, minimum=1, maximum=8, latency_tolerance=1.5, backoff=0.75)
+    limiter.on_sample(0.5, 0.02, failed=False, in_flight=0)
+    limiter.on_sample(30.0, None, failed=False, in_flight=0)
+    assert limiter.recent == 0.02
+    assert limiter.gradient == 1.0
+
+
+def test_limit_grows_only_while_it_is_used():
+    limiter = AIMDLimit(initial=2, minimum=1, maximum=8, latency_tolerance=1.5, backoff=0.75)
+    for _ in range(10):
+        limiter.on_sample(1.0, 0.02, failed=False, in_flight=0)
+    assert limiter.limit == 2
+    limiter.on_sample(1.0, None, failed=True, in_flight=2)
+    assert limiter.limit == 1.5
+
+
+def test_waiting_batch_ticket_is_promoted_past_interactive_ones():
+    lane = ModelLane("m", **{**DEFAULT_LIMITS, "priority_aging": 5.0})
+    batch = Ticket("batch", 0, arrived=0.0)
+    interactive = Ticket("interactive", 1, arrived=4.0)
+    lane.waiters = [batch, interactive]
+    assert lane.next_waiter(4.5) is interactive
+    # After priority_aging seconds the batch call counts as interactive and is older
+    assert lane.next_waiter(5.5) is batch
+
+
+def _gateway(**limits):
+    return LLMGateway({"adaptive": False, "max_concurrency": 1, **limits})
+
+
+def _queue_in_thread(gateway, model, priority_class, admitted):
+    def run():
+        with llm_priority(priority_class):
+            lane = gateway.acquire(model)
+        admitted.append(priority_class)
+        gateway.release(lane, 0.01)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_for_waiters(gateway, model, count):
+    started = time.perf_counter()
+    while gateway.lane_values(lambda lane: len(lane.waiters)).get(model) != count:
+        assert time.perf_counter() - started < 2
+        time.sleep(0.005)
+
+
+def test_aged_batch_call_is_admitted_before_a_newer_interactive_one():
+    gateway = _gateway(priority_aging=0.2, max_queue=4)
+    held = gateway.acquire("m")
+    admitted = []
+    threads = [_queue_in_thread(gateway, "m", "batch", admitted)]
+    _wait_for_waiters(gateway, "m", 1)
+    time.sleep(0.3)
+    threads.append(_queue_in_thread(gateway, "m", "interactive", admitted))
+    _wait_for_waiters(gateway, "m", 2)
+    gateway.release(held, 0.01)
+    for thread in threads:
+        thread.join(2)
+    assert admitted == ["batch", "interactive"]
+
+
+def test_full_queue_is_rejected_with_429_and_retry_after():
+    gateway = _gateway(max_queue=1)
+    held = gateway.acquire("m")
+    admitted = []
+    thread = _queue_in_thread(gateway, "m", "interactive", admitted)
+    _wait_for_waiters(gateway, "m", 1)
+    with pytest.raises(OverloadedError) as rejected:
+        gateway.acquire("m")
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+    gateway.release(held, 0.01)
+    thread.join(2)
+    assert admitted == ["interactive"]
+
+
+def test_queue_timeout_is_shed_with_503_and_retry_after():
+    gateway = _gateway(queue_timeout=0.05)
+    gateway.acquire("m")
+    with pytest.raises(OverloadedError) as shed:
+        gateway.acquire("m")
+    assert shed.value.status_code == 503
+    assert shed.value.retry_after >= 1
@@ -0,0 +1,26 @@
+from controllers import poem_controller
+from controllers.poem_controller import PoemController
+from controllers.retry_policy import RetryPolicy
+
+
+def test_last_attempt_completes_a_short_poem(monkeypatch):
+    def fake_hedged_accept(name, model, prompt, accept, stop=None, **kwargs):
+        # Every attempt answers with two of the five lines
+        output = "sun\nsea"
+        return output, accept(output)
+
+    monkeypatch.setattr("controllers.retry_policy.hedged_accept", fake_hedged_accept)
+    completions = []
+
+    def fake_invoke(model, prompt, stop=None, **kwargs):
+        completions.append(prompt)
+        return "line three\nline four\nline five"
+
+    monkeypatch.setattr(poem_controller, "invoke_llm", fake_invoke)
+    controller = PoemController("test")
+    controller.retry_policy = RetryPolicy("PoemController", max_attempts=3, budget_seconds=60)
+
+    poem = controller.get_poem("sun, sea", ["sun", " sea"])
+    # Only the last attempt asks for the missing lines
+    assert completions == ["generate me 3 line poem whose previous line is sea"]
+    assert poem.split("\n")[:2] == ["sun", "sea"]
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pandas as pd
+
+from tools.replay_load import load_requests
+
+
+def test_logged_rows_replay_to_their_endpoints(tmp_path):
+    """Rows shaped like the ones main.py appends to logs/input_output.csv come back as the original requests"""
+    now = datetime.now()
+    translation_input = {'text': 'The weather is nice today.', 'target_language': 'spanish'}
+    sql_input = {'text': 'All users older than 30', 'operation': 'select', 'model': 'phi3'}
+    json_input = {'text': 'Asha earns ₹1,000 per year.', 'date': '2025-02-22', 'schema': {'type': 'object'}}
+    rows = [
+        # generate_response and generate_batch_response
+        [now, translation_input, 'El clima es agradable hoy.'],
+        [now, 'I love this product', {'positive': 1, 'negative': 0, 'neutral': 0}],
+        [now, 'sea, waves', 'Waves roll in\nThe sea sings\nAnd so on'],
+        [now, str(json_input), str({'date': '2025-02-22', 'users': []})],
+        [now, str(sql_input), str({'query': 'SELECT * FROM users WHERE age > 30;', 'operation': 'select', 'status': 'success'})],
+        [now, str(sql_input), str({'error': 'boom', 'timestamp': now.isoformat(), 'status': 'error', 'code': 500})],
+        # process_json_stream: only a summary is logged
+        [now, 'stream: date 2025-02-22', str({'done': True, 'users': 3, 'invalid': 0, 'tokens_used': 120})],
+    ]
+    logs = pd.DataFrame(columns=['timestamp', 'input_text', 'response'])
+    for row in rows:
+        logs.loc[len(logs)] = row
+    path = tmp_path / 'input_output.csv'
+    logs.to_csv(path)
+
+    assert load_requests(str(path)) == [
+        ('/translate', translation_input),
+        ('/sentiment', {'text': 'I love this product'}),
+        ('/poem', {'text': 'sea, waves'}),
+        ('/process-json', json_input),
+        ('/generate-sql', sql_input),
+        ('/generate-sql', sql_input),
+    ]
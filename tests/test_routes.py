@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/translate/batch", "/sentiment/batch"])
+def test_batch_with_unknown_model_is_rejected(client, path):
+    response = client.post(path, json={"items": ["Hello there."], "model": "no-such-model"})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Unknown model: no-such-model"
+
+
+def test_analysis_of_a_job_without_samples_is_not_found(client, monkeypatch):
+    import main
+    monkeypatch.setitem(main.benchmark_jobs, "20250222_101500_0badcafe",
+                        {"status": "completed", "models": ["phi3"], "results": {}, "charts": {}})
+    response = client.get("/sql-benchmark/analysis/20250222_101500_0badcafe/task_type")
+    assert response.status_code == 404
+    assert response.get_json()["status"] == "error"
+
+
+@pytest.mark.parametrize("status_code", [429, 503])
+def test_overloaded_response_carries_retry_after(client, status_code):
+    import main
+    from controllers.llm_gateway import OverloadedError
+    with main.app.test_request_context():
+        response, status = main.overloaded_response(OverloadedError("phi3", "wait queue is full", 3, status_code))
+    assert status == status_code
+    assert response.headers["Retry-After"] == "3"
+    assert response.get_json()["retry_after"] == 3
@@ -0,0 +1,49 @@
+import jsonschema
+import pytest
+
+from controllers.schema_cache import CompiledSchema
+
+DRAFT4 = "http://json-schema.org/draft-04/schema#"
+
+
+@pytest.mark.parametrize("schema, instance", [
+    ({"$schema": DRAFT4, "type": "integer"}, 3.0),
+    ({"$schema": DRAFT4, "type": "object", "properties": {"n": {"type": "integer"}}}, {"n": 2.0}),
+    ({"type": "integer"}, 3.0),
+    ({"enum": [[1]]}, [True]),
+    ({"enum": [[1]]}, [1]),
+    ({"const": {"a": 1}}, {"a": True}),
+    ({"enum": [1]}, True),
+])
+def test_compiled_schema_agrees_with_jsonschema(schema, instance):
+    compiled = CompiledSchema(schema)
+    assert compiled.compiled
+    expected = jsonschema.validators.validator_for(schema)(schema).is_valid(instance)
+    # The fast check may only say "valid" when jsonschema agrees
+    if compiled.fast_check(instance):
+        assert expected
+    assert (compiled.best_error(instance) is None) == expected
+
+
+def _nested(depth, wrap):
+    schema = {"type": "integer"}
+    for _ in range(depth):
+        schema = wrap(schema)
+    return schema
+
+
+@pytest.mark.parametrize("schema, instance", [
+    (_nested(21, lambda inner: {"type": "array", "items": inner}), [[[[1]]]]),
+    (_nested(40, lambda inner: {"type": "array", "items": inner}), [[[["x"]]]]),
+    (_nested(60, lambda inner: {"type": "object", "properties": {"a": inner}}), {"a": {"a": {"a": 1}}}),
+    (_nested(60, lambda inner: {"type": "object", "properties": {"a": inner}}), {"a": {"a": {"a": 1.5}}}),
+])
+def test_deeply_nested_schema_falls_back_to_jsonschema(schema, instance):
+    compiled = CompiledSchema(schema)
+    assert not compiled.compiled
+    expected = jsonschema.validators.validator_for(schema)(schema).is_valid(instance)
+    assert (compiled.best_error(instance) is None) == expected
+
+
+def test_shallow_nesting_is_still_compiled():
+    assert CompiledSchema(_nested(5, lambda inner: {"type": "array", "items": inner})).compiled
@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+from controllers import sentiment_controller
+from controllers.sentiment_controller import SentimentController
+
+
+def test_requests_never_download_the_lexicon(monkeypatch):
+    downloads = []
+    monkeypatch.setattr("nltk.download", lambda *args, **kwargs: downloads.append(args))
+    monkeypatch.setattr(sentiment_controller, "_lexicon", None)
+    monkeypatch.setitem(sentiment_controller.SENTIMENT_OPTIONS, "structured", False)
+    controller = SentimentController("test")
+    monkeypatch.setattr(controller, "get_sentiment", lambda sentence, use_lexicon=True: "positive")
+    monkeypatch.setattr("tiktoken.encoding_for_model", lambda model: SimpleNamespace(encode=str.split))
+
+    counts, _ = controller.generate_sentiment("What a wonderful, fantastic day!")
+    # Not loaded at startup: the sentence goes to the LLM stage
+    assert counts["positive"] == 1
+    assert downloads == []
@@ -0,0 +1,155 @@
+"""
+Benchmark of the /process-json user extraction on benign and adversarial inputs
+
+Compares JSONController._extract_user_data, a single left-to-right scan, with
+the regex version it replaced (kept below as legacy_extract_user_data). Long
+runs of words without the expected markers made those patterns backtrack
+quadratically. Each case is generated at growing sizes: a linear
+implementation's time grows with the size, and a quadratic one's with its
+square.
+
+Before timing, both implementations are run on randomized inputs (built from
+the same fragments as the README example, plus newlines, odd digits and
+missing markers) and must return the same records or raise the same
+exception.
+
+Usage (from the repository root):
+    python -m tools.extraction_benchmark
+    python -m tools.extraction_benchmark --sizes 1000,10000,100000 --legacy-limit 20000 --fuzz 2000
+"""
+import argparse
+import random
+import re
+import time
+from typing import Callable, Dict, List
+
+from controllers.json_controller import JSONController
+
+SAMPLE = (
+    "On 22nd February 2025, the financial summary for multiple users was generated. "
+    "Rahul Sharma earns ₹12,00,000 annually, spends ₹6,00,000, and has invested ₹3,00,000 in mutual funds "
+    "and ₹1,50,000 in stocks. He also has a credit card debt of ₹2,00,000. "
+    "Anil Mehta earns ₹9,50,000 per year and spends ₹4,00,000. "
+    "Vikram Singh earns ₹15,00,000, spends ₹8,00,000, and has invested ₹4,50,000 in ETFs. "
+)
+
+FRAGMENTS = [
+    "Asha Rao", " earns ₹", " earns ", "12,000", "1,2,3", ",", " ", "  ", "\n", ". ", ". Next", ".",
+    "spends ₹", "spends ₹9,000", " invested ₹5,000 in gold", " savings of ₹1,000 in bank",
+    " home loan of ₹2,000", " 7 loan of ₹3,000", " debt of ₹", " card debt of ₹4,000", "₹",
+    "and", "x", "Z", "_", "7", "ß", " ",
+]
+
+
+def legacy_extract_user_data(text: str) -> list:
+    """The regex extraction JSONController used before the scanner, for comparison"""
+    controller = JSONController("benchmark")
+    users = []
+    for match in re.finditer(r'([A-Za-z\s]+) earns ₹([\d,]+) .+?(?=\. [A-Za-z]|$)', text):
+        user_block = match.group(0)
+        name = match.group(1).strip()
+        salary = controller._extract_amount(re.search(r'earns ₹([\d,]+)', user_block).group(1))
+        expenses = controller._extract_amount(re.search(r'spends ₹([\d,]+)', user_block).group(1))
+        investments, debts, loans, savings = {}, {}, {}, 0
+        for pattern, category in [
+            (r'invested ₹([\d,]+) in ([^,\.]+)', 'investments'),
+            (r'savings of ₹([\d,]+) in ([^,\.]+)', 'savings'),
+            (r'([\w\s]+) loan of ₹([\d,]+)', 'loans'),
+            (r'([\w\s]+) debt of ₹([\d,]+)', 'debts'),
+        ]:
+            for item_match in re.finditer(pattern, user_block):
+                amount = controller._extract_amount(item_match.group(1))
+                item = item_match.group(2).strip().lower()
+                if category == 'investments':
+                    investments[item] = amount
+                elif category == 'savings':
+                    savings = amount
+                elif category == 'loans':
+                    loans[item] = amount
+                elif category == 'debts':
+                    debts[item] = amount
+        users.append({"name": name, "salary": salary, "expenses": expenses, "investments": investments,
+                      "debts": debts, "loans": loans, "savings": savings})
+    return users
+
+
+def _outcome(extract: Callable[[str], list], text: str):
+    try:
+        return "ok", extract(text)
+    except Exception as e:
+        return "error", (type(e).__name__, str(e))
+
+
+def check_equivalence(samples: int, seed: int = 0) -> int:
+    """Compare both implementations on random inputs; returns the number of inputs checked"""
+    rng = random.Random(seed)
+    scanner = JSONController("benchmark")._extract_user_data
+    for index in range(samples):
+        if index % 4 == 0:
+            text = SAMPLE * rng.randint(1, 3)
+        else:
+            text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 60)))
+        expected = _outcome(legacy_extract_user_data, text)
+        actual = _outcome(scanner, text)
+        if actual != expected:
+            raise AssertionError(f"Mismatch for {text!r}:\n  legacy:  {expected}\n  scanner: {actual}")
+    return samples
+
+
+# Each case maps a size (roughly the number of characters) to an input
+CASES: Dict[str, Callable[[int], str]] = {
+    # Realistic statements, many users
+    "benign statements": lambda size: SAMPLE * max(1, size // len(SAMPLE)),
+    # One enormous name: every start position of ([A-Za-z\s]+) scans to the end of the run
+    "words without 'earns'": lambda size: "word " * (size // 5),
+    # A user block that is one long sentence of words with no "loan of ₹"
+    "long block of words": lambda size: "Asha earns ₹1 spends ₹2 " + "word " * (size // 5),
+    # Many "earns ₹" candidates whose block runs into a newline that fails every one of them
+    "failing blocks before a newline": lambda size: "A earns ₹1 " * (size // 11) + "\n",
+}
+
+
+def _time(extract: Callable[[str], list], text: str) -> float:
+    started = time.perf_counter()
+    try:
+        extract(text)
+    except Exception:
+        # Adversarial inputs may be rejected; only the time matters here
+        pass
+    return time.perf_counter() - started
+
+
+def run(sizes: List[int], legacy_limit: int) -> List[Dict]:
+    scanner = JSONController("benchmark")._extract_user_data
+    rows = []
+    for case, build in CASES.items():
+        for size in sizes:
+            text = build(size)
+            rows.append({
+                "case": case,
+                "chars": len(text),
+                "scanner_ms": _time(scanner, text) * 1000,
+                # The legacy patterns are quadratic on these inputs; skip sizes that would take minutes
+                "legacy_ms": _time(legacy_extract_user_data, text) * 1000 if len(text) <= legacy_limit else None,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /process-json extraction scanner")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Comma-separated input sizes in characters")
+    parser.add_argument("--legacy-limit", type=int, default=20000, help="Largest input given to the legacy regexes")
+    parser.add_argument("--fuzz", type=int, default=2000, help="Random inputs compared before timing (0 to skip)")
+    args = parser.parse_args()
+
+    if args.fuzz:
+        print(f"Equivalence: {check_equivalence(args.fuzz)} random inputs give identical results")
+
+    print(f"{'case':<34}{'chars':>10}{'scanner ms':>14}{'legacy ms':>14}")
+    for row in run([int(size) for size in args.sizes.split(",")], args.legacy_limit):
+        legacy = f"{row['legacy_ms']:.1f}" if row["legacy_ms"] is not None else "skipped"
+        print(f"{row['case']:<34}{row['chars']:>10}{row['scanner_ms']:>14.1f}{legacy:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Local stand-in for the Ollama HTTP API, for load tests without GPUs
+
+Serves POST /api/generate (streamed NDJSON or a single JSON object, like
+Ollama; an empty prompt only loads the model) and GET /api/tags and /api/ps,
+which both list the loaded models. Responses are canned per task (JSON shaped like
+the structured-output prompts when "format" is "json"), so the controllers'
+validation and retry logic behave as they do against a real model, and
+timings follow a simple model of a single inference server:
+
+    queueing for one of --num-parallel slots (like OLLAMA_NUM_PARALLEL)
+    + load time (when the model isn't loaded) + time to first token
+    + output tokens / tokens per second
+
+Usage:
+    python tools/ollama_stub.py --port 11434 --ttft-ms 80 --tokens-per-second 40
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# First matching pattern (on the lower-cased prompt) picks the canned response
+CANNED_RESPONSES = [
+    (r"sentiment of this sentence", "The sentiment of this sentence is positive."),
+    (r"\bsql\b|select statement|query", "SELECT name, salary FROM employees WHERE salary > 50000;"),
+    (r"json|schema", '{"date": "2025-02-22", "users": []}'),
+    (r"translate.*spanish", "El aprendizaje automatico cuantico usa algoritmos cuanticos."),
+    (r"translate|german", "Quantenmaschinenlernen verwendet Quantenalgorithmen auf Quantencomputern."),
+]
+
+
+def _poem(prompt):
+    """Five lines that use the requested words, so the poem checks pass"""
+    match = re.search(r"words\s*:\s*'([^']*)'", prompt)
+    words = " ".join(word.strip() for word in match.group(1).split(",")) if match else "light"
+    return "\n".join([
+        f"Where {words} meet the morning light,",
+        "The quiet rivers hum in flight,",
+        "And every shadow turns to gold,",
+        "A story waiting to be told,",
+        "Till stars return to claim the night.",
+    ])
+
+
+def canned_response(prompt):
+    lowered = prompt.lower()
+    if "poem" in lowered:
+        return _poem(prompt)
+    for pattern, response in CANNED_RESPONSES:
+        if re.search(pattern, lowered):
+            return response
+    return "OK."
+
+
+def json_response(prompt):
+    """Answer for format="json" requests: the structured sentiment shapes, else the text wrapped in an object"""
+    lowered = prompt.lower()
+    if '"sentiments"' in lowered:
+        count = len(re.findall(r"^\d+\. ", prompt, re.MULTILINE))
+        return json.dumps({"sentiments": ["positive"] * count})
+    if '"sentiment"' in lowered:
+        return json.dumps({"sentiment": "positive"})
+    return json.dumps({"response": canned_response(prompt)})
+
+
+def apply_stop(text, stop):
+    """Cut the text at the first stop sequence, like Ollama's options.stop"""
+    cut = len(text)
+    for sequence in stop or []:
+        index = text.find(sequence)
+        if index != -1:
+            cut = min(cut, index)
+    return text[:cut]
+
+
+class StubModelServer:
+    """Timing model: a bounded set of loaded models, load cost on a miss, then token streaming"""
+
+    def __init__(self, ttft_ms, tokens_per_second, load_ms, max_loaded, jitter, error_rate, num_parallel):
+        self.ttft = ttft_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        self.load = load_ms / 1000
+        self.max_loaded = max_loaded
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._loaded = OrderedDict()  # Model -> last use, least recently used first
+        self._lock = threading.Lock()
+        # Generations beyond num_parallel queue inside the server, so latency grows with load
+        self.slots = threading.BoundedSemaphore(num_parallel)
+
+    def ensure_loaded(self, model):
+        """Seconds spent loading the model (0 when it is already resident)"""
+        with self._lock:
+            if model in self._loaded:
+                self._loaded.move_to_end(model)
+                return 0.0
+            self._loaded[model] = time.time()
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return self.load
+
+    def loaded_models(self):
+        with self._lock:
+            return list(self._loaded)
+
+    def jittered(self, seconds):
+        return max(0.0, seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    server_version = "OllamaStub/0.1"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path in ("/api/tags", "/api/ps"):
+            models = [{"name": model, "model": model} for model in self.server.model_server.loaded_models()]
+            self._send_json(200, {"models": models})
+        elif self.path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+
+        model_server = self.server.model_server
+        model = request.get("model", "stub")
+        prompt = request.get("prompt", "")
+        options = request.get("options") or {}
+
+        if random.random() < model_server.error_rate:
+            self._send_json(500, {"error": "stub: injected failure"})
+            return
+
+        started = time.perf_counter()
+        if not prompt:
+            # Load request (warm-up or keep-alive): Ollama loads the model and returns without generating
+            load_duration = model_server.ensure_loaded(model)
+            time.sleep(load_duration)
+            self._send_json(200, {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": "",
+                "done": True,
+                "done_reason": "load",
+                "load_duration": int(load_duration * 1e9),
+            })
+            return
+
+        with model_server.slots:
+            self._generate(request, model, prompt, options, started)
+
+    def _generate(self, request, model, prompt, options, started):
+        model_server = self.server.model_server
+        load_duration = model_server.ensure_loaded(model)
+        time.sleep(load_duration + model_server.jittered(model_server.ttft))
+        prompt_done = time.perf_counter()
+
+        text = json_response(prompt) if request.get("format") == "json" else canned_response(prompt)
+        text = apply_stop(text, options.get("stop"))
+        # Roughly one token per word or punctuation mark
+        tokens = re.findall(r"\w+|[^\w\s]|\s+", text)
+        token_delay = 1 / model_server.tokens_per_second if model_server.tokens_per_second > 0 else 0
+
+        def final_chunk():
+            finished = time.perf_counter()
+            return {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": "",
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int((finished - started) * 1e9),
+                "load_duration": int(load_duration * 1e9),
+                "prompt_eval_count": len(prompt.split()),
+                "prompt_eval_duration": int(model_server.ttft * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int((finished - prompt_done) * 1e9),
+            }
+
+        if request.get("stream", True) is False:
+            time.sleep(model_server.jittered(token_delay * len(tokens)))
+            self._send_json(200, {**final_chunk(), "response": text})
+            return
+
+        # Streamed NDJSON, one chunk per token, with chunked transfer encoding
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(payload):
+            line = (json.dumps(payload) + "\n").encode()
+            self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        try:
+            for token in tokens:
+                time.sleep(model_server.jittered(token_delay))
+                write_chunk({
+                    "model": model,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "response": token,
+                    "done": False,
+                })
+            write_chunk(final_chunk())
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away (e.g. a cancelled hedge); nothing left to do
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Ollama API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--ttft-ms", type=float, default=80, help="Time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    parser.add_argument("--load-ms", type=float, default=1500, help="Cost of loading a model that isn't resident")
+    parser.add_argument("--max-loaded", type=int, default=1, help="Models kept resident at once")
+    parser.add_argument("--num-parallel", type=int, default=4, help="Generations run at once; the rest queue")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative jitter applied to every delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), OllamaStubHandler)
+    server.daemon_threads = True
+    server.verbose = args.verbose
+    server.model_server = StubModelServer(
+        args.ttft_ms, args.tokens_per_second, args.load_ms, args.max_loaded, args.jitter, args.error_rate,
+        args.num_parallel
+    )
+
+    print(f"Ollama stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
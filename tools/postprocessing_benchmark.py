@@ -0,0 +1,189 @@
+"""
+Microbenchmarks of the output post-processing in controllers/postprocessing.py
+
+Times the shared rule sets against the per-controller functions they replaced
+(kept below as legacy_*), per call on typical model outputs: clean sentences,
+outputs with markdown fences and echoed instructions, and SQL queries.
+
+Before timing, both versions are run on the samples and on randomized inputs
+assembled from the same fragments, and must return the same text. Translation
+cleaning is compared without a target language, where every rule applies as
+before; with a language, rules written in other languages are skipped.
+
+Usage (from the repository root):
+    python -m tools.postprocessing_benchmark
+    python -m tools.postprocessing_benchmark --number 20000 --fuzz 5000
+"""
+import argparse
+import random
+import re
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+from controllers.postprocessing import clean_translation, clean_sql, normalize_sql, normalize_sql_advanced
+
+
+def legacy_clean_translation(translation: str) -> str:
+    """TranslationController.clean_translation_output before the shared rule sets"""
+    translation = re.sub(r'^```.*?\n', '', translation)
+    translation = re.sub(r'\n```$', '', translation)
+    explanation_patterns = [
+        r'(?i)La respuesta debe.*?contener',
+        r'(?i)The response should.*?contain',
+        r'(?i)Texto original en inglés.*?',
+        r'(?i)Original English text.*?',
+        r'(?i)Translation:',
+        r'(?i)Traducción:',
+        r'(?i)Übersetzung:',
+        r'(?i)y no se deben modificar los datos del entrada',
+        r'(?i)and don\'t alter input text',
+        r'\"[^\"]*?\"',
+    ]
+    for pattern in explanation_patterns:
+        translation = re.sub(pattern, '', translation)
+    lines = translation.split('\n')
+    filtered_lines = [line for line in lines if len(line.strip()) > 5]
+    translation = ' '.join(filtered_lines)
+    return re.sub(r'\s+', ' ', translation).strip()
+
+
+def legacy_clean_sql(sql_query: str) -> str:
+    """SQLController.clean_sql_output before the shared rule sets"""
+    sql_query = re.sub(r'^```sql\n', '', sql_query)
+    sql_query = re.sub(r'^```\n', '', sql_query)
+    sql_query = re.sub(r'\n```$', '', sql_query)
+    sql_query = re.sub(r'\n', ' ', sql_query)
+    return sql_query.strip()
+
+
+def legacy_normalize_sql(query: str) -> str:
+    """SQLBenchmarkController._normalize_sql before the shared rule sets"""
+    query = query.lower()
+    query = re.sub(r'\s+', ' ', query).strip()
+    query = re.sub(r';$', '', query)
+    query = re.sub(r'\s*=\s*', ' = ', query)
+    query = re.sub(r'\s*>\s*', ' > ', query)
+    query = re.sub(r'\s*<\s*', ' < ', query)
+    query = re.sub(r'\s*>=\s*', ' >= ', query)
+    query = re.sub(r'\s*<=\s*', ' <= ', query)
+    query = re.sub(r'\s*<>\s*', ' <> ', query)
+    query = re.sub(r'\s*!=\s*', ' != ', query)
+    return query
+
+
+def legacy_normalize_sql_advanced(query: str) -> str:
+    """SQLBenchmarkController._normalize_sql_advanced before the shared rule sets"""
+    if not query:
+        return ""
+    query = query.lower().strip()
+    query = re.sub(r'\s+', ' ', query)
+    query = re.sub(r';$', '', query)
+    query = re.sub(r'`([^`]*)`', r'\1', query)
+    query = re.sub(r'"([^"]*)"', r'\1', query)
+    query = re.sub(r"'([^']*)'", r"'\1'", query)
+    query = re.sub(r'\bjoin\b', 'join', query)
+    query = re.sub(r'\binner\s+join\b', 'join', query)
+    query = re.sub(r'\bleft\s+join\b', 'left join', query)
+    query = re.sub(r'\bright\s+join\b', 'right join', query)
+    query = re.sub(r'\bfull\s+join\b', 'full join', query)
+    query = re.sub(r'\bgroup\s+by\b', 'group by', query)
+    query = re.sub(r'\border\s+by\b', 'order by', query)
+    query = re.sub(r'\b(\w+)\s+as\s+(\w+)', r'\1 \2', query)
+    query = re.sub(r'\bcount\s*\(', 'count(', query)
+    query = re.sub(r'\bsum\s*\(', 'sum(', query)
+    query = re.sub(r'\bavg\s*\(', 'avg(', query)
+    query = re.sub(r'\bmax\s*\(', 'max(', query)
+    query = re.sub(r'\bmin\s*\(', 'min(', query)
+    return query
+
+
+TRANSLATIONS = {
+    "clean sentence": "Das Wetter ist heute sehr schön und wir gehen in den Park.",
+    "fenced with notes": (
+        "```german\nÜbersetzung: Das Wetter ist heute sehr schön.\n\"The weather is nice today.\"\n"
+        "Note:\nThe response should only contain the translation.\n```"
+    ),
+    "spanish with echo": (
+        "Traducción: El clima es muy agradable hoy.\nTexto original en inglés: \"The weather is nice today.\"\n"
+        "La respuesta debe solo contener la traducción y no se deben modificar los datos del entrada"
+    ),
+}
+
+QUERIES = {
+    "fenced select": "```sql\nSELECT name, COUNT (*) AS total\nFROM users\nWHERE age>=18 AND city<>'Berlin'\nGROUP   BY name;\n```",
+    "plain update": "UPDATE accounts SET balance = balance - 100 WHERE id = 42;",
+    "join with quotes": 'select `u`.name as n from "users" u inner join orders o on u.id=o.user_id order by n',
+}
+
+TRANSLATION_FRAGMENTS = [
+    "```", "```german\n", "\n", "\n```", " ", "  ", "\t", '"', "'", "Translation:", "TRANSLATION:", "Traducción:",
+    "Übersetzung:", "ÜBERSETZUNG:", "La respuesta debe", "contener", "The response should", "contain",
+    "Texto original en inglés", "Original English text", "y no se deben modificar los datos del entrada",
+    "and don't alter input text", "Das ist gut.", "Hola", "ok", "Note", ".",
+]
+
+SQL_FRAGMENTS = [
+    "```sql\n", "```\n", "\n```", "```", "\n", " ", "  ", "\t", ";", "=", ">", "<", "!", ">=", "<>", "!=", "==",
+    "SELECT", "select", "count", "COUNT (", "sum(", "max", " as ", "AS", "inner", "join", "INNER JOIN",
+    "left  join", "group\tby", "order by", "`", '"', "'", "(", ")", "x", "id", "_", "1",
+]
+
+# name -> (new function, legacy function, samples)
+FUNCTIONS: Dict[str, Tuple[Callable[[str], str], Callable[[str], str], Dict[str, str]]] = {
+    "clean_translation": (clean_translation, legacy_clean_translation, TRANSLATIONS),
+    "clean_sql": (clean_sql, legacy_clean_sql, QUERIES),
+    "normalize_sql": (normalize_sql, legacy_normalize_sql, QUERIES),
+    "normalize_sql_advanced": (normalize_sql_advanced, legacy_normalize_sql_advanced, QUERIES),
+}
+
+
+def check_equivalence(samples: int, seed: int = 0) -> int:
+    """Compare every function with its legacy version; returns the number of inputs checked"""
+    rng = random.Random(seed)
+    checked = 0
+    for name, (function, legacy, examples) in FUNCTIONS.items():
+        fragments = TRANSLATION_FRAGMENTS if name == "clean_translation" else SQL_FRAGMENTS
+        inputs = list(examples.values())
+        inputs += ["".join(rng.choice(fragments) for _ in range(rng.randint(0, 30))) for _ in range(samples)]
+        for text in inputs:
+            expected, actual = legacy(text), function(text)
+            if actual != expected:
+                raise AssertionError(f"{name} differs for {text!r}:\n  legacy: {expected!r}\n  new:    {actual!r}")
+        checked += len(inputs)
+    return checked
+
+
+def run(number: int) -> List[Dict]:
+    rows = []
+    for name, (function, legacy, examples) in FUNCTIONS.items():
+        for case, text in examples.items():
+            legacy_us = min(timeit.repeat(lambda: legacy(text), number=number, repeat=3)) / number * 1e6
+            new_us = min(timeit.repeat(lambda: function(text), number=number, repeat=3)) / number * 1e6
+            rows.append({"function": name, "case": case, "legacy_us": legacy_us, "new_us": new_us})
+    for language in ("german", "spanish"):
+        for case, text in TRANSLATIONS.items():
+            new_us = min(timeit.repeat(lambda: clean_translation(text, language), number=number, repeat=3)) / number * 1e6
+            rows.append({"function": f"clean_translation[{language}]", "case": case, "legacy_us": None, "new_us": new_us})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark the output post-processing rule sets")
+    parser.add_argument("--number", type=int, default=10000, help="Calls per timing")
+    parser.add_argument("--fuzz", type=int, default=2000, help="Random inputs per function compared before timing (0 to skip)")
+    args = parser.parse_args()
+
+    if args.fuzz:
+        print(f"Equivalence: {check_equivalence(args.fuzz)} inputs give identical output")
+
+    print(f"{'function':<28}{'case':<20}{'legacy us':>11}{'new us':>9}{'speedup':>9}")
+    for row in run(args.number):
+        if row["legacy_us"] is None:
+            legacy, speedup = "-", "-"
+        else:
+            legacy, speedup = f"{row['legacy_us']:.2f}", f"{row['legacy_us'] / row['new_us']:.1f}x"
+        print(f"{row['function']:<28}{row['case']:<20}{legacy:>11}{row['new_us']:>9.2f}{speedup:>9}")
+
+
+if __name__ == "__main__":
+    main()
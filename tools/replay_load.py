@@ -0,0 +1,301 @@
+"""
+Open-loop load generator that replays logged production inputs
+
+Reads logs/input_output.csv and works out from each logged input (and its
+response) which main.py endpoint produced it. It then sends those requests
+at a target rate and reports latency percentiles, error rates and achieved
+throughput per endpoint.
+
+Arrivals are scheduled up front (open loop): a slow server does not slow the
+sender down. Latency is measured from the scheduled send time, so any queueing
+in the generator itself is counted instead of hidden.
+
+Usage (from the repository root):
+    python -m tools.replay_load --base-url http://127.0.0.1:5000 --qps 5 --duration 60
+    python -m tools.replay_load --ramp 1:30,1-10:60,10:30 --output logs/replay.json
+
+Point the API at a real Ollama, or at tools/ollama_stub.py for capacity tests
+of the service itself.
+"""
+import argparse
+import ast
+import concurrent.futures
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+
+from controllers.stream_histogram import StreamingHistogram
+
+SENTIMENT_KEYS = {"positive", "negative", "neutral"}
+# /generate-sql logs the result dict: {"query", "operation", "status"}, or {"error", ..., "code"} on failure
+SQL_RESPONSE_KEYS = {"query", "operation", "code"}
+# Input column of the summary rows streamed /process-json requests log (main.py)
+STREAM_INPUT_PREFIX = "stream: date "
+SQL_START = re.compile(r"^\s*(select|insert|update|delete|create|alter|with)\b", re.IGNORECASE)
+MODEL_HINT = re.compile(r"[\"“”']?model[\"“”']?\s*:\s*[\"“”']?([\w.\-:]+)", re.IGNORECASE)
+
+
+def _literal(text):
+    """Parse a logged Python literal (dicts are logged with str()), or None"""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+
+
+def classify(input_text: str, response: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Map a logged input to the endpoint and JSON body that would reproduce it
+
+    The log only has the controller input and its output, so the endpoint is
+    inferred: structured inputs with a schema came from /process-json, inputs
+    with a target language from /translate, structured inputs with a SQL
+    result from /generate-sql, counts of sentiments from /sentiment,
+    multi-line output from /poem, and anything else is treated as a
+    translation. Streamed /process-json summaries return None: the statement
+    itself is not logged, so they cannot be replayed.
+    """
+    input_text = str(input_text)
+    response = str(response)
+    if input_text.startswith(STREAM_INPUT_PREFIX):
+        return None
+    parsed_input = _literal(input_text)
+    parsed_response = _literal(response)
+
+    if isinstance(parsed_input, dict) and "schema" in parsed_input:
+        return "/process-json", parsed_input
+    if isinstance(parsed_input, dict) and "target_language" in parsed_input:
+        return "/translate", parsed_input
+    if isinstance(parsed_input, dict) and "text" in parsed_input:
+        if isinstance(parsed_response, dict) and SQL_RESPONSE_KEYS & set(parsed_response):
+            return "/generate-sql", parsed_input
+        # Not a SQL result: infer the endpoint from the text and the response like a plain input
+        input_text = str(parsed_input["text"])
+
+    # Plain-text inputs sometimes carry the model name (e.g. 'words”, “model”: ”phi3')
+    body = {}
+    model_hint = MODEL_HINT.search(input_text)
+    if model_hint:
+        body["model"] = model_hint.group(1)
+        input_text = input_text[:model_hint.start()].rstrip(" ,\"“”'")
+
+    if isinstance(parsed_response, dict) and SENTIMENT_KEYS <= set(parsed_response):
+        return "/sentiment", {**body, "text": input_text}
+    if SQL_START.match(response):
+        return "/generate-sql", {**body, "text": input_text}
+    if len([line for line in response.split("\n") if line.strip()]) > 1:
+        return "/poem", {**body, "text": input_text}
+    return "/translate", {**body, "text": input_text}
+
+
+def load_requests(path: str, model: str = None, endpoints: List[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Logged inputs as (endpoint, body) pairs, optionally with the model overridden"""
+    logs = pd.read_csv(path, index_col=0)
+    requests = []
+    for input_text, response in zip(logs["input_text"], logs["response"]):
+        if pd.isna(input_text):
+            continue
+        classified = classify(input_text, response)
+        if classified is None:
+            continue
+        endpoint, body = classified
+        if endpoints and endpoint not in endpoints:
+            continue
+        if model:
+            body["model"] = model
+        requests.append((endpoint, body))
+    return requests
+
+
+def parse_profile(qps: float, duration: float, ramp: str = None) -> List[Tuple[float, float, float]]:
+    """
+    Load profile as (start_qps, end_qps, seconds) stages
+
+    A ramp is a comma-separated list of stages, each "qps:seconds" for a
+    constant rate or "from-to:seconds" for a linear ramp.
+    """
+    if not ramp:
+        return [(qps, qps, duration)]
+
+    stages = []
+    for stage in ramp.split(","):
+        rates, seconds = stage.strip().split(":")
+        start, _, end = rates.partition("-")
+        stages.append((float(start), float(end or start), float(seconds)))
+    return stages
+
+
+def schedule(stages: List[Tuple[float, float, float]], poisson: bool = False, seed: int = None) -> List[float]:
+    """Send offsets (seconds from the start) following the profile"""
+    rng = random.Random(seed)
+    offsets = []
+    stage_start = 0.0
+
+    for start_qps, end_qps, seconds in stages:
+        t = 0.0
+        while t < seconds:
+            rate = start_qps + (end_qps - start_qps) * t / seconds
+            if rate <= 0:
+                # Nothing to send at this rate; step forward until the ramp rises
+                t += 0.1
+                continue
+            offsets.append(stage_start + t)
+            t += rng.expovariate(rate) if poisson else 1 / rate
+        stage_start += seconds
+
+    return offsets
+
+
+class EndpointStats:
+    """Outcome counters and a latency histogram for one endpoint"""
+
+    def __init__(self):
+        self.sent = 0
+        self.ok = 0
+        self.errors = 0
+        self.status_codes = {}
+        self.latency = StreamingHistogram()
+        self.first_send = None
+        self.last_done = None
+
+    def record(self, sent_at, done_at, status):
+        self.sent += 1
+        key = str(status)
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if isinstance(status, int) and 200 <= status < 300:
+            self.ok += 1
+        else:
+            self.errors += 1
+        self.latency.record(done_at - sent_at)
+        self.first_send = sent_at if self.first_send is None else min(self.first_send, sent_at)
+        self.last_done = done_at if self.last_done is None else max(self.last_done, done_at)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.last_done - self.first_send) if self.sent else 0
+        latency = self.latency.summary()
+        return {
+            "sent": self.sent,
+            "ok": self.ok,
+            "errors": self.errors,
+            "error_rate": self.errors / self.sent if self.sent else 0.0,
+            "throughput_rps": self.ok / elapsed if elapsed > 0 else 0.0,
+            "status_codes": self.status_codes,
+            "latency_ms": {
+                stat: latency[stat] * 1000
+                for stat in ["mean", "p50", "p90", "p95", "p99", "max", "stddev"]
+            },
+            "latency_histogram": self.latency.to_dict(),
+        }
+
+
+def send(base_url: str, endpoint: str, body: Dict[str, Any], timeout: float):
+    """POST one request; returns the HTTP status, or the exception name when there was no response"""
+    request = urllib.request.Request(
+        base_url.rstrip("/") + endpoint,
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception as e:
+        return type(e).__name__
+
+
+def replay(requests, offsets, base_url, timeout=120.0, max_in_flight=256) -> Dict[str, EndpointStats]:
+    """Send requests (cycled) at the given offsets and collect per-endpoint stats"""
+    stats = {}
+    lock = threading.Lock()
+
+    def run(endpoint, body, scheduled):
+        status = send(base_url, endpoint, body, timeout)
+        done = time.perf_counter()
+        with lock:
+            stats.setdefault(endpoint, EndpointStats()).record(scheduled, done, status)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        start = time.perf_counter()
+        for i, offset in enumerate(offsets):
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint, body = requests[i % len(requests)]
+            executor.submit(run, endpoint, body, scheduled)
+
+    return stats
+
+
+def print_report(stats: Dict[str, EndpointStats]):
+    header = f"{'Endpoint':<16}{'Sent':>7}{'Errors':>8}{'Err %':>8}{'RPS':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, endpoint_stats in sorted(stats.items()):
+        summary = endpoint_stats.summary()
+        latency = summary["latency_ms"]
+        print(
+            f"{endpoint:<16}{summary['sent']:>7}{summary['errors']:>8}"
+            f"{summary['error_rate'] * 100:>8.1f}{summary['throughput_rps']:>8.2f}"
+            f"{latency['p50']:>10.1f}{latency['p95']:>10.1f}{latency['p99']:>10.1f}{latency['max']:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged inputs against the API, open loop")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--log", default="logs/input_output.csv", help="Logged inputs to replay")
+    parser.add_argument("--qps", type=float, default=1.0, help="Constant request rate")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run at --qps")
+    parser.add_argument("--ramp", help='Stages like "1:30,1-10:60,10:30" (qps or from-to qps : seconds); overrides --qps')
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of a fixed spacing")
+    parser.add_argument("--model", help="Send every request to this model")
+    parser.add_argument("--endpoint", action="append", dest="endpoints", help="Only replay this endpoint (repeatable)")
+    parser.add_argument("--shuffle", action="store_true", help="Shuffle the logged inputs")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Upper bound on concurrent requests")
+    parser.add_argument("--output", help="Write the per-endpoint results as JSON")
+    args = parser.parse_args()
+
+    requests = load_requests(args.log, args.model, args.endpoints)
+    if not requests:
+        parser.error(f"No replayable requests in {args.log}")
+    if args.shuffle:
+        random.Random(args.seed).shuffle(requests)
+
+    offsets = schedule(parse_profile(args.qps, args.duration, args.ramp), args.poisson, args.seed)
+    endpoints = sorted({endpoint for endpoint, _ in requests})
+    print(f"Replaying {len(offsets)} requests from {len(requests)} logged inputs ({', '.join(endpoints)})")
+
+    started = time.perf_counter()
+    stats = replay(requests, offsets, args.base_url, args.timeout, args.max_in_flight)
+    elapsed = time.perf_counter() - started
+
+    print_report(stats)
+    total_ok = sum(endpoint_stats.ok for endpoint_stats in stats.values())
+    print(f"\nAchieved {total_ok / elapsed:.2f} successful requests/s over {elapsed:.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "base_url": args.base_url,
+                "profile": parse_profile(args.qps, args.duration, args.ramp),
+                "elapsed_seconds": elapsed,
+                "endpoints": {endpoint: s.summary() for endpoint, s in stats.items()},
+            }, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,14 @@ def load_config():
     with open(config_path, 'r') as config_file:
         return json.load(config_file)
     
+def load_settings():
+    """Runtime settings (admission limits etc.); empty when settings.json is absent"""
+    settings_path = os.path.join(os.path.dirname(__file__), 'settings.json')
+    if not os.path.exists(settings_path):
+        return {}
+    with open(settings_path, 'r') as settings_file:
+        return json.load(settings_file)
+    
 def load_prompt():
     with open(os.getcwd() + "/controllers/prompt.json", 'r') as file:
         prompt = json.load(file)